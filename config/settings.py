@@ -56,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'formation.profilage.ProfilageMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +70,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
+        # Remplacé par formation.profilage.GabaritsMesures si PROFILAGE_ACTIF (voir plus bas)
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates',
@@ -99,6 +101,78 @@ DATABASES = {
     }
 }
 
+# Profil de stockage SQLite : 'defaut' (SQLite sans réglage) ou 'production'
+# En production : journal WAL (lectures non bloquées par les écritures),
+# synchronous=NORMAL (sûr en WAL), attente sur verrou au lieu de "database is locked",
+# lecture mappée en mémoire et cache de pages agrandi, appliqués à chaque connexion.
+# transaction_mode IMMEDIATE prend le verrou d'écriture dès le BEGIN, ce qui évite
+# les échecs de promotion lecture -> écriture entre soumissions concurrentes.
+STOCKAGE_PROFIL = os.environ.get('STOCKAGE_PROFIL', 'defaut')
+
+SQLITE_PRAGMAS_PRODUCTION = {
+    'busy_timeout': 5000,          # millisecondes, en premier pour couvrir les pragmas suivants
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,        # 256 Mo
+    'cache_size': -64000,          # valeur négative = Kio, soit ~64 Mo
+    'temp_store': 'MEMORY',
+}
+
+if STOCKAGE_PROFIL == 'production':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': ';'.join(f'PRAGMA {nom}={valeur}' for nom, valeur in SQLITE_PRAGMAS_PRODUCTION.items()),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_PRAGMAS_PRODUCTION['busy_timeout'] / 1000,
+    }
+
+# Réplique pour les lectures analytiques (exports, indices d'items, statistiques
+# professeur), voir formation/replique.py ; les écritures restent sur 'default'.
+# BASE_ANALYTIQUE : second fichier SQLite (copie répliquée), ou URI en lecture seule
+# sur la base principale, p. ex. file:/chemin/db.sqlite3?mode=ro
+# En tests, la réplique est un miroir de la base de test principale.
+REPLIQUE_ANALYTIQUE_ALIAS = 'analytique'
+BASE_ANALYTIQUE = os.environ.get('BASE_ANALYTIQUE')
+if BASE_ANALYTIQUE:
+    DATABASES[REPLIQUE_ANALYTIQUE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_ANALYTIQUE,
+        'OPTIONS': {'timeout': SQLITE_PRAGMAS_PRODUCTION['busy_timeout'] / 1000},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['formation.replique.RouteurReplique']
+
+# Cache des seaux des limites d'appels IA, des verrous de coalescence et de génération
+# et des tops des classements. Par défaut en mémoire (un seul processus : runserver,
+# un worker) ; avec plusieurs processus, un cache partagé est nécessaire pour que les
+# limites par rôle et globales valent pour tout le site :
+# - CACHE_REDIS_URL (p. ex. redis://localhost:6379/0) : Redis (paquet redis requis)
+# - CACHE_BASE=True : table de la base, à créer une fois (python manage.py createcachetable)
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+CACHE_BASE = os.environ.get('CACHE_BASE', 'False') == 'True'
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+elif CACHE_BASE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_partage',
+            # Au-delà, Django supprime des entrées au hasard (dont des seaux entamés)
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -149,6 +223,88 @@ GROQ_API_KEY = os.environ.get('GROQ_API_KEY', None)
 # Alternatives: llama-3.1-8b-instant, mixtral-8x7b-32768
 GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.3-70b-versatile')
 
+# Modèle rapide, premier palier de la cascade des feedbacks
+GROQ_MODEL_RAPIDE = os.environ.get('GROQ_MODEL_RAPIDE', 'llama-3.1-8b-instant')
+
+# Cascade de modèles par opération (voir formation/modeles_ia.py) : le palier suivant
+# n'est appelé que si la réponse du précédent échoue à la validation
+MODELES_IA_GROQ = {
+    'feedback': [GROQ_MODEL_RAPIDE, GROQ_MODEL],
+    'quiz': [GROQ_MODEL],
+}
+
+# Classements : taille du top K mis en cache et durée de vie du cache (secondes)
+CLASSEMENT_TOP_K = int(os.environ.get('CLASSEMENT_TOP_K', 20))
+CLASSEMENT_CACHE_TIMEOUT = 300
+
+# Révision espacée : nombre maximum de questions par session
+REVISION_TAILLE_SESSION = 20
+
+# Tâches d'arrière-plan (badges, classements en cache) : taille du pool de threads
+# TACHES_SYNCHRONES = True exécute les tâches immédiatement (tests, débogage)
+TACHES_NB_THREADS = 2
+TACHES_SYNCHRONES = os.environ.get('TACHES_SYNCHRONES', 'False') == 'True'
+
+# Soumissions de quiz : attente maximale (secondes) d'une soumission en double
+# pendant que la première (feedbacks IA compris) est en cours
+SOUMISSION_DELAI_COALESCENCE = 120
+
+# Feedbacks IA différés : la soumission est corrigée et redirigée tout de suite,
+# les feedbacks personnalisés sont générés en arrière-plan (False : pendant la requête)
+FEEDBACKS_IA_DIFFERES = os.environ.get('FEEDBACKS_IA_DIFFERES', 'True') == 'True'
+
+# API JSON : taille de page par défaut et maximale (pagination par curseur)
+API_TAILLE_PAGE = 20
+API_TAILLE_PAGE_MAX = 100
+
+# Cache HTTP : durée (secondes) pendant laquelle les intermédiaires peuvent
+# servir une formation publique aux visiteurs anonymes sans revalidation
+CACHE_HTTP_DUREE_PUBLIQUE = 300
+
+# Prompts IA ancrés sur le cours (index BM25 des passages, voir formation/passages.py) :
+# nombre de passages et taille maximale (caractères) de l'extrait envoyé au modèle
+PASSAGES_NB_QUIZ = 8
+PASSAGES_LIMITE_QUIZ = 4000
+PASSAGES_NB_FEEDBACK = 3
+PASSAGES_LIMITE_FEEDBACK = 1500
+
+# Recherche plein texte (FTS5 sur SQLite, voir formation/recherche.py) : résultats par page
+RECHERCHE_TAILLE_PAGE = 20
+
+# Limites d'appels IA (seaux à jetons dans le cache, voir formation/limites.py) :
+# (capacité, jetons rendus par minute) par utilisateur et par rôle, puis pour tout
+# le site ; None désactive la limite. Coût en jetons de chaque type d'appel.
+LIMITES_IA_UTILISATEUR = {'STUDENT': (20, 10), 'TEACHER': (60, 30), 'ADMIN': None}
+LIMITES_IA_ROLE = {'STUDENT': (300, 150), 'TEACHER': (200, 100), 'ADMIN': None}
+LIMITES_IA_GLOBAL = (600, 300)
+COUTS_IA = {'feedback': 1, 'quiz': 5}
+
+# Budgets quotidiens de tokens IA (voir formation/budgets.py) : par formation et par
+# professeur (toutes ses formations). Estimation réservée avant chaque appel, usage
+# réel ensuite ; au-delà, génération refusée et feedbacks limités à l'explication stockée.
+BUDGET_IA_FORMATION_JOUR = int(os.environ.get('BUDGET_IA_FORMATION_JOUR', 200_000))
+BUDGET_IA_PROFESSEUR_JOUR = int(os.environ.get('BUDGET_IA_PROFESSEUR_JOUR', 500_000))
+
+# Génération de quiz : les demandes identiques simultanées partagent une seule génération
+# (voir formation/generation.py) ; au-delà de ce délai (secondes), une génération
+# toujours en cours est considérée comme abandonnée. None : durée au pire d'une
+# génération (appels x tentatives x timeout, pauses comprises) plus une marge
+GENERATION_QUIZ_DELAI = None
+# Appels au modèle pour une génération : le premier, puis des compléments qui ne
+# demandent que les questions manquantes (réponses invalides écartées)
+GENERATION_QUIZ_APPELS_MAX = 3
+
+# Profilage des requêtes (en-tête Server-Timing, journal JSON, profils cProfile)
+# PROFILAGE_TAUX_ECHANTILLON : part des requêtes profilées (0.0 à 1.0)
+# PROFILAGE_SEUIL_MS : profil écrit pour toute requête plus lente (None = désactivé)
+PROFILAGE_ACTIF = os.environ.get('PROFILAGE_ACTIF', str(DEBUG)) == 'True'
+PROFILAGE_TAUX_ECHANTILLON = float(os.environ.get('PROFILAGE_TAUX_ECHANTILLON', '0'))
+PROFILAGE_SEUIL_MS = int(os.environ['PROFILAGE_SEUIL_MS']) if os.environ.get('PROFILAGE_SEUIL_MS') else None
+PROFILAGE_REPERTOIRE = BASE_DIR / 'profils'
+if PROFILAGE_ACTIF:
+    # DjangoTemplates avec mesure du temps de rendu ; sans profilage, aucun surcoût au rendu
+    TEMPLATES[0]['BACKEND'] = 'formation.profilage.GabaritsMesures'
+
 # Authentication settings
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
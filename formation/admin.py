@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, StudentUser, Formation, Chapitre, QuizQuestion, QuizResult
+from .models import CustomUser, StudentUser, Formation, Chapitre, QuizQuestion, QuizResult, QuestionStatistique, ProgressionChapitre, ScoreFormation, EtatRevision, BadgeObtenu, PassageChapitre, GenerationQuiz, ConsommationIA, CompteurIA
 
 @admin.register(CustomUser)
 class CustomUserAdmin(admin.ModelAdmin):
@@ -20,4 +20,48 @@ class QuizQuestionAdmin(admin.ModelAdmin):
 
 @admin.register(QuizResult)
 class QuizResultAdmin(admin.ModelAdmin):
-    list_display = ('etudiant', 'chapitre', 'score', 'date_passage')
\ No newline at end of file
+    list_display = ('etudiant', 'chapitre', 'score', 'date_passage')
+
+@admin.register(QuestionStatistique)
+class QuestionStatistiqueAdmin(admin.ModelAdmin):
+    list_display = ('question', 'nb_passages', 'nb_correctes', 'indice_difficulte', 'indice_discrimination', 'efficacite_distracteurs')
+    readonly_fields = ('date_calcul',)
+
+@admin.register(ProgressionChapitre)
+class ProgressionChapitreAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'chapitre', 'nb_tentatives', 'meilleur_score', 'dernier_score', 'moyenne_mobile', 'date_derniere_tentative')
+
+@admin.register(ScoreFormation)
+class ScoreFormationAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'formation', 'points')
+    list_filter = ('formation',)
+
+@admin.register(EtatRevision)
+class EtatRevisionAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'question', 'repetitions', 'intervalle', 'facilite', 'date_echeance')
+    raw_id_fields = ('etudiant', 'question')
+
+@admin.register(BadgeObtenu)
+class BadgeObtenuAdmin(admin.ModelAdmin):
+    list_display = ('etudiant', 'code', 'date_obtention')
+    list_filter = ('code',)
+@admin.register(PassageChapitre)
+class PassageChapitreAdmin(admin.ModelAdmin):
+    list_display = ('chapitre', 'position', 'longueur')
+    raw_id_fields = ('chapitre',)
+@admin.register(GenerationQuiz)
+class GenerationQuizAdmin(admin.ModelAdmin):
+    list_display = ('cle', 'statut', 'createur', 'date_debut', 'date_fin')
+    list_filter = ('statut',)
+    raw_id_fields = ('chapitre', 'createur')
+@admin.register(ConsommationIA)
+class ConsommationIAAdmin(admin.ModelAdmin):
+    list_display = ('jour', 'formation', 'professeur', 'operation', 'modele', 'appels', 'tokens', 'tokens_estimes')
+    list_filter = ('jour', 'operation', 'modele')
+    raw_id_fields = ('formation', 'professeur')
+
+@admin.register(CompteurIA)
+class CompteurIAAdmin(admin.ModelAdmin):
+    list_display = ('jour', 'cle', 'valeur')
+    list_filter = ('jour',)
+    search_fields = ('cle',)
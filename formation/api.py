@@ -0,0 +1,306 @@
+"""
+API JSON versionnée (v1) pour le client mobile et les scripts
+- formations_api : Liste des formations (pagination par curseur)
+- chapitres_api : Chapitres d'une formation (pagination par curseur)
+- quiz_api : Questions d'un quiz, sans les bonnes réponses, et jeton de tentative
+- soumettre_quiz_api : Correction d'un quiz (même chaîne que quiz_detail_view)
+- resultat_api : Détail d'un résultat
+- recherche_api : Recherche plein texte (extraits surlignés en HTML)
+- quotas_api : Jetons d'appels IA disponibles et consommation du jour
+
+Les réponses sont compactes (JSON sans espaces, champs utiles uniquement) et
+compressées en gzip quand le client l'accepte. L'authentification est celle
+des sessions Django : les POST exigent le jeton CSRF, déposé en cookie par
+quiz_api.
+"""
+
+import base64
+import functools
+import json
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+
+from .models import Chapitre, Formation, QuizResult
+from . import limites, recherche, soumission
+
+logger = logging.getLogger(__name__)
+
+LETTRES = ('A', 'B', 'C', 'D')
+
+
+def _reponse(donnees, status=200):
+    """JsonResponse compacte (séparateurs sans espaces, UTF-8 brut)."""
+    return JsonResponse(
+        donnees,
+        status=status,
+        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False},
+    )
+
+
+def _erreur(message, status):
+    return _reponse({'erreur': message}, status=status)
+
+
+def _connexion_requise(vue):
+    """Équivalent de login_required pour l'API : 401 JSON au lieu d'une redirection."""
+    @functools.wraps(vue)
+    def enveloppe(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erreur("Authentification requise.", 401)
+        return vue(request, *args, **kwargs)
+    return enveloppe
+
+
+def _encoder_curseur(valeurs):
+    brut = json.dumps(valeurs, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip('=')
+
+
+def _decoder_curseur(curseur):
+    remplissage = '=' * (-len(curseur) % 4)
+    valeurs = json.loads(base64.urlsafe_b64decode(curseur + remplissage))
+    if not isinstance(valeurs, list):
+        raise ValueError("curseur invalide")
+    return valeurs
+
+
+def _paginer(request, queryset, champs_tri):
+    """
+    Pagination par curseur (keyset) sur `champs_tri`, tous croissants et dont le
+    dernier est unique : chaque page est une requête indexée WHERE (tri) > curseur
+    LIMIT n, sans OFFSET ni COUNT.
+
+    Returns:
+        Tuple (lignes, curseur_suivant) ; curseur_suivant vaut None en fin de liste
+
+    Raises:
+        ValueError: curseur ou limite invalide
+    """
+    taille_max = getattr(settings, 'API_TAILLE_PAGE_MAX', 100)
+    limite = int(request.GET.get('limite', getattr(settings, 'API_TAILLE_PAGE', 20)))
+    if limite < 1:
+        raise ValueError("limite invalide")
+    limite = min(limite, taille_max)
+
+    queryset = queryset.order_by(*champs_tri)
+    curseur = request.GET.get('curseur')
+    if curseur:
+        valeurs = _decoder_curseur(curseur)
+        if len(valeurs) != len(champs_tri):
+            raise ValueError("curseur invalide")
+        # (a, b) > (x, y)  <=>  a > x OU (a = x ET b > y)
+        condition = Q()
+        for index, champ in enumerate(champs_tri):
+            egalites = {champ_precedent: valeurs[i] for i, champ_precedent in enumerate(champs_tri[:index])}
+            condition |= Q(**egalites, **{f'{champ}__gt': valeurs[index]})
+        queryset = queryset.filter(condition)
+
+    lignes = list(queryset[:limite + 1])
+    suivant = None
+    if len(lignes) > limite:
+        lignes = lignes[:limite]
+        derniere = lignes[-1]
+        suivant = _encoder_curseur([derniere[champ] for champ in champs_tri])
+    return lignes, suivant
+
+
+@gzip_page
+@require_GET
+def formations_api(request):
+    """
+    GET /api/v1/formations/?limite=20&curseur=...
+    """
+    try:
+        lignes, suivant = _paginer(
+            request,
+            Formation.objects.values('id', 'titre', 'description', 'niveau', 'est_public'),
+            ('id',),
+        )
+    except (ValueError, TypeError):
+        return _erreur("Paramètres de pagination invalides.", 400)
+    return _reponse({'resultats': lignes, 'suivant': suivant})
+
+
+@gzip_page
+@require_GET
+def chapitres_api(request, formation_id):
+    """
+    GET /api/v1/formations/<formation_id>/chapitres/?limite=20&curseur=...
+    """
+    formation = get_object_or_404(Formation, id=formation_id)
+    try:
+        lignes, suivant = _paginer(
+            request,
+            Chapitre.objects.filter(formation=formation).values('id', 'titre', 'ordre'),
+            ('ordre', 'id'),
+        )
+    except (ValueError, TypeError):
+        return _erreur("Paramètres de pagination invalides.", 400)
+    return _reponse({'resultats': lignes, 'suivant': suivant})
+
+
+@gzip_page
+@require_GET
+@_connexion_requise
+@ensure_csrf_cookie
+def quiz_api(request, chapitre_id):
+    """
+    GET /api/v1/quiz/<chapitre_id>/
+
+    Questions sans bonne réponse ni explication, et jeton de tentative à
+    renvoyer avec la soumission.
+    """
+    chapitre = get_object_or_404(Chapitre, id=chapitre_id)
+    questions = chapitre.questions.order_by('id').values_list(
+        'id', 'question_texte', 'choix_A', 'choix_B', 'choix_C', 'choix_D'
+    )
+    return _reponse({
+        'chapitre': {'id': chapitre.id, 'titre': chapitre.titre},
+        'jeton': str(soumission.jeton_tentative(request.user, chapitre.id)),
+        'questions': [
+            {'id': question_id, 'texte': texte, 'choix': list(choix)}
+            for question_id, texte, *choix in questions
+        ],
+    })
+
+
+def _resultat_json(resultat, questions):
+    """Score et corrections des questions ratées d'un résultat."""
+    reponses = resultat.reponses_etudiant or {}
+    explications = resultat.explications_erreurs or {}
+    return {
+        'resultat': resultat.id,
+        'score': resultat.score,
+        'date': resultat.date_passage.isoformat(),
+        'reponses': reponses,
+        # Vrai tant que des feedbacks IA sont en cours de génération (explications provisoires)
+        'feedbacks_en_cours': resultat.feedbacks_en_cours,
+        'corrections': {
+            str(question_id): {'bonne_reponse': bonne_reponse, 'explication': explications.get(str(question_id), explication)}
+            for question_id, bonne_reponse, explication in questions
+            if reponses.get(str(question_id)) != bonne_reponse
+        },
+    }
+
+
+@gzip_page
+@require_POST
+@_connexion_requise
+def soumettre_quiz_api(request, chapitre_id):
+    """
+    POST /api/v1/quiz/<chapitre_id>/soumettre/
+    Corps : {"jeton": "...", "reponses": {"<question_id>": "A", ...}}
+
+    Même correction, mêmes feedbacks IA et même idempotence par jeton que
+    quiz_detail_view : un renvoi avec le même jeton retourne le premier résultat.
+    Statut 201 quand le résultat est créé, 200 pour un renvoi (résultat existant).
+    """
+    chapitre = get_object_or_404(Chapitre, id=chapitre_id)
+    try:
+        corps = json.loads(request.body or b'{}')
+        reponses = corps.get('reponses') or {}
+        if not isinstance(reponses, dict):
+            raise ValueError("reponses doit être un objet")
+    except (ValueError, AttributeError):
+        return _erreur("Corps JSON invalide.", 400)
+
+    questions = list(chapitre.questions.order_by('id'))
+    if not questions:
+        return _erreur("Aucune question disponible pour ce quiz.", 404)
+
+    reponses_brutes = {
+        str(question.id): reponses.get(str(question.id)) if reponses.get(str(question.id)) in LETTRES else None
+        for question in questions
+    }
+    jeton = soumission.lire_jeton(corps.get('jeton'))
+
+    try:
+        resultat, cree = soumission.soumettre_quiz(request.user, chapitre, questions, reponses_brutes, jeton)
+    except Exception as e:
+        logger.error(f"Erreur lors de la soumission du quiz (API) : {e}")
+        return _erreur("Erreur lors de la soumission.", 500)
+
+    return _reponse(
+        _resultat_json(resultat, [(q.id, q.bonne_reponse, q.explication) for q in questions]),
+        status=201 if cree else 200,
+    )
+
+
+@gzip_page
+@require_GET
+@_connexion_requise
+def resultat_api(request, result_id):
+    """
+    GET /api/v1/resultats/<result_id>/
+    """
+    resultat = get_object_or_404(QuizResult, id=result_id)
+    if request.user != resultat.etudiant and request.user.role != 'TEACHER':
+        return _erreur("Vous n'avez pas accès à ce résultat.", 403)
+    questions = resultat.chapitre.questions.order_by('id').values_list('id', 'bonne_reponse', 'explication')
+    return _reponse(_resultat_json(resultat, questions))
+
+
+@gzip_page
+@require_GET
+def recherche_api(request):
+    """
+    GET /api/v1/recherche/?q=...&type=chapitre&page=1&limite=20
+
+    `titre_html` et `extrait_html` sont du HTML échappé où seuls les termes
+    trouvés sont balisés (<mark>).
+    """
+    type_objet = request.GET.get('type') or None
+    try:
+        page = int(request.GET.get('page', 1))
+        limite = int(request.GET.get('limite', getattr(settings, 'RECHERCHE_TAILLE_PAGE', 20)))
+        if page < 1 or limite < 1:
+            raise ValueError("pagination invalide")
+        resultats, page_suivante = recherche.rechercher_page(
+            request.GET.get('q', ''),
+            type_objet,
+            page,
+            min(limite, getattr(settings, 'API_TAILLE_PAGE_MAX', 100)),
+        )
+    except ValueError:
+        return _erreur("Paramètres de recherche invalides.", 400)
+    return _reponse({
+        'resultats': [
+            {
+                'type': resultat['type'],
+                'id': resultat['id'],
+                'titre': resultat['titre'],
+                'titre_html': resultat['titre_html'],
+                'extrait_html': resultat['extrait_html'],
+                'contexte': resultat['contexte'],
+                'url': resultat['url'],
+                'score': resultat['score'],
+            }
+            for resultat in resultats
+        ],
+        'page_suivante': page + 1 if page_suivante else None,
+    })
+
+
+@require_GET
+@_connexion_requise
+def quotas_api(request):
+    """
+    GET /api/v1/quotas/            seaux et consommation du jour de l'utilisateur
+    GET /api/v1/quotas/?tous=1     compteurs du jour par utilisateur, rôle et global (staff)
+    """
+    if request.GET.get('tous'):
+        if not request.user.is_staff:
+            return _erreur("Réservé à l'équipe d'administration.", 403)
+        consommation = limites.consommation_du_jour()
+        consommation['utilisateurs'] = {
+            str(utilisateur_id): compteurs for utilisateur_id, compteurs in consommation['utilisateurs'].items()
+        }
+        return _reponse(consommation)
+    return _reponse(limites.etat(request.user.pk, request.user.role))
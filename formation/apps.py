@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class FormationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'formation'
+
+    def ready(self):
+        # Signaux qui avancent les tampons de version (ETag / Last-Modified)
+        from . import versions  # noqa: F401
+        # Réindexation des passages (BM25) à l'enregistrement d'un chapitre
+        from . import passages  # noqa: F401
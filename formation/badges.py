@@ -0,0 +1,146 @@
+"""
+Moteur de badges déclaratif
+- REGLES_BADGES : règles évaluées sur les agrégats matérialisés
+  (ProgressionChapitre, StudentUser.progression_globale)
+- evaluer_etudiant : attribution des badges d'un étudiant (4 requêtes au plus)
+- evaluer_tous : réévaluation de tous les étudiants en un parcours par source
+
+L'attribution passe par BadgeObtenu (unicité (etudiant, code)) et
+bulk_create(ignore_conflicts=True) : deux évaluations concurrentes ne
+peuvent ni perdre ni dupliquer un badge.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.db.models import Count, Q
+
+from .models import BadgeObtenu, ProgressionChapitre, StudentUser
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RegleBadge:
+    """
+    Badge obtenu quand au moins `minimum` lignes de la source vérifient `condition`.
+
+    source : 'progression' (lignes ProgressionChapitre de l'étudiant)
+             ou 'etudiant' (la ligne StudentUser elle-même)
+    """
+    code: str
+    description: str
+    source: str
+    condition: Q
+    minimum: int = 1
+
+
+REGLES_BADGES = [
+    RegleBadge('Débutant', "Au moins une bonne réponse à un quiz", 'progression', Q(meilleur_score__gt=0)),
+    RegleBadge('Excellent', "Score d'au moins 80% à un quiz", 'progression', Q(meilleur_score__gte=80)),
+    RegleBadge('Expert', "Score parfait à un quiz", 'progression', Q(meilleur_score=100)),
+    RegleBadge('Assidu', "Au moins 5 tentatives sur un même chapitre", 'progression', Q(nb_tentatives__gte=5)),
+    RegleBadge('Polyvalent', "Au moins 80% dans 3 chapitres différents", 'progression', Q(meilleur_score__gte=80), minimum=3),
+    RegleBadge('Centurion', "1000 points de progression", 'etudiant', Q(progression_globale__gte=1000)),
+]
+
+DESCRIPTIONS = {regle.code: regle.description for regle in REGLES_BADGES}
+
+
+def _sources():
+    """Queryset de base et champ étudiant de chaque source."""
+    return {
+        'progression': (ProgressionChapitre.objects.filter(etudiant__studentuser__isnull=False), 'etudiant_id'),
+        'etudiant': (StudentUser.objects.all(), 'pk'),
+    }
+
+
+def evaluer_etudiant(etudiant_id, regles=None):
+    """
+    Évalue les règles pour un étudiant et attribue les nouveaux badges.
+
+    Une requête d'agrégat par source (Count filtré par règle), seulement pour
+    les règles dont le badge n'est pas encore obtenu.
+
+    Returns:
+        Liste des codes nouvellement attribués
+    """
+    regles = REGLES_BADGES if regles is None else regles
+    deja_obtenus = set(BadgeObtenu.objects.filter(etudiant_id=etudiant_id).values_list('code', flat=True))
+    a_evaluer = [regle for regle in regles if regle.code not in deja_obtenus]
+    if not a_evaluer:
+        return []
+
+    nouveaux = []
+    for source, (queryset, champ_etudiant) in _sources().items():
+        regles_source = [regle for regle in a_evaluer if regle.source == source]
+        if not regles_source:
+            continue
+        comptes = queryset.filter(**{champ_etudiant: etudiant_id}).aggregate(**{
+            f'regle_{index}': Count('pk', filter=regle.condition)
+            for index, regle in enumerate(regles_source)
+        })
+        nouveaux += [
+            regle.code for index, regle in enumerate(regles_source)
+            if (comptes[f'regle_{index}'] or 0) >= regle.minimum
+        ]
+
+    if nouveaux:
+        BadgeObtenu.objects.bulk_create(
+            [BadgeObtenu(etudiant_id=etudiant_id, code=code) for code in nouveaux],
+            ignore_conflicts=True,
+        )
+        logger.info(f"Badges attribués à l'étudiant {etudiant_id} : {', '.join(nouveaux)}")
+    return nouveaux
+
+
+def evaluer_tous(regles=None, chunk_size=2000):
+    """
+    Réévalue toutes les règles pour tous les étudiants.
+
+    Un seul parcours groupé par source : GROUP BY étudiant avec un Count filtré
+    par règle, puis insertion par lots des badges manquants.
+
+    Returns:
+        Nombre de badges proposés à l'insertion (les doublons sont ignorés)
+    """
+    regles = REGLES_BADGES if regles is None else regles
+    nb_attribues = 0
+
+    for source, (queryset, champ_etudiant) in _sources().items():
+        regles_source = [regle for regle in regles if regle.source == source]
+        if not regles_source:
+            continue
+
+        lignes = (
+            queryset.order_by()
+            .values(champ_etudiant)
+            .annotate(**{
+                f'regle_{index}': Count('pk', filter=regle.condition)
+                for index, regle in enumerate(regles_source)
+            })
+            .iterator(chunk_size=chunk_size)
+        )
+
+        lot = []
+        for ligne in lignes:
+            for index, regle in enumerate(regles_source):
+                if ligne[f'regle_{index}'] >= regle.minimum:
+                    lot.append(BadgeObtenu(etudiant_id=ligne[champ_etudiant], code=regle.code))
+            if len(lot) >= chunk_size:
+                BadgeObtenu.objects.bulk_create(lot, ignore_conflicts=True)
+                nb_attribues += len(lot)
+                lot = []
+        if lot:
+            BadgeObtenu.objects.bulk_create(lot, ignore_conflicts=True)
+            nb_attribues += len(lot)
+
+    logger.info(f"Réévaluation des badges terminée : {nb_attribues} badge(s) vérifié(s)")
+    return nb_attribues
+
+
+def revoquer_obsoletes(regles=None):
+    """Supprime les badges dont le code ne correspond plus à aucune règle."""
+    regles = REGLES_BADGES if regles is None else regles
+    nb_supprimes, _ = BadgeObtenu.objects.exclude(code__in=[regle.code for regle in regles]).delete()
+    return nb_supprimes
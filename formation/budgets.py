@@ -0,0 +1,152 @@
+"""
+Budgets quotidiens de tokens IA par formation et par professeur
+- estimer_tokens / estimer_appel : estimation locale avant l'appel (sans tokenizer)
+- BudgetIADepasse : levée quand l'appel dépasserait un budget du jour
+- reserver : impute l'estimation au registre ConsommationIA et vérifie les budgets
+- reconcilier : remplace l'estimation par l'usage réel (response.usage)
+- annuler : libère la réservation d'un appel qui a échoué
+- consommation : tokens du jour par formation et par professeur, avec leur budget
+
+Chaque appel est imputé à la formation du chapitre concerné et à son
+professeur (créateur de la formation). L'estimation est réservée avant l'appel
+et les budgets vérifiés ensuite dans la même transaction : les appels en vol
+comptent déjà, et un appel refusé ne laisse aucune trace (annulation). Budgets :
+BUDGET_IA_FORMATION_JOUR et BUDGET_IA_PROFESSEUR_JOUR (None : illimité).
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Chapitre, ConsommationIA
+
+logger = logging.getLogger(__name__)
+
+# Caractères par token (texte français, tokenizers BPE des modèles Llama / GPT) :
+# estimation volontairement prudente, corrigée après l'appel par l'usage réel
+CARACTERES_PAR_TOKEN = 3.5
+TOKENS_PAR_MESSAGE = 4
+
+
+class BudgetIADepasse(Exception):
+    """Appel IA refusé : le budget du jour de `portee` ('formation', 'professeur') serait dépassé."""
+
+    def __init__(self, portee, consomme, budget, estimation):
+        self.portee = portee
+        self.consomme = consomme
+        self.budget = budget
+        self.estimation = estimation
+        super().__init__(
+            f"Budget IA quotidien ({portee}) atteint : {consomme} tokens consommés sur {budget}, "
+            f"appel estimé à {estimation}"
+        )
+
+
+@dataclass(frozen=True)
+class Imputation:
+    """Réservation d'un appel dans le registre : ligne ConsommationIA et tokens estimés."""
+    ligne_id: int
+    estimation: int
+
+
+def estimer_tokens(texte):
+    return math.ceil(len(texte or '') / CARACTERES_PAR_TOKEN)
+
+
+def estimer_appel(messages, max_tokens):
+    """Tokens d'un appel au pire : prompt estimé + réponse au plafond max_tokens."""
+    return sum(estimer_tokens(message['content']) + TOKENS_PAR_MESSAGE for message in messages) + max_tokens
+
+
+def _budgets():
+    return (
+        ('formation', 'formation_id', getattr(settings, 'BUDGET_IA_FORMATION_JOUR', None)),
+        ('professeur', 'professeur_id', getattr(settings, 'BUDGET_IA_PROFESSEUR_JOUR', None)),
+    )
+
+
+def reserver(operation, chapitre_id, modele, estimation):
+    """
+    Réserve `estimation` tokens pour un appel portant sur le chapitre.
+
+    Returns:
+        Imputation à passer à reconcilier / annuler, ou None si le chapitre
+        n'existe pas (appel non imputé)
+
+    Raises:
+        BudgetIADepasse: la réservation dépasserait un budget du jour
+    """
+    ligne = Chapitre.objects.filter(id=chapitre_id).values_list('formation_id', 'formation__createur_id').first()
+    if ligne is None:
+        return None
+    formation_id, professeur_id = ligne
+    ids = {'formation_id': formation_id, 'professeur_id': professeur_id}
+    jour = timezone.localdate()
+
+    with transaction.atomic():
+        consommation, _ = ConsommationIA.objects.get_or_create(
+            jour=jour, formation_id=formation_id, operation=operation, modele=modele,
+            defaults={'professeur_id': professeur_id},
+        )
+        ConsommationIA.objects.filter(id=consommation.id).update(tokens=F('tokens') + estimation)
+        # Vérification après réservation : les réservations concurrentes déjà écrites sont comptées
+        for portee, champ, budget in _budgets():
+            if budget is None:
+                continue
+            total = ConsommationIA.objects.filter(jour=jour, **{champ: ids[champ]}).aggregate(total=Sum('tokens'))['total']
+            if total > budget:
+                raise BudgetIADepasse(portee, total - estimation, budget, estimation)
+    return Imputation(consommation.id, estimation)
+
+
+def reconcilier(imputation, usage):
+    """Compte l'appel et remplace l'estimation par l'usage réel s'il est fourni."""
+    if imputation is None:
+        return
+    tokens_prompt = getattr(usage, 'prompt_tokens', None) or 0
+    tokens_completion = getattr(usage, 'completion_tokens', None) or 0
+    reel = getattr(usage, 'total_tokens', None) or (tokens_prompt + tokens_completion)
+    ConsommationIA.objects.filter(id=imputation.ligne_id).update(
+        appels=F('appels') + 1,
+        # Sans usage (fournisseur qui ne le renvoie pas), l'estimation reste imputée
+        tokens=F('tokens') + (reel - imputation.estimation if reel else 0),
+        tokens_estimes=F('tokens_estimes') + imputation.estimation,
+        tokens_prompt=F('tokens_prompt') + tokens_prompt,
+        tokens_completion=F('tokens_completion') + tokens_completion,
+    )
+    if reel:
+        logger.debug(f"Tokens : {imputation.estimation} estimés, {reel} consommés")
+
+
+def annuler(imputation):
+    """Libère la réservation d'un appel qui n'a pas abouti."""
+    if imputation is None:
+        return
+    ConsommationIA.objects.filter(id=imputation.ligne_id).update(tokens=F('tokens') - imputation.estimation)
+
+
+def consommation(jour=None):
+    """
+    Tokens consommés un jour donné (aujourd'hui par défaut).
+
+    Returns:
+        {'formations': [{'formation_id', 'formation__titre', 'tokens', 'appels', 'budget'}, ...],
+         'professeurs': [{'professeur_id', 'professeur__username', 'tokens', 'appels', 'budget'}, ...]}
+        triés par tokens décroissants
+    """
+    jour = jour or timezone.localdate()
+    lignes = ConsommationIA.objects.filter(jour=jour)
+    resultat = {}
+    for (portee, champ, budget), libelle in zip(_budgets(), ('formation__titre', 'professeur__username')):
+        resultat[f'{portee}s'] = [
+            {**ligne, 'budget': budget}
+            for ligne in lignes.values(champ, libelle)
+            .annotate(tokens=Sum('tokens'), appels=Sum('appels'))
+            .order_by('-tokens')
+        ]
+    return resultat
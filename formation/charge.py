@@ -0,0 +1,242 @@
+"""
+Test de charge hors ligne des parcours web du quiz
+- ServiceIAFactice : remplace ServiceIA (latence simulée, réponses fixes, aucun appel réseau)
+- ia_factice : active le service factice pendant un bloc
+- percentile : percentile au rang le plus proche
+- lancer : N étudiants simulés en parallèle parcourent accueil, formation,
+  quiz (GET puis POST) et page de résultat ; latences par route
+- comparer : écarts par rapport à un rapport de référence (régressions)
+
+Les requêtes passent par django.test.Client : routage, middlewares (dont le
+profilage), vues et gabarits réels, sans serveur HTTP ni réseau. Les écritures
+vont dans la base configurée ; lancer sur une copie ou une base de test
+peuplée avec `seed_data --formations ...`.
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .profilage import mesurer
+from . import generation, soumission, taches
+
+ROUTES = ('accueil', 'formation', 'quiz_get', 'quiz_post', 'resultat')
+
+# Métriques comparées à la référence : (nom, True si une hausse est une régression)
+METRIQUES_COMPAREES = (('p50_ms', True), ('p95_ms', True), ('p99_ms', True), ('debit', False))
+
+MOTIF_JETON = re.compile(r'name="jeton_tentative" value="([^"]*)"')
+
+
+class ServiceIAFactice:
+    """
+    Même interface que ServiceIA pour les vues et la soumission : attend
+    `latence_ms` (mesurée dans la catégorie 'llm') puis répond un texte fixe.
+    """
+
+    latence_ms = 0
+
+    def __init__(self, *args, **kwargs):
+        self.provider = 'factice'
+        self.model_name = 'factice'
+
+    def _attendre(self):
+        with mesurer('llm'):
+            time.sleep(self.latence_ms / 1000)
+
+    def generer_feedback(self, question, reponse_utilisateur, bonne_reponse):
+        self._attendre()
+        return f"La bonne réponse était {bonne_reponse}. Relisez le passage du cours correspondant."
+
+    def generer_feedbacks(self, elements):
+        self._attendre()
+        return {
+            question.id: f"La bonne réponse était {question.bonne_reponse}. Relisez le passage du cours correspondant."
+            for question, _ in elements
+        }
+
+    def generer_quiz(self, chapitre, nombre_questions=5, difficulte="Moyen"):
+        self._attendre()
+        return [
+            {
+                'question': f'Question factice {numero} sur {chapitre.titre} ?',
+                'choix': ['Réponse A', 'Réponse B', 'Réponse C', 'Réponse D'],
+                'bonne_reponse': numero % 4,
+                'explication': 'Explication factice.',
+            }
+            for numero in range(1, nombre_questions + 1)
+        ]
+
+
+@contextmanager
+def ia_factice(latence_ms=0):
+    """Remplace ServiceIA par ServiceIAFactice là où la génération et la soumission l'instancient."""
+    service = type('ServiceIAFactice', (ServiceIAFactice,), {'latence_ms': latence_ms})
+    with ExitStack() as pile:
+        pile.enter_context(mock.patch.object(soumission, 'ServiceIA', service))
+        pile.enter_context(mock.patch.object(generation, 'ServiceIA', service))
+        yield service
+
+
+def percentile(valeurs_triees, rang):
+    """Percentile `rang` (0-100) d'une liste triée, au rang le plus proche."""
+    if not valeurs_triees:
+        return 0.0
+    indice = max(0, min(len(valeurs_triees) - 1, -(-rang * len(valeurs_triees) // 100) - 1))
+    return valeurs_triees[indice]
+
+
+class _Etudiant:
+    """Un étudiant simulé : son client HTTP et ses mesures par route."""
+
+    def __init__(self, utilisateur, graine, hote):
+        self.client = Client(SERVER_NAME=hote)
+        self.client.force_login(utilisateur)
+        self.rng = random.Random(graine)
+        self.latences = {route: [] for route in ROUTES}
+        self.erreurs = {route: 0 for route in ROUTES}
+        self.derniere_erreur = None
+
+    def _requete(self, route, methode, url, statuts, **kwargs):
+        debut = time.perf_counter()
+        try:
+            reponse = getattr(self.client, methode)(url, **kwargs)
+        except Exception as e:
+            self.erreurs[route] += 1
+            self.derniere_erreur = f'{route} {url} : {e}'
+            return None
+        self.latences[route].append(time.perf_counter() - debut)
+        if reponse.status_code not in statuts:
+            self.erreurs[route] += 1
+            self.derniere_erreur = f'{route} {url} : HTTP {reponse.status_code}'
+            return None
+        return reponse
+
+    def parcourir(self, chapitre):
+        """Accueil, formation, quiz (affichage puis soumission), résultat."""
+        chapitre_id, formation_id, question_ids = chapitre
+        self._requete('accueil', 'get', reverse('home'), (200,))
+        self._requete('formation', 'get', reverse('formation_detail', args=[formation_id]), (200,))
+
+        page = self._requete('quiz_get', 'get', reverse('quiz_detail', args=[chapitre_id]), (200,))
+        if page is None:
+            return
+        jeton = MOTIF_JETON.search(page.content.decode())
+        donnees = {f'question_{question_id}': self.rng.choice('ABCD') for question_id in question_ids}
+        donnees['jeton_tentative'] = jeton.group(1) if jeton else ''
+
+        envoi = self._requete('quiz_post', 'post', reverse('quiz_detail', args=[chapitre_id]), (302,), data=donnees)
+        if envoi is None:
+            return
+        if not envoi.url.startswith('/resultat/'):
+            # Redirection vers une autre page : la soumission a échoué
+            self.erreurs['quiz_post'] += 1
+            self.derniere_erreur = f'quiz_post : redirigé vers {envoi.url}'
+            return
+        self._requete('resultat', 'get', envoi.url, (200,))
+
+
+def lancer(utilisateurs, chapitres, iterations=5, graine=42, hote='localhost', latence_ia_ms=0):
+    """
+    Lance un étudiant simulé par utilisateur, chacun dans son thread.
+
+    Args:
+        utilisateurs: Étudiants à connecter (un client chacun)
+        chapitres: [(chapitre_id, formation_id, [question_id, ...]), ...]
+        iterations: Parcours complets par étudiant
+        hote: Nom d'hôte des requêtes (doit être dans ALLOWED_HOSTS)
+        latence_ia_ms: Latence simulée de chaque appel IA
+
+    Returns:
+        Rapport (dictionnaire sérialisable en JSON)
+    """
+    etudiants = [_Etudiant(utilisateur, graine + index, hote) for index, utilisateur in enumerate(utilisateurs)]
+    depart = threading.Barrier(len(etudiants))
+
+    def simuler(etudiant):
+        depart.wait()
+        try:
+            for _ in range(iterations):
+                etudiant.parcourir(etudiant.rng.choice(chapitres))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=simuler, args=(etudiant,)) for etudiant in etudiants]
+    with ia_factice(latence_ia_ms):
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+        # Feedbacks IA différés encore en cours : toujours sur le service factice
+        taches.attendre(delai=60)
+
+    routes = {}
+    for route in ROUTES:
+        latences_ms = sorted(latence * 1000 for etudiant in etudiants for latence in etudiant.latences[route])
+        routes[route] = {
+            'requetes': len(latences_ms),
+            'erreurs': sum(etudiant.erreurs[route] for etudiant in etudiants),
+            'debit': round(len(latences_ms) / duree, 2) if duree else 0,
+            'moyenne_ms': round(sum(latences_ms) / len(latences_ms), 2) if latences_ms else 0,
+            'p50_ms': round(percentile(latences_ms, 50), 2),
+            'p95_ms': round(percentile(latences_ms, 95), 2),
+            'p99_ms': round(percentile(latences_ms, 99), 2),
+            'max_ms': round(latences_ms[-1], 2) if latences_ms else 0,
+        }
+
+    nb_requetes = sum(route['requetes'] for route in routes.values())
+    return {
+        'date': timezone.now().isoformat(),
+        'base': connection.vendor,
+        'parametres': {
+            'etudiants': len(etudiants),
+            'iterations': iterations,
+            'chapitres': len(chapitres),
+            'graine': graine,
+            'latence_ia_ms': latence_ia_ms,
+        },
+        'duree_s': round(duree, 2),
+        'requetes': nb_requetes,
+        'debit': round(nb_requetes / duree, 2) if duree else 0,
+        'routes': routes,
+        'exemples_erreurs': [etudiant.derniere_erreur for etudiant in etudiants if etudiant.derniere_erreur][:5],
+    }
+
+
+def comparer(rapport, reference, tolerance=0.2, marge_ms=5):
+    """
+    Régressions du rapport par rapport à la référence.
+
+    Une latence régresse si elle dépasse la référence de plus de `tolerance`
+    (relatif) et de plus de `marge_ms` (absolu, pour ignorer le bruit des
+    routes très rapides) ; un débit régresse s'il baisse de plus de `tolerance`.
+
+    Returns:
+        [(route, metrique, valeur_reference, valeur_actuelle), ...]
+    """
+    regressions = []
+    for route, mesures in rapport['routes'].items():
+        mesures_reference = reference.get('routes', {}).get(route)
+        if not mesures_reference or not mesures['requetes']:
+            continue
+        for metrique, hausse_mauvaise in METRIQUES_COMPAREES:
+            avant, apres = mesures_reference.get(metrique), mesures.get(metrique)
+            if not avant or apres is None:
+                continue
+            if hausse_mauvaise:
+                regression = apres > avant * (1 + tolerance) and apres - avant > marge_ms
+            else:
+                regression = apres < avant * (1 - tolerance)
+            if regression:
+                regressions.append((route, metrique, avant, apres))
+    return regressions
@@ -0,0 +1,226 @@
+"""
+Classements global et par formation
+- top_k : top K en cache (construit par une requête indexée ORDER BY ... LIMIT K)
+- ajouter_points : mise à jour atomique de la progression globale et du score par formation
+- rafraichir_tops : mise à jour incrémentale des tops K en cache
+- rang_etudiant : rang d'un étudiant par COUNT sur l'index (pas de parcours complet)
+- reconstruire_scores_formation : recalcul des scores par formation depuis les QuizResult
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import QuizQuestion, QuizResult, ScoreFormation, StudentUser
+
+logger = logging.getLogger(__name__)
+
+# Points gagnés par bonne réponse (voir quiz_detail_view)
+POINTS_PAR_BONNE_REPONSE = 10
+
+# Verrou des mises à jour d'un top en cache : durée de vie (secondes), essais et pause
+VERROU_TOP_DUREE = 5
+VERROU_TOP_ESSAIS = 20
+VERROU_TOP_PAUSE = 0.01
+
+
+def _taille_top():
+    return getattr(settings, 'CLASSEMENT_TOP_K', 20)
+
+
+def _cle_cache(formation_id=None):
+    return f'classement:formation:{formation_id}' if formation_id else 'classement:global'
+
+
+def _calculer_top(formation_id=None):
+    """Lit le top K en base via l'index (progression_globale ou (formation, points))."""
+    taille = _taille_top()
+    if formation_id:
+        lignes = (
+            ScoreFormation.objects.filter(formation_id=formation_id)
+            .order_by('-points', 'etudiant_id')
+            .values_list('etudiant_id', 'etudiant__username', 'points')[:taille]
+        )
+    else:
+        lignes = (
+            StudentUser.objects.order_by('-progression_globale', 'pk')
+            .values_list('pk', 'username', 'progression_globale')[:taille]
+        )
+    return [tuple(ligne) for ligne in lignes]
+
+
+def _prendre_verrou_top(cle):
+    """Verrou (cache.add) des écritures du top `cle` ; retourne sa clé, ou None s'il reste pris."""
+    cle_verrou = f'{cle}:verrou'
+    for _ in range(VERROU_TOP_ESSAIS):
+        if cache.add(cle_verrou, 1, timeout=VERROU_TOP_DUREE):
+            return cle_verrou
+        time.sleep(VERROU_TOP_PAUSE)
+    return None
+
+
+def top_k(formation_id=None):
+    """
+    Retourne le top K sous forme de liste de dictionnaires (rang, etudiant_id, username, points).
+    Le résultat est servi depuis le cache ; il n'est recalculé qu'en cas d'absence.
+
+    La reconstruction est mise en cache sous le verrou des mises à jour : une
+    lecture lente ne remplace pas un top modifié entre-temps. Sans verrou, le top
+    lu en base est retourné sans être mis en cache.
+    """
+    cle = _cle_cache(formation_id)
+    top = cache.get(cle)
+    if top is None:
+        cle_verrou = _prendre_verrou_top(cle)
+        try:
+            top = cache.get(cle) if cle_verrou else None
+            if top is None:
+                top = _calculer_top(formation_id)
+                if cle_verrou:
+                    cache.set(cle, top, getattr(settings, 'CLASSEMENT_CACHE_TIMEOUT', 300))
+        finally:
+            if cle_verrou:
+                cache.delete(cle_verrou)
+    return [
+        {'rang': rang, 'etudiant_id': etudiant_id, 'username': username, 'points': points}
+        for rang, (etudiant_id, username, points) in enumerate(top, start=1)
+    ]
+
+
+def _mettre_a_jour_top(cle, etudiant_id, username, points):
+    """
+    Applique un nouveau total au top K en cache, sans requête.
+
+    Les points ne font qu'augmenter : un étudiant hors du top n'y entre que
+    s'il dépasse le dernier, et une liste incomplète contient déjà tout le monde.
+    La lecture-modification-écriture est faite sous un verrou (cache.add) : deux
+    soumissions terminées en même temps ne s'écrasent pas. Sans verrou obtenu, le
+    top est supprimé et sera reconstruit depuis la base à la prochaine lecture.
+    """
+    cle_verrou = _prendre_verrou_top(cle)
+    if cle_verrou is None:
+        logger.warning(f"Verrou du top {cle} indisponible, top invalidé")
+        cache.delete(cle)
+        return
+
+    try:
+        top = cache.get(cle)
+        if top is None:
+            # Le top sera reconstruit à la prochaine lecture
+            return
+
+        taille = _taille_top()
+        present = any(entree[0] == etudiant_id for entree in top)
+        if not present and len(top) >= taille and points <= top[-1][2]:
+            return
+
+        top = [entree for entree in top if entree[0] != etudiant_id]
+        top.append((etudiant_id, username, points))
+        top.sort(key=lambda entree: (-entree[2], entree[0]))
+        cache.set(cle, top[:taille], getattr(settings, 'CLASSEMENT_CACHE_TIMEOUT', 300))
+    finally:
+        cache.delete(cle_verrou)
+
+
+def ajouter_points(etudiant_id, formation_id, points_gagnes):
+    """
+    Ajoute des points à un étudiant (progression globale et score de la formation).
+
+    Mises à jour conditionnelles par expressions F() : aucune lecture préalable,
+    pas de perte d'incrément entre soumissions concurrentes.
+    """
+    if points_gagnes <= 0:
+        return
+
+    StudentUser.objects.filter(pk=etudiant_id).update(progression_globale=F('progression_globale') + points_gagnes)
+
+    lignes = ScoreFormation.objects.filter(etudiant_id=etudiant_id, formation_id=formation_id).update(
+        points=F('points') + points_gagnes
+    )
+    if not lignes:
+        try:
+            with transaction.atomic():
+                ScoreFormation.objects.create(etudiant_id=etudiant_id, formation_id=formation_id, points=points_gagnes)
+        except IntegrityError:
+            ScoreFormation.objects.filter(etudiant_id=etudiant_id, formation_id=formation_id).update(
+                points=F('points') + points_gagnes
+            )
+
+
+def rafraichir_tops(etudiant_id, formation_id):
+    """
+    Reporte les totaux courants d'un étudiant dans les tops en cache (global et formation).
+    Lit les totaux en base : à appeler après commit, hors du chemin de la requête.
+    """
+    etudiant = StudentUser.objects.filter(pk=etudiant_id).values('username', 'progression_globale').first()
+    if etudiant is None:
+        return
+    points_formation = (
+        ScoreFormation.objects.filter(etudiant_id=etudiant_id, formation_id=formation_id)
+        .values_list('points', flat=True)
+        .first()
+    )
+    _mettre_a_jour_top(_cle_cache(), etudiant_id, etudiant['username'], etudiant['progression_globale'])
+    if points_formation is not None:
+        _mettre_a_jour_top(_cle_cache(formation_id), etudiant_id, etudiant['username'], points_formation)
+
+
+def rang_etudiant(etudiant, formation_id=None):
+    """
+    Rang d'un étudiant (1 = premier), ou None s'il n'a aucun point dans la formation.
+    COUNT sur la plage de l'index au-dessus de son score : pas de parcours de la table.
+    """
+    if formation_id:
+        points = (
+            ScoreFormation.objects.filter(etudiant=etudiant, formation_id=formation_id)
+            .values_list('points', flat=True)
+            .first()
+        )
+        if points is None:
+            return None
+        return ScoreFormation.objects.filter(formation_id=formation_id, points__gt=points).count() + 1
+
+    return StudentUser.objects.filter(progression_globale__gt=etudiant.progression_globale).count() + 1
+
+
+def reconstruire_scores_formation(chunk_size=2000):
+    """
+    Recalcule tous les ScoreFormation à partir des QuizResult des étudiants
+    (10 points par bonne réponse) et vide les tops en cache.
+
+    Returns:
+        Nombre de scores écrits
+    """
+    bonnes_reponses = dict(QuizQuestion.objects.values_list('id', 'bonne_reponse').iterator(chunk_size=chunk_size))
+    points = defaultdict(int)
+    resultats = (
+        QuizResult.objects.filter(etudiant__studentuser__isnull=False)
+        .order_by()
+        .values_list('etudiant_id', 'chapitre__formation_id', 'reponses_etudiant')
+        .iterator(chunk_size=chunk_size)
+    )
+    for etudiant_id, formation_id, reponses in resultats:
+        nb_bonnes = sum(
+            1 for question_id, reponse in (reponses or {}).items()
+            if reponse and bonnes_reponses.get(int(question_id)) == reponse
+        )
+        points[(etudiant_id, formation_id)] += nb_bonnes * POINTS_PAR_BONNE_REPONSE
+
+    scores = [
+        ScoreFormation(etudiant_id=etudiant_id, formation_id=formation_id, points=total)
+        for (etudiant_id, formation_id), total in points.items()
+        if total > 0
+    ]
+    with transaction.atomic():
+        ScoreFormation.objects.all().delete()
+        ScoreFormation.objects.bulk_create(scores, batch_size=chunk_size)
+
+    cache.delete(_cle_cache())
+    cache.delete_many([_cle_cache(formation_id) for formation_id in {score.formation_id for score in scores}])
+    logger.info(f"Scores par formation reconstruits : {len(scores)} couple(s) étudiant/formation")
+    return len(scores)
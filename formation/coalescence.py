@@ -0,0 +1,59 @@
+"""
+Coalescence des requêtes identiques en vol ("single-flight")
+- executer_une_seule_fois : un seul appelant (le meneur) exécute le calcul pour
+  une clé donnée ; les appelants concurrents attendent et réutilisent son résultat
+
+Le verrou est pris avec cache.add (atomique) : la coalescence couvre tous les
+processus qui partagent le même cache (fichier, Redis, Memcached), et au
+minimum les threads d'un même processus avec le cache local par défaut.
+"""
+
+import logging
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+INTERVALLE_ATTENTE = 0.1  # secondes entre deux vérifications
+
+
+def executer_une_seule_fois(cle, calculer, lire_resultat, delai=60):
+    """
+    Exécute `calculer()` une seule fois pour `cle` parmi les appels concurrents.
+
+    Args:
+        cle: Identifiant de l'opération (même clé = même opération)
+        calculer: Fonction exécutée par le meneur, retourne le résultat
+        lire_resultat: Fonction sans effet de bord qui retourne le résultat déjà
+            produit (par ex. lu en base) ou None s'il n'existe pas encore
+        delai: Durée maximale (secondes) du verrou et de l'attente des suiveurs
+
+    Returns:
+        Le résultat du meneur, ou celui retrouvé par lire_resultat
+    """
+    cle_verrou = f'vol-unique:{cle}'
+
+    if cache.add(cle_verrou, 'en_cours', timeout=delai):
+        try:
+            return calculer()
+        finally:
+            cache.delete(cle_verrou)
+
+    # Suiveur : on attend le résultat du meneur au lieu de refaire le travail
+    logger.info(f"Opération {cle} déjà en cours, attente du résultat")
+    echeance = time.monotonic() + delai
+    while time.monotonic() < echeance:
+        resultat = lire_resultat()
+        if resultat is not None:
+            return resultat
+        if cache.get(cle_verrou) is None:
+            # Le meneur a terminé sans résultat (échec) : on réessaie à sa place
+            break
+        time.sleep(INTERVALLE_ATTENTE)
+
+    resultat = lire_resultat()
+    if resultat is not None:
+        return resultat
+    logger.warning(f"Aucun résultat du meneur pour {cle}, exécution locale")
+    return calculer()
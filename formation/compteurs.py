@@ -0,0 +1,59 @@
+"""
+Compteurs journaliers des appels IA, en base (table CompteurIA)
+- incrementer : ajoute des valeurs aux compteurs du jour (un seul UPDATE par appel, création au besoin)
+- lire : valeurs de compteurs donnés
+- lire_prefixe : tous les compteurs du jour dont la clé commence par un préfixe
+
+Partagés par tous les processus et lisibles par les commandes de suivi
+(quotas_ia, rapport_modeles_ia), quel que soit le cache configuré. Le jour est
+celui du fuseau du site (timezone.localdate), comme pour budgets.py.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.utils import timezone
+
+from .models import CompteurIA
+
+
+def incrementer(deltas, jour=None):
+    """
+    Ajoute `delta` à chaque compteur {cle: delta} du jour.
+
+    Une seule transaction, et un seul UPDATE pour les compteurs déjà créés :
+    l'appel IA qui les alimente ne prend le verrou d'écriture SQLite qu'une fois.
+    """
+    if not deltas:
+        return
+    jour = jour or timezone.localdate()
+    with transaction.atomic():
+        existants = set(CompteurIA.objects.filter(jour=jour, cle__in=list(deltas)).values_list('cle', flat=True))
+        if existants:
+            CompteurIA.objects.filter(jour=jour, cle__in=existants).update(valeur=F('valeur') + Case(
+                *[When(cle=cle, then=Value(deltas[cle])) for cle in existants],
+                default=Value(0),
+                output_field=BigIntegerField(),
+            ))
+        for cle, delta in deltas.items():
+            if cle in existants:
+                continue
+            try:
+                with transaction.atomic():
+                    CompteurIA.objects.create(jour=jour, cle=cle, valeur=delta)
+            except IntegrityError:
+                # Créé entre-temps par un appel concurrent
+                CompteurIA.objects.filter(jour=jour, cle=cle).update(valeur=F('valeur') + delta)
+
+
+def lire(cles, jour=None):
+    """{cle: valeur} des compteurs existants parmi `cles`."""
+    jour = jour or timezone.localdate()
+    return dict(CompteurIA.objects.filter(jour=jour, cle__in=list(cles)).values_list('cle', 'valeur'))
+
+
+def lire_prefixe(prefixe, jour=None):
+    """{cle: valeur} des compteurs du jour dont la clé commence par `prefixe`, dans leur ordre de création."""
+    jour = jour or timezone.localdate()
+    return dict(
+        CompteurIA.objects.filter(jour=jour, cle__startswith=prefixe).order_by('id').values_list('cle', 'valeur')
+    )
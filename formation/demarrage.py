@@ -0,0 +1,122 @@
+"""
+Mesure du démarrage à froid d'un processus Django
+- SCRIPT : programme exécuté dans un interpréteur neuf (django.setup(), résolution
+  des URL, première requête) qui imprime ses mesures en JSON
+- mesurer_une_fois : lance SCRIPT dans un sous-processus
+- mesurer : plusieurs démarrages, médiane par phase
+- comparer : écarts par rapport à un rapport de référence (régressions)
+
+Chaque démarrage a lieu dans un nouveau processus (même interpréteur, mêmes
+settings et même PYTHONPATH) : les imports déjà faits par le processus qui
+mesure ne faussent pas le résultat. Le rapport indique aussi si le SDK IA a été
+chargé : il ne doit l'être qu'au premier appel IA.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+PHASES = ('interpreteur_ms', 'setup_ms', 'urls_ms', 'premiere_requete_ms', 'total_ms')
+
+# Modules lourds dont le chargement au démarrage est signalé
+MODULES_SURVEILLES = ('openai', 'httpx', 'pydantic')
+
+SCRIPT = '''
+import json, sys, time
+debut = time.perf_counter()
+import django
+django.setup()
+apres_setup = time.perf_counter()
+from django.urls import get_resolver, reverse
+get_resolver().url_patterns  # importe urls.py et toutes les vues
+apres_urls = time.perf_counter()
+from django.test import Client
+reponse = Client(SERVER_NAME=sys.argv[1]).get(reverse(sys.argv[2]))
+fin = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (apres_setup - debut) * 1000,
+    'urls_ms': (apres_urls - apres_setup) * 1000,
+    'premiere_requete_ms': (fin - apres_urls) * 1000,
+    'statut': reponse.status_code,
+    'modules': len(sys.modules),
+    'modules_charges': [nom for nom in sys.argv[3:] if nom in sys.modules],
+}))
+'''
+
+
+def mesurer_une_fois(hote='localhost', route='login'):
+    """
+    Démarre un interpréteur neuf et mesure ses phases de démarrage.
+
+    Returns:
+        Dictionnaire des mesures d'un démarrage (ms), dont 'interpreteur_ms'
+        (lancement de Python) et 'total_ms' (vu du processus parent)
+    """
+    debut = time.perf_counter()
+    resultat = subprocess.run(
+        [sys.executable, '-c', SCRIPT, hote, route, *MODULES_SURVEILLES],
+        capture_output=True,
+        text=True,
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        check=False,
+    )
+    total_ms = (time.perf_counter() - debut) * 1000
+    if resultat.returncode != 0:
+        raise RuntimeError(f"Démarrage en échec : {resultat.stderr.strip().splitlines()[-1:]}")
+    mesures = json.loads(resultat.stdout.strip().splitlines()[-1])
+    mesures['total_ms'] = total_ms
+    mesures['interpreteur_ms'] = total_ms - mesures['setup_ms'] - mesures['urls_ms'] - mesures['premiere_requete_ms']
+    return mesures
+
+
+def mesurer(repetitions=5, hote='localhost', route='login'):
+    """
+    Mesure `repetitions` démarrages à froid.
+
+    Returns:
+        Rapport (dictionnaire sérialisable en JSON) : médiane, minimum et
+        maximum de chaque phase, modules chargés
+    """
+    demarrages = [mesurer_une_fois(hote, route) for _ in range(repetitions)]
+    phases = {}
+    for phase in PHASES:
+        valeurs = [demarrage[phase] for demarrage in demarrages]
+        phases[phase] = {
+            'mediane': round(statistics.median(valeurs), 1),
+            'min': round(min(valeurs), 1),
+            'max': round(max(valeurs), 1),
+        }
+    return {
+        'date': timezone.now().isoformat(),
+        'python': sys.version.split()[0],
+        'parametres': {'repetitions': repetitions, 'route': route},
+        'phases': phases,
+        'statut': demarrages[-1]['statut'],
+        'modules': demarrages[-1]['modules'],
+        'modules_charges': demarrages[-1]['modules_charges'],
+    }
+
+
+def comparer(rapport, reference, tolerance=0.2, marge_ms=20):
+    """
+    Régressions du rapport par rapport à la référence : une phase régresse si sa
+    médiane dépasse celle de la référence de plus de `tolerance` (relatif) et de
+    plus de `marge_ms` (absolu, pour ignorer le bruit des phases très courtes).
+
+    Returns:
+        [(phase, mediane_reference, mediane_actuelle), ...]
+    """
+    regressions = []
+    for phase, mesures in rapport['phases'].items():
+        avant = reference.get('phases', {}).get(phase, {}).get('mediane')
+        apres = mesures['mediane']
+        if avant and apres > avant * (1 + tolerance) and apres - avant > marge_ms:
+            regressions.append((phase, avant, apres))
+    return regressions
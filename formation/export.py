@@ -0,0 +1,143 @@
+"""
+Export en flux des résultats de quiz (CSV ou JSONL)
+- resultats_a_exporter : QuizResult filtrés (professeur, formation, chapitre, dates)
+- lignes_csv : une ligne par (résultat, question), reponses_etudiant aplati
+- lignes_jsonl : un objet JSON par résultat, réponses détaillées par question
+
+Les résultats sont lus avec iterator(chunk_size=...) et produits ligne par
+ligne : la mémoire ne dépend pas du nombre de résultats. Seule la table des
+bonnes réponses des chapitres rencontrés est gardée (une requête par chapitre).
+Utilisé par export_resultats_view (StreamingHttpResponse) et la commande
+exporter_resultats. Les lectures sont servies par la réplique analytique si elle
+est configurée (voir replique.py).
+"""
+
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import QuizQuestion, QuizResult
+from . import replique
+
+COLONNES_CSV = [
+    'resultat_id', 'date_passage', 'etudiant_id', 'etudiant', 'formation_id', 'formation',
+    'chapitre_id', 'chapitre', 'score', 'question_id', 'reponse', 'bonne_reponse', 'correcte',
+]
+
+CHAMPS_RESULTAT = (
+    'id', 'date_passage', 'etudiant_id', 'etudiant__username', 'chapitre__formation_id',
+    'chapitre__formation__titre', 'chapitre_id', 'chapitre__titre', 'score', 'reponses_etudiant',
+)
+
+
+def lire_date(valeur):
+    """Date ISO (AAAA-MM-JJ) ou None ; ValueError si mal formée."""
+    return datetime.strptime(valeur, '%Y-%m-%d').date() if valeur else None
+
+
+def resultats_a_exporter(professeur=None, formation_id=None, chapitre_id=None, debut=None, fin=None):
+    """
+    QuizResult à exporter.
+
+    Args:
+        professeur: Limite aux formations créées par cet utilisateur (None = toutes)
+        formation_id, chapitre_id: Filtres facultatifs
+        debut, fin: Dates incluses (date_passage entre debut 00:00 et fin 23:59:59)
+
+    Les bornes sont converties en instants pour rester sur l'index (chapitre, date_passage).
+    """
+    resultats = replique.analytique(QuizResult).all()
+    if professeur is not None:
+        resultats = resultats.filter(chapitre__formation__createur=professeur)
+    if formation_id:
+        resultats = resultats.filter(chapitre__formation_id=formation_id)
+    if chapitre_id:
+        resultats = resultats.filter(chapitre_id=chapitre_id)
+    if debut:
+        resultats = resultats.filter(date_passage__gte=timezone.make_aware(datetime.combine(debut, time.min)))
+    if fin:
+        resultats = resultats.filter(date_passage__lt=timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min)))
+    return resultats.order_by('id')
+
+
+def _resultats_detailles(resultats, chunk_size):
+    """
+    (champs du résultat, [(question_id, reponse, bonne_reponse, correcte), ...]) par résultat.
+
+    Les questions sont celles présentées lors du passage (clés de reponses_etudiant,
+    non répondues comprises), dans l'ordre d'affichage ; une question supprimée
+    depuis reste exportée sans bonne réponse.
+    """
+    bonnes_reponses = {}  # chapitre_id -> {question_id (str): bonne_reponse}
+    for valeurs in resultats.values_list(*CHAMPS_RESULTAT).iterator(chunk_size=chunk_size):
+        resultat = dict(zip(CHAMPS_RESULTAT, valeurs))
+        chapitre_id = resultat['chapitre_id']
+        if chapitre_id not in bonnes_reponses:
+            bonnes_reponses[chapitre_id] = {
+                str(question_id): bonne_reponse
+                for question_id, bonne_reponse in
+                replique.analytique(QuizQuestion).filter(chapitre_id=chapitre_id).order_by('id').values_list('id', 'bonne_reponse')
+            }
+        corrige = bonnes_reponses[chapitre_id]
+        reponses = resultat['reponses_etudiant'] or {}
+
+        details = []
+        for question_id in sorted(reponses, key=lambda cle: (len(cle), cle)):
+            reponse = reponses.get(question_id)
+            bonne_reponse = corrige.get(question_id)
+            details.append((question_id, reponse, bonne_reponse, reponse is not None and reponse == bonne_reponse))
+        yield resultat, details
+
+
+class _Tampon:
+    """Pseudo-fichier pour csv.writer : retourne la ligne au lieu de l'écrire."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def lignes_csv(resultats, chunk_size=2000, bom=True):
+    """
+    Lignes CSV (chaînes) : en-tête puis une ligne par (résultat, question).
+    Le BOM UTF-8 permet aux tableurs d'ouvrir les accents correctement.
+    """
+    ecrivain = csv.writer(_Tampon())
+    yield ('\ufeff' if bom else '') + ecrivain.writerow(COLONNES_CSV)
+    for resultat, details in _resultats_detailles(resultats, chunk_size):
+        debut_ligne = [
+            resultat['id'], resultat['date_passage'].isoformat(), resultat['etudiant_id'],
+            resultat['etudiant__username'], resultat['chapitre__formation_id'],
+            resultat['chapitre__formation__titre'], resultat['chapitre_id'], resultat['chapitre__titre'],
+            resultat['score'],
+        ]
+        for question_id, reponse, bonne_reponse, correcte in details:
+            yield ecrivain.writerow(debut_ligne + [question_id, reponse or '', bonne_reponse or '', int(correcte)])
+
+
+def lignes_jsonl(resultats, chunk_size=2000):
+    """Lignes JSONL : un objet par résultat, avec la liste des réponses par question."""
+    for resultat, details in _resultats_detailles(resultats, chunk_size):
+        objet = {
+            'resultat_id': resultat['id'],
+            'date_passage': resultat['date_passage'].isoformat(),
+            'etudiant_id': resultat['etudiant_id'],
+            'etudiant': resultat['etudiant__username'],
+            'formation_id': resultat['chapitre__formation_id'],
+            'formation': resultat['chapitre__formation__titre'],
+            'chapitre_id': resultat['chapitre_id'],
+            'chapitre': resultat['chapitre__titre'],
+            'score': resultat['score'],
+            'reponses': [
+                {'question_id': int(question_id), 'reponse': reponse, 'bonne_reponse': bonne_reponse, 'correcte': correcte}
+                for question_id, reponse, bonne_reponse, correcte in details
+            ],
+        }
+        yield json.dumps(objet, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+FORMATS = {
+    'csv': (lignes_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (lignes_jsonl, 'application/x-ndjson; charset=utf-8'),
+}
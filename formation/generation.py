@@ -0,0 +1,181 @@
+"""
+Génération de quiz par l'IA, une seule fois par demande identique ("single-flight")
+- cle_generation : chapitre et paramètres qui identifient une génération
+- generer_quiz : génère et enregistre les questions d'un chapitre ; les demandes
+  identiques concurrentes attendent la génération en vol et partagent ses questions
+
+Le verrou est la ligne GenerationQuiz EN_COURS de la clé (contrainte d'unicité
+partielle) : contrairement à coalescence.py, qui s'appuie sur le cache, il vaut
+pour tous les processus qui partagent la base, y compris avec le cache local par
+défaut. Une génération EN_COURS plus ancienne que delai_abandon() est
+considérée comme abandonnée (processus arrêté) et reprise par un suiveur. Si
+le meneur déclaré abandonné termine malgré tout, ses questions sont annulées :
+seule la reprise enregistre les siennes.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import GenerationQuiz, QuizQuestion
+from .services import TENTATIVES_DEFAUT, TIMEOUT_DEFAUT, ServiceIA
+from . import limites, versions
+
+logger = logging.getLogger(__name__)
+
+INTERVALLE_ATTENTE = 0.25  # secondes entre deux lectures de la génération en vol
+MARGE_ABANDON = 60  # secondes ajoutées à la durée au pire d'une génération
+LETTRES = ['A', 'B', 'C', 'D']
+
+
+def cle_generation(chapitre_id, nombre_questions, difficulte):
+    return f'{chapitre_id}:{nombre_questions}:{difficulte}'
+
+
+def delai_abandon():
+    """
+    Âge (secondes) au-delà duquel une génération EN_COURS est considérée comme
+    abandonnée : GENERATION_QUIZ_DELAI s'il est défini, sinon la durée au pire
+    d'un meneur (GENERATION_QUIZ_APPELS_MAX appels de TENTATIVES_DEFAUT
+    tentatives au timeout, pauses comprises) plus MARGE_ABANDON.
+    """
+    delai = getattr(settings, 'GENERATION_QUIZ_DELAI', None)
+    if delai is not None:
+        return delai
+    pauses = sum(2 ** tentative for tentative in range(1, TENTATIVES_DEFAUT))
+    par_appel = TENTATIVES_DEFAUT * TIMEOUT_DEFAUT + pauses
+    return getattr(settings, 'GENERATION_QUIZ_APPELS_MAX', 3) * par_appel + MARGE_ABANDON
+
+
+def _prendre_verrou(cle, chapitre, nombre_questions, difficulte, createur):
+    """Crée la génération EN_COURS de la clé, ou None si une autre est déjà en vol."""
+    try:
+        with transaction.atomic():
+            return GenerationQuiz.objects.create(
+                cle=cle,
+                chapitre=chapitre,
+                createur=createur,
+                nombre_questions=nombre_questions,
+                difficulte=difficulte,
+            )
+    except IntegrityError:
+        return None
+
+
+def _executer(generation, chapitre, createur):
+    """
+    Appel IA et création des questions par le meneur ; la génération est close dans tous les cas.
+
+    Returns:
+        Questions créées, ou None si la génération a été déclarée abandonnée et
+        reprise entre-temps (ses questions sont alors annulées)
+    """
+    try:
+        limites.consommer(createur.pk, createur.role, 'quiz')
+        donnees_questions = ServiceIA().generer_quiz(
+            chapitre=chapitre,
+            nombre_questions=generation.nombre_questions,
+            difficulte=generation.difficulte,
+        )
+        with transaction.atomic():
+            questions = QuizQuestion.objects.bulk_create([
+                QuizQuestion(
+                    question_texte=data['question'],
+                    choix_A=data['choix'][0],
+                    choix_B=data['choix'][1],
+                    choix_C=data['choix'][2],
+                    choix_D=data['choix'][3],
+                    # Conversion de l'index (0-3) en lettre (A-D)
+                    bonne_reponse=LETTRES[data['bonne_reponse']],
+                    explication=data['explication'],
+                    chapitre=chapitre,
+                    createur=createur,
+                    generee_ia=True,
+                )
+                for data in donnees_questions
+            ])
+            terminee = GenerationQuiz.objects.filter(id=generation.id, statut='EN_COURS').update(
+                statut='TERMINEE',
+                question_ids=[question.id for question in questions],
+                date_fin=timezone.now(),
+            )
+            if not terminee:
+                # Reprise par un suiveur pendant l'appel : ses questions font foi, pas de doublons
+                transaction.set_rollback(True)
+                logger.warning(f"Génération {generation.cle} reprise pendant l'appel, questions annulées")
+                return None
+            # bulk_create n'émet pas post_save : on avance nous-mêmes les tampons de version
+            versions.marquer_chapitres_modifies([chapitre.id])
+        return questions
+    except BaseException:
+        GenerationQuiz.objects.filter(id=generation.id, statut='EN_COURS').update(statut='ECHEC', date_fin=timezone.now())
+        raise
+
+
+def _attendre(cle, depuis, echeance, delai):
+    """
+    Attend la génération en vol de la clé (ou terminée depuis `depuis`).
+
+    Returns:
+        Ids des questions créées, ou None si la génération a échoué ou a été
+        abandonnée (l'appelant tente alors de la reprendre)
+    """
+    while time.monotonic() < echeance:
+        generation = GenerationQuiz.objects.filter(cle=cle, statut='EN_COURS').first()
+        if generation is None:
+            # Terminée entre-temps : réussie (questions partagées) ou non
+            derniere = GenerationQuiz.objects.filter(cle=cle, date_fin__gte=depuis).order_by('-date_fin').first()
+            return derniere.question_ids if derniere and derniere.statut == 'TERMINEE' else None
+        if generation.date_debut < timezone.now() - timedelta(seconds=delai):
+            logger.warning(f"Génération {cle} abandonnée depuis {generation.date_debut}, reprise")
+            GenerationQuiz.objects.filter(id=generation.id, statut='EN_COURS').update(
+                statut='ECHEC', date_fin=timezone.now()
+            )
+            return None
+        time.sleep(INTERVALLE_ATTENTE)
+    raise TimeoutError(f"La génération {cle} en cours n'a pas abouti à temps")
+
+
+def generer_quiz(chapitre, nombre_questions, difficulte, createur):
+    """
+    Génère `nombre_questions` questions pour le chapitre, au plus une fois pour
+    des demandes identiques simultanées.
+
+    Le meneur débite les limites d'appels IA de `createur`, appelle le modèle et
+    crée les questions ; les suiveurs attendent et retournent les mêmes questions.
+    Si le meneur échoue, un suiveur retente la génération à sa place.
+
+    Args:
+        chapitre: Chapitre du quiz
+        nombre_questions: Nombre de questions demandées
+        difficulte: 'Facile', 'Moyen' ou 'Difficile'
+        createur: Utilisateur à l'origine de la demande
+
+    Returns:
+        (questions créées, True si elles viennent d'une génération concurrente)
+
+    Raises:
+        limites.LimiteIAAtteinte, erreurs du ServiceIA, TimeoutError
+    """
+    cle = cle_generation(chapitre.id, nombre_questions, difficulte)
+    delai = delai_abandon()
+    depuis = timezone.now()
+    echeance = time.monotonic() + delai
+
+    while True:
+        generation = _prendre_verrou(cle, chapitre, nombre_questions, difficulte, createur)
+        if generation is not None:
+            questions = _executer(generation, chapitre, createur)
+            if questions is not None:
+                return questions, False
+            # Déclarée abandonnée et reprise : on attend la reprise comme un suiveur
+            echeance = time.monotonic() + delai
+
+        logger.info(f"Génération {cle} déjà en cours, attente de ses questions")
+        question_ids = _attendre(cle, depuis, echeance, delai)
+        if question_ids is not None:
+            return list(QuizQuestion.objects.filter(id__in=question_ids).order_by('id')), True
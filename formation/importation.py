@@ -0,0 +1,347 @@
+"""
+Import en flux de contenus de cours (Formation, Chapitre)
+- lire_jsonl : un enregistrement JSON par ligne
+- lire_markdown : '# Formation', '## Chapitre', texte du chapitre jusqu'au titre suivant
+- lire_booleen : valeur booléenne d'un enregistrement (est_public), stricte
+- Importeur : écriture par lots (bulk_create, UPDATE en executemany), upsert par clé naturelle
+
+Les fichiers sont lus ligne à ligne (éventuellement compressés en .gz) et les
+chapitres écrits par lots dans une transaction par lot : la mémoire ne dépend
+que de la taille du lot, pas de la taille du fichier.
+
+Clés naturelles : Formation.titre, et (formation, titre) pour Chapitre.
+Un chapitre sans ordre prend sa position dans le fichier au sein de sa formation.
+
+Format JSONL :
+    {"type": "formation", "titre": "...", "description": "...", "niveau": "...", "est_public": true, "createur": "prof"}
+    {"type": "chapitre", "formation": "<titre de la formation>", "titre": "...", "ordre": 1, "contenu": "..."}
+"""
+
+import gzip
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection, reset_queries, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Chapitre, CustomUser, Formation
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'erreurs détaillées conservées dans le bilan (les suivantes sont seulement comptées)
+ERREURS_CONSERVEES = 100
+
+
+class ErreurImport(ValueError):
+    """Enregistrement invalide (ligne ignorée et comptée)."""
+
+
+# Valeurs texte acceptées pour un booléen (est_public), en plus de true / false JSON
+BOOLEENS_TEXTE = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def lire_booleen(cle, valeur):
+    """Booléen JSON, 0 / 1, ou texte 'true' / 'false' / '1' / '0' ; ErreurImport sinon."""
+    if isinstance(valeur, bool):
+        return valeur
+    if isinstance(valeur, int) and valeur in (0, 1):
+        return bool(valeur)
+    if isinstance(valeur, str) and valeur.strip().lower() in BOOLEENS_TEXTE:
+        return BOOLEENS_TEXTE[valeur.strip().lower()]
+    raise ErreurImport(f"{cle} invalide : {valeur!r} (true ou false attendu)")
+
+
+@dataclass
+class BilanImport:
+    formations_creees: int = 0
+    formations_mises_a_jour: int = 0
+    chapitres_crees: int = 0
+    chapitres_mis_a_jour: int = 0
+    chapitres_ignores: int = 0
+    nb_erreurs: int = 0
+    erreurs: list = field(default_factory=list)  # [(numero_ligne, message)], tronquée
+    duree: float = 0.0
+
+    @property
+    def nb_lignes(self):
+        return (
+            self.formations_creees + self.formations_mises_a_jour
+            + self.chapitres_crees + self.chapitres_mis_a_jour + self.chapitres_ignores
+        )
+
+    @property
+    def lignes_par_seconde(self):
+        return self.nb_lignes / self.duree if self.duree else 0.0
+
+
+def ouvrir(chemin):
+    """Ouvre un fichier texte UTF-8, décompressé à la volée s'il finit par .gz."""
+    if str(chemin).endswith('.gz'):
+        return gzip.open(chemin, 'rt', encoding='utf-8')
+    return open(chemin, 'r', encoding='utf-8')
+
+
+def lire_jsonl(lignes):
+    """
+    Enregistrements d'un flux JSONL. Le type est déduit s'il est absent :
+    un enregistrement avec une clé 'formation' est un chapitre.
+
+    Yields:
+        (numero_ligne, enregistrement) ; enregistrement est une ErreurImport si la ligne est invalide
+    """
+    for numero, ligne in enumerate(lignes, start=1):
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        try:
+            enregistrement = json.loads(ligne)
+            if not isinstance(enregistrement, dict):
+                raise ErreurImport("objet JSON attendu")
+        except (ValueError, ErreurImport) as e:
+            yield numero, ErreurImport(f"JSON invalide : {e}")
+            continue
+        enregistrement.setdefault('type', 'chapitre' if 'formation' in enregistrement else 'formation')
+        yield numero, enregistrement
+
+
+def lire_markdown(lignes):
+    """
+    Enregistrements d'un flux Markdown :
+        # Titre de formation
+        Description (texte avant le premier chapitre)
+        ## Titre de chapitre
+        Contenu du chapitre...
+
+    Seul le texte du chapitre en cours est gardé en mémoire.
+    """
+    formation = None
+    en_cours = None  # (numero, type, titre, lignes de texte)
+
+    def terminer(bloc):
+        numero, type_bloc, titre, texte = bloc
+        contenu = '\n'.join(texte).strip()
+        if type_bloc == 'formation':
+            return numero, {'type': 'formation', 'titre': titre, 'description': contenu}
+        return numero, {'type': 'chapitre', 'formation': formation, 'titre': titre, 'contenu': contenu}
+
+    for numero, ligne in enumerate(lignes, start=1):
+        ligne = ligne.rstrip('\n')
+        if ligne.startswith('# ') or ligne.startswith('## '):
+            if en_cours:
+                yield terminer(en_cours)
+            niveau, titre = ligne.split(' ', 1)
+            titre = titre.strip()
+            if niveau == '#':
+                formation = titre
+                en_cours = (numero, 'formation', titre, [])
+            elif formation is None:
+                yield numero, ErreurImport("chapitre sans formation ('# Titre' attendu avant)")
+                en_cours = None
+            else:
+                en_cours = (numero, 'chapitre', titre, [])
+        elif en_cours:
+            en_cours[3].append(ligne)
+    if en_cours:
+        yield terminer(en_cours)
+
+
+class Importeur:
+    """
+    Écrit un flux d'enregistrements en base.
+
+    Les formations (peu nombreuses) sont écrites au fil de l'eau et leur id
+    gardé en mémoire par titre ; les chapitres sont accumulés en lots de
+    `taille_lot` puis écrits en une transaction (une lecture des clés
+    existantes, un bulk_create, un bulk_update).
+    """
+
+    CHAMPS_CHAPITRE = ('contenu_texte', 'ordre')
+
+    def __init__(self, createur=None, taille_lot=1000, mise_a_jour=True, rapport=None):
+        self.createur = createur
+        self.taille_lot = taille_lot
+        self.mise_a_jour = mise_a_jour
+        self.rapport = rapport
+        self.bilan = BilanImport()
+        self._formations = {}  # titre -> id
+        self._ordres = {}      # formation_id -> dernier ordre attribué (quand l'ordre est absent)
+        self._lot = {}         # (formation_id, titre) -> champs du chapitre
+        self._createurs = {}   # username -> id
+        self._debut = None
+
+    def importer(self, enregistrements):
+        self._debut = time.perf_counter()
+        for numero, enregistrement in enregistrements:
+            try:
+                if isinstance(enregistrement, ErreurImport):
+                    raise enregistrement
+                if enregistrement.get('type') == 'formation':
+                    self._formation(enregistrement)
+                elif enregistrement.get('type') == 'chapitre':
+                    self._chapitre(enregistrement)
+                else:
+                    raise ErreurImport(f"type inconnu : {enregistrement.get('type')!r}")
+            except ErreurImport as e:
+                self.bilan.nb_erreurs += 1
+                if len(self.bilan.erreurs) < ERREURS_CONSERVEES:
+                    self.bilan.erreurs.append((numero, str(e)))
+            if len(self._lot) >= self.taille_lot:
+                self._ecrire_lot()
+        self._ecrire_lot()
+        self.bilan.duree = time.perf_counter() - self._debut
+        logger.info(
+            f"Import terminé : {self.bilan.nb_lignes} enregistrement(s) en {self.bilan.duree:.1f}s, "
+            f"{self.bilan.nb_erreurs} erreur(s)"
+        )
+        return self.bilan
+
+    def _id_createur(self, username):
+        if not username:
+            if self.createur is None:
+                raise ErreurImport("créateur manquant (clé 'createur' ou option --createur)")
+            return self.createur.id
+        if username not in self._createurs:
+            createur_id = CustomUser.objects.filter(username=username).values_list('id', flat=True).first()
+            if createur_id is None:
+                raise ErreurImport(f"créateur inconnu : {username}")
+            self._createurs[username] = createur_id
+        return self._createurs[username]
+
+    def _id_formation(self, titre):
+        if titre not in self._formations:
+            formation_id = Formation.objects.filter(titre=titre).order_by('id').values_list('id', flat=True).first()
+            if formation_id is None:
+                return None
+            self._formations[titre] = formation_id
+        return self._formations[titre]
+
+    def _formation(self, enregistrement):
+        titre = (enregistrement.get('titre') or '').strip()
+        if not titre:
+            raise ErreurImport("formation sans titre")
+        champs = {
+            cle: enregistrement[cle]
+            for cle in ('description', 'niveau', 'est_public')
+            if enregistrement.get(cle) is not None
+        }
+        if 'est_public' in champs:
+            champs['est_public'] = lire_booleen('est_public', champs['est_public'])
+
+        formation_id = self._id_formation(titre)
+        if formation_id is None:
+            formation = Formation.objects.create(
+                titre=titre,
+                description=champs.get('description', ''),
+                niveau=champs.get('niveau', ''),
+                est_public=champs.get('est_public', False),
+                createur_id=self._id_createur(enregistrement.get('createur')),
+            )
+            self._formations[titre] = formation.id
+            self.bilan.formations_creees += 1
+        elif self.mise_a_jour and champs:
+            if enregistrement.get('createur'):
+                champs['createur_id'] = self._id_createur(enregistrement['createur'])
+            Formation.objects.filter(id=formation_id).update(**champs)
+            versions.marquer_formations_modifiees([formation_id])
+            self.bilan.formations_mises_a_jour += 1
+
+    def _chapitre(self, enregistrement):
+        titre = (enregistrement.get('titre') or '').strip()
+        if not titre:
+            raise ErreurImport("chapitre sans titre")
+        formation_id = self._id_formation(enregistrement.get('formation'))
+        if formation_id is None:
+            raise ErreurImport(f"formation inconnue : {enregistrement.get('formation')!r}")
+
+        ordre = enregistrement.get('ordre')
+        if ordre is None:
+            ordre = self._ordres.get(formation_id, 0) + 1
+        try:
+            ordre = int(ordre)
+        except (TypeError, ValueError):
+            raise ErreurImport(f"ordre invalide : {ordre!r}")
+        self._ordres[formation_id] = max(self._ordres.get(formation_id, 0), ordre)
+
+        # Doublon dans le même lot : le dernier enregistrement l'emporte
+        self._lot[(formation_id, titre)] = {
+            'contenu_texte': enregistrement.get('contenu') or enregistrement.get('contenu_texte') or '',
+            'ordre': ordre,
+        }
+
+    def _mettre_a_jour_chapitres(self, modifications):
+        """
+        Réécrit les chapitres modifiés et avance leur tampon de version.
+
+        Un UPDATE paramétré exécuté en executemany : bulk_update construit un
+        CASE par champ et par ligne, plusieurs fois plus lent sur de gros lots.
+        """
+        table = connection.ops.quote_name(Chapitre._meta.db_table)
+        colonnes = ', '.join(
+            f'{connection.ops.quote_name(Chapitre._meta.get_field(champ).column)} = %s'
+            for champ in self.CHAMPS_CHAPITRE
+        )
+        maintenant = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as curseur:
+            curseur.executemany(
+                f'UPDATE {table} SET {colonnes}, version = version + 1, date_modification = %s WHERE id = %s',
+                [
+                    [*(champs[champ] for champ in self.CHAMPS_CHAPITRE), maintenant, chapitre_id]
+                    for chapitre_id, champs in modifications
+                ],
+            )
+
+    def _ecrire_lot(self):
+        if not self._lot:
+            return
+        lot, self._lot = self._lot, {}
+
+        condition = Q()
+        titres_par_formation = {}
+        for formation_id, titre in lot:
+            titres_par_formation.setdefault(formation_id, []).append(titre)
+        for formation_id, titres in titres_par_formation.items():
+            condition |= Q(formation_id=formation_id, titre__in=titres)
+
+        with transaction.atomic():
+            existants = {
+                (formation_id, titre): (chapitre_id, dict(zip(self.CHAMPS_CHAPITRE, valeurs)))
+                for chapitre_id, formation_id, titre, *valeurs in
+                Chapitre.objects.filter(condition).values_list('id', 'formation_id', 'titre', *self.CHAMPS_CHAPITRE)
+            }
+
+            nouveaux = [
+                Chapitre(formation_id=formation_id, titre=titre, **champs)
+                for (formation_id, titre), champs in lot.items()
+                if (formation_id, titre) not in existants
+            ]
+            Chapitre.objects.bulk_create(nouveaux, batch_size=self.taille_lot)
+            self.bilan.chapitres_crees += len(nouveaux)
+
+            # Chapitres existants : seuls ceux dont le contenu change sont réécrits
+            modifies = []
+            if self.mise_a_jour:
+                modifies = [
+                    (cle, champs) for cle, champs in lot.items()
+                    if cle in existants and existants[cle][1] != champs
+                ]
+            if modifies:
+                self._mettre_a_jour_chapitres([(existants[cle][0], champs) for cle, champs in modifies])
+            self.bilan.chapitres_mis_a_jour += len(modifies)
+            self.bilan.chapitres_ignores += len(lot) - len(nouveaux) - len(modifies)
+
+            # Écritures en masse sans signaux : les pages des formations concernées changent
+            formations_modifiees = {chapitre.formation_id for chapitre in nouveaux}
+            formations_modifiees |= {formation_id for (formation_id, _), _ in modifies}
+            if formations_modifiees:
+                versions.marquer_formations_modifiees(formations_modifiees)
+
+        # Avec DEBUG, Django garde chaque requête SQL (et ses gros INSERT) en mémoire
+        reset_queries()
+
+        if self.rapport:
+            duree = time.perf_counter() - self._debut
+            self.rapport(self.bilan, duree)
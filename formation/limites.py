@@ -0,0 +1,211 @@
+"""
+Limitation du débit des appels IA (seaux à jetons partagés par le cache)
+- LimiteIAAtteinte : levée quand un seau n'a plus assez de jetons
+- seaux : seaux contrôlés pour un utilisateur (le sien, celui de son rôle, le global)
+- consommer : prélève `cout` jetons dans tous ses seaux, ou aucun
+- etat : jetons disponibles et consommation du jour d'un utilisateur
+- consommation_du_jour : compteurs du jour par utilisateur, par rôle et global
+
+Chaque seau a une capacité (rafale maximale) et un débit de remplissage
+(jetons par minute). Son état (jetons, horodatage) est stocké dans le cache
+(CACHES, voir settings.py) : avec un cache partagé (Redis, table de la base),
+les seaux du rôle et global valent pour le site entier ; avec le cache mémoire
+par défaut, pour chaque processus. La lecture-
+modification-écriture est protégée par un verrou cache.add par seau ; un verrou
+introuvable après VERROU_ATTENTE laisse passer l'appel plutôt que de bloquer.
+Les compteurs du jour (appels, jetons, refus) sont en base (compteurs.py).
+
+Capacités et débits : LIMITES_IA_UTILISATEUR et LIMITES_IA_ROLE (par rôle),
+LIMITES_IA_GLOBAL ; coût de chaque appel : COUTS_IA. Une limite à None est
+désactivée.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import compteurs
+
+logger = logging.getLogger(__name__)
+
+PREFIXE = 'limites-ia'
+VERROU_DUREE = 2  # secondes, au-delà le verrou d'un processus arrêté expire
+VERROU_ATTENTE = 0.5
+INTERVALLE_ATTENTE = 0.01
+NATURES = ('appels', 'jetons', 'refus')
+
+LIMITES_UTILISATEUR_PAR_DEFAUT = {'STUDENT': (20, 10), 'TEACHER': (60, 30), 'ADMIN': None}
+LIMITES_ROLE_PAR_DEFAUT = {'STUDENT': (300, 150), 'TEACHER': (200, 100), 'ADMIN': None}
+LIMITE_GLOBALE_PAR_DEFAUT = (600, 300)
+COUTS_PAR_DEFAUT = {'feedback': 1, 'quiz': 5}
+
+
+class LimiteIAAtteinte(Exception):
+    """Appel IA refusé : `portee` ('utilisateur', 'role', 'global') est épuisée pour `reessayer_dans` secondes."""
+
+    def __init__(self, portee, reessayer_dans):
+        self.portee = portee
+        self.reessayer_dans = reessayer_dans
+        super().__init__(f"Limite d'appels IA atteinte ({portee}), réessayer dans {reessayer_dans} s")
+
+
+def cout(action):
+    """Nombre de jetons d'un appel IA ('feedback', 'quiz')."""
+    return getattr(settings, 'COUTS_IA', COUTS_PAR_DEFAUT).get(action, 1)
+
+
+def seaux(utilisateur_id, role):
+    """
+    Seaux contrôlés pour un appel de cet utilisateur.
+
+    Returns:
+        [(portee, identifiant, capacite, jetons_par_minute), ...] sans les limites désactivées
+    """
+    limites = [
+        ('utilisateur', utilisateur_id,
+         getattr(settings, 'LIMITES_IA_UTILISATEUR', LIMITES_UTILISATEUR_PAR_DEFAUT).get(role)),
+        ('role', role, getattr(settings, 'LIMITES_IA_ROLE', LIMITES_ROLE_PAR_DEFAUT).get(role)),
+        ('global', 'tous', getattr(settings, 'LIMITES_IA_GLOBAL', LIMITE_GLOBALE_PAR_DEFAUT)),
+    ]
+    return [(portee, identifiant, *limite) for portee, identifiant, limite in limites if limite]
+
+
+def _cle(portee, identifiant):
+    return f'{PREFIXE}:seau:{portee}:{identifiant}'
+
+
+def _cle_compteur(portee, identifiant, nature):
+    return f'{PREFIXE}:{nature}:{portee}:{identifiant}'
+
+
+def _remplir(etat, capacite, par_minute, maintenant):
+    """Jetons disponibles à `maintenant` (un seau absent du cache est plein)."""
+    if etat is None:
+        return float(capacite)
+    jetons, horodatage = etat
+    return min(float(capacite), jetons + max(0.0, maintenant - horodatage) * par_minute / 60)
+
+
+def _verrouiller(cle):
+    fin = time.monotonic() + VERROU_ATTENTE
+    while not cache.add(f'{cle}:verrou', 1, timeout=VERROU_DUREE):
+        if time.monotonic() >= fin:
+            logger.warning(f"Verrou {cle} indisponible, seau lu sans verrou")
+            return False
+        time.sleep(INTERVALLE_ATTENTE)
+    return True
+
+
+def _compter(limites, valeurs, utilisateur_id):
+    """Ajoute `valeurs` ({nature: delta}) aux compteurs du jour de chaque seau et de l'utilisateur."""
+    portees = [(portee, identifiant) for portee, identifiant, *_ in limites]
+    if ('utilisateur', utilisateur_id) not in portees:
+        portees.append(('utilisateur', utilisateur_id))
+    compteurs.incrementer({
+        _cle_compteur(portee, identifiant, nature): delta
+        for portee, identifiant in portees
+        for nature, delta in valeurs.items()
+    })
+
+
+def consommer(utilisateur_id, role, action='feedback'):
+    """
+    Prélève le coût de `action` dans chaque seau de l'utilisateur, ou dans
+    aucun si l'un d'eux est insuffisant (l'appel refusé ne consomme rien).
+
+    Raises:
+        LimiteIAAtteinte: au moins un seau n'a pas assez de jetons
+    """
+    jetons_requis = cout(action)
+    limites = seaux(utilisateur_id, role)
+    cles = [_cle(portee, identifiant) for portee, identifiant, *_ in limites]
+    # Ordre fixe de prise des verrous : pas d'interblocage entre appels concurrents
+    verrous = [cle for cle in sorted(cles) if _verrouiller(cle)]
+    refus = None
+    try:
+        maintenant = time.time()
+        etats = cache.get_many(cles)
+        disponibles = []
+        for (portee, identifiant, capacite, par_minute), cle in zip(limites, cles):
+            jetons = _remplir(etats.get(cle), capacite, par_minute, maintenant)
+            if jetons < jetons_requis:
+                manque = min(jetons_requis, capacite) - jetons
+                refus = LimiteIAAtteinte(portee, max(1, round(manque * 60 / par_minute)))
+                break
+            disponibles.append(jetons)
+
+        if refus is None:
+            # Au-delà de cette durée, chaque seau est de nouveau plein : inutile de garder son état
+            duree = max((round(capacite * 60 / par_minute) + 1 for _, _, capacite, par_minute in limites), default=60)
+            cache.set_many(
+                {cle: (jetons - jetons_requis, maintenant) for cle, jetons in zip(cles, disponibles)},
+                timeout=duree,
+            )
+    finally:
+        for cle in verrous:
+            cache.delete(f'{cle}:verrou')
+
+    # Compteurs du jour écrits hors des verrous
+    if refus is not None:
+        _compter(limites, {'refus': 1}, utilisateur_id)
+        raise refus
+    _compter(limites, {'jetons': jetons_requis, 'appels': 1}, utilisateur_id)
+
+
+def etat(utilisateur_id, role):
+    """
+    Jetons disponibles dans chaque seau de l'utilisateur et sa consommation du jour.
+
+    Returns:
+        {'seaux': [{'portee', 'capacite', 'jetons_par_minute', 'disponibles'}, ...],
+         'aujourd_hui': {'appels', 'jetons', 'refus'}}
+    """
+    limites = seaux(utilisateur_id, role)
+    etats = cache.get_many([_cle(portee, identifiant) for portee, identifiant, *_ in limites])
+    maintenant = time.time()
+    return {
+        'seaux': [
+            {
+                'portee': portee,
+                'capacite': capacite,
+                'jetons_par_minute': par_minute,
+                'disponibles': int(_remplir(etats.get(_cle(portee, identifiant)), capacite, par_minute, maintenant)),
+            }
+            for portee, identifiant, capacite, par_minute in limites
+        ],
+        'aujourd_hui': _compteurs(compteurs.lire(
+            [_cle_compteur('utilisateur', utilisateur_id, nature) for nature in NATURES]
+        ), 'utilisateur', utilisateur_id),
+    }
+
+
+def _compteurs(valeurs, portee, identifiant):
+    return {nature: valeurs.get(_cle_compteur(portee, identifiant, nature), 0) for nature in NATURES}
+
+
+def consommation_du_jour(jour=None):
+    """
+    Compteurs d'appels IA du jour (aujourd'hui par défaut).
+
+    Returns:
+        {'global': {...}, 'roles': {role: {...}}, 'utilisateurs': {utilisateur_id: {...}}}
+        où chaque {...} vaut {'appels', 'jetons', 'refus'}
+    """
+    from .models import CustomUser
+
+    valeurs = compteurs.lire_prefixe(f'{PREFIXE}:', jour)
+    # Utilisateurs actifs du jour : ceux qui ont au moins un compteur
+    utilisateurs = {
+        int(cle.rsplit(':', 1)[1]) for cle in valeurs
+        if cle.split(':')[2] == 'utilisateur'
+    }
+    return {
+        'global': _compteurs(valeurs, 'global', 'tous'),
+        'roles': {role: _compteurs(valeurs, 'role', role) for role, _ in CustomUser.ROLE_CHOICES},
+        'utilisateurs': {
+            utilisateur_id: _compteurs(valeurs, 'utilisateur', utilisateur_id)
+            for utilisateur_id in sorted(utilisateurs)
+        },
+    }
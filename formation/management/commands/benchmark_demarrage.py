@@ -0,0 +1,72 @@
+"""
+Commande Django pour mesurer le démarrage à froid d'un worker.
+Usage: python manage.py benchmark_demarrage [--repetitions 5] [--route login]
+                                            [--sortie demarrage.json] [--reference demarrage.json]
+
+Mesure, dans des interpréteurs neufs : lancement de Python, django.setup(),
+résolution des URL (import de toutes les vues) et première requête. Suivi :
+    python manage.py benchmark_demarrage --sortie reference_demarrage.json
+    ... modifications ...
+    python manage.py benchmark_demarrage --reference reference_demarrage.json
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formation import demarrage
+
+
+class Command(BaseCommand):
+    help = 'Mesure le démarrage à froid (setup, URL, première requête) et signale les modules lourds chargés'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=5, help='Démarrages mesurés (défaut: 5)')
+        parser.add_argument('--route', default='login', help='Nom de la route de la première requête (défaut: login)')
+        parser.add_argument('--hote', default='localhost', help='Nom d\'hôte des requêtes, dans ALLOWED_HOSTS (défaut: localhost)')
+        parser.add_argument('--sortie', help='Écrit le rapport JSON dans ce fichier')
+        parser.add_argument('--reference', help='Rapport JSON de référence à comparer')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Écart relatif toléré avant de signaler une régression (défaut: 0.2)',
+        )
+
+    def handle(self, *args, **options):
+        reference = None
+        if options['reference']:
+            try:
+                with open(options['reference'], encoding='utf-8') as fichier:
+                    reference = json.load(fichier)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Référence illisible : {e}")
+
+        try:
+            rapport = demarrage.mesurer(options['repetitions'], options['hote'], options['route'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'\n{"phase":<22} {"médiane":>9} {"min":>9} {"max":>9}')
+        for phase, mesures in rapport['phases'].items():
+            self.stdout.write(
+                f'{phase:<22} {mesures["mediane"]:>9.1f} {mesures["min"]:>9.1f} {mesures["max"]:>9.1f}'
+            )
+        self.stdout.write(f'\n{rapport["modules"]} modules chargés, première requête HTTP {rapport["statut"]}')
+        if rapport['modules_charges']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Chargés au démarrage alors qu\'aucun appel IA n\'a eu lieu : {", ".join(rapport["modules_charges"])}'
+            ))
+
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                json.dump(rapport, fichier, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'✅ Rapport écrit dans {options["sortie"]}'))
+
+        if reference is not None:
+            regressions = demarrage.comparer(rapport, reference, options['tolerance'])
+            if regressions:
+                for phase, avant, apres in regressions:
+                    self.stdout.write(self.style.ERROR(f'❌ {phase} : {avant} → {apres} ms'))
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["reference"]}')
+            self.stdout.write(self.style.SUCCESS(f'✅ Aucune régression par rapport à {options["reference"]}'))
@@ -0,0 +1,139 @@
+"""
+Commande Django pour le test de charge des parcours web du quiz (IA factice).
+Usage: python manage.py benchmark_parcours [--etudiants 20] [--iterations 5] [--latence-ia 50]
+                                           [--sortie rapport.json] [--reference reference.json]
+
+Sur une base peuplée (par ex. seed_data --formations 20 --etudiants 2000 --resultats 200000) :
+    python manage.py benchmark_parcours --sortie reference.json
+    ... modifications ...
+    python manage.py benchmark_parcours --reference reference.json
+"""
+
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from formation import charge
+from formation.models import Chapitre, CustomUser, QuizQuestion, StudentUser
+
+
+PREFIXE = 'charge_'
+
+
+class Command(BaseCommand):
+    help = 'Test de charge : étudiants simulés concurrents sur les routes du quiz, latences p50/p95/p99 par route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etudiants', type=int, default=20, help='Étudiants simulés concurrents (défaut: 20)')
+        parser.add_argument('--iterations', type=int, default=5, help='Parcours complets par étudiant (défaut: 5)')
+        parser.add_argument('--chapitres', type=int, default=20, help='Chapitres tirés parmi ceux qui ont des questions (défaut: 20)')
+        parser.add_argument('--latence-ia', type=int, default=50, help='Latence simulée d\'un appel IA en ms (défaut: 50)')
+        parser.add_argument('--graine', type=int, default=42, help='Graine aléatoire (défaut: 42)')
+        parser.add_argument('--hote', default='localhost', help='Nom d\'hôte des requêtes, dans ALLOWED_HOSTS (défaut: localhost)')
+        parser.add_argument('--sortie', help='Écrit le rapport JSON dans ce fichier')
+        parser.add_argument('--reference', help='Rapport JSON de référence à comparer')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Écart relatif toléré avant de signaler une régression (défaut: 0.2)',
+        )
+        parser.add_argument(
+            '--conserver',
+            action='store_true',
+            help='Conserve les étudiants simulés et leurs résultats au lieu de les supprimer',
+        )
+
+    def handle(self, *args, **options):
+        reference = None
+        if options['reference']:
+            try:
+                with open(options['reference'], encoding='utf-8') as fichier:
+                    reference = json.load(fichier)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Référence illisible : {e}")
+
+        chapitres = self.choisir_chapitres(options['chapitres'], options['graine'])
+        if not chapitres:
+            raise CommandError("Aucun chapitre avec des questions : peuplez la base (seed_data --formations ...)")
+
+        utilisateurs = self.etudiants(options['etudiants'])
+        self.stdout.write(self.style.WARNING(
+            f'{len(utilisateurs)} étudiant(s) × {options["iterations"]} parcours sur {len(chapitres)} chapitre(s), '
+            f'IA factice {options["latence_ia"]} ms...'
+        ))
+        try:
+            rapport = charge.lancer(
+                utilisateurs,
+                chapitres,
+                iterations=options['iterations'],
+                graine=options['graine'],
+                hote=options['hote'],
+                latence_ia_ms=options['latence_ia'],
+            )
+        finally:
+            if not options['conserver']:
+                self.nettoyer()
+
+        self.afficher(rapport)
+
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                json.dump(rapport, fichier, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'✅ Rapport écrit dans {options["sortie"]}'))
+
+        if reference is not None:
+            regressions = charge.comparer(rapport, reference, options['tolerance'])
+            if regressions:
+                for route, metrique, avant, apres in regressions:
+                    self.stdout.write(self.style.ERROR(f'❌ {route} {metrique} : {avant} → {apres}'))
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["reference"]}')
+            self.stdout.write(self.style.SUCCESS(f'✅ Aucune régression par rapport à {options["reference"]}'))
+
+    def choisir_chapitres(self, nombre, graine):
+        """Tire `nombre` chapitres qui ont des questions : [(chapitre_id, formation_id, [question_id, ...])]."""
+        candidats = list(
+            Chapitre.objects.annotate(nb_questions=Count('questions'))
+            .filter(nb_questions__gt=0)
+            .order_by('id')
+            .values_list('id', 'formation_id')
+        )
+        candidats = random.Random(graine).sample(candidats, min(nombre, len(candidats)))
+        questions = {}
+        for chapitre_id, question_id in (
+            QuizQuestion.objects.filter(chapitre_id__in=[chapitre_id for chapitre_id, _ in candidats])
+            .order_by('id')
+            .values_list('chapitre_id', 'id')
+        ):
+            questions.setdefault(chapitre_id, []).append(question_id)
+        return [(chapitre_id, formation_id, questions[chapitre_id]) for chapitre_id, formation_id in candidats]
+
+    def etudiants(self, nombre):
+        """Retourne `nombre` étudiants simulés, créés si besoin."""
+        utilisateurs = []
+        for index in range(nombre):
+            username = f'{PREFIXE}etudiant_{index}'
+            if not StudentUser.objects.filter(username=username).exists():
+                StudentUser.objects.create(username=username, role='STUDENT')
+            utilisateurs.append(CustomUser.objects.get(username=username))
+        return utilisateurs
+
+    def afficher(self, rapport):
+        self.stdout.write(
+            f'\n{"route":<10} {"requêtes":>9} {"erreurs":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}'
+        )
+        for route, mesures in rapport['routes'].items():
+            self.stdout.write(
+                f'{route:<10} {mesures["requetes"]:>9} {mesures["erreurs"]:>8} {mesures["debit"]:>8.1f} '
+                f'{mesures["p50_ms"]:>8.1f} {mesures["p95_ms"]:>8.1f} {mesures["p99_ms"]:>8.1f} {mesures["max_ms"]:>8.1f}'
+            )
+        self.stdout.write(f'\n⏱️  {rapport["requetes"]} requête(s) en {rapport["duree_s"]}s ({rapport["debit"]:.1f} req/s)')
+        for erreur in rapport['exemples_erreurs']:
+            self.stdout.write(self.style.WARNING(f'   {erreur}'))
+
+    def nettoyer(self):
+        """Supprime les étudiants simulés (cascade sur leurs résultats et progressions)."""
+        CustomUser.objects.filter(username__startswith=PREFIXE).delete()
+        self.stdout.write('Étudiants simulés supprimés.')
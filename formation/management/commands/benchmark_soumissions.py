@@ -0,0 +1,166 @@
+"""
+Commande Django pour mesurer le débit de soumissions de quiz sous N écrivains concurrents.
+Usage: python manage.py benchmark_soumissions [--ecrivains 1 4 8] [--soumissions 50]
+
+Comparer les profils de stockage :
+    STOCKAGE_PROFIL=defaut python manage.py benchmark_soumissions
+    STOCKAGE_PROFIL=production python manage.py benchmark_soumissions
+"""
+
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+from formation.models import CustomUser, StudentUser, Formation, Chapitre, QuizQuestion
+from formation import soumission
+
+
+PREFIXE = 'benchmark_'
+
+
+class Command(BaseCommand):
+    help = 'Mesure les soumissions par seconde avec N écrivains concurrents (sans appel IA)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ecrivains',
+            type=int,
+            nargs='+',
+            default=[1, 4, 8],
+            help='Nombres d\'écrivains concurrents à tester (défaut: 1 4 8)',
+        )
+        parser.add_argument(
+            '--soumissions',
+            type=int,
+            default=50,
+            help='Nombre de soumissions par écrivain (défaut: 50)',
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=10,
+            help='Nombre de questions du quiz de test (défaut: 10)',
+        )
+        parser.add_argument(
+            '--conserver',
+            action='store_true',
+            help='Conserve les données de test au lieu de les supprimer',
+        )
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Profil de stockage : {getattr(settings, "STOCKAGE_PROFIL", "defaut")} (journal_mode={journal_mode})'
+        ))
+
+        chapitre, questions = self.creer_quiz(options['questions'])
+        try:
+            for nb_ecrivains in options['ecrivains']:
+                self.mesurer(chapitre, questions, nb_ecrivains, options['soumissions'])
+        finally:
+            if not options['conserver']:
+                self.nettoyer()
+
+    def creer_quiz(self, nb_questions):
+        """Crée une formation, un chapitre et des questions dédiés au benchmark."""
+        professeur, _ = CustomUser.objects.get_or_create(
+            username=f'{PREFIXE}professeur',
+            defaults={'role': 'TEACHER'},
+        )
+        formation = Formation.objects.create(
+            titre=f'{PREFIXE}formation',
+            description='Formation générée pour le benchmark des soumissions',
+            niveau='Test',
+            createur=professeur,
+        )
+        chapitre = Chapitre.objects.create(
+            titre=f'{PREFIXE}chapitre',
+            contenu_texte='Contenu de test',
+            formation=formation,
+        )
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                question_texte=f'Question de test {index}',
+                choix_A='A', choix_B='B', choix_C='C', choix_D='D',
+                bonne_reponse=random.choice('ABCD'),
+                explication='Explication de test',
+                chapitre=chapitre,
+            )
+            for index in range(nb_questions)
+        ])
+        return chapitre, list(chapitre.questions.order_by('id'))
+
+    def etudiants(self, nombre):
+        """Retourne `nombre` étudiants de test (un par écrivain), créés si besoin."""
+        utilisateurs = []
+        for index in range(nombre):
+            username = f'{PREFIXE}etudiant_{index}'
+            if not StudentUser.objects.filter(username=username).exists():
+                StudentUser.objects.create(username=username, role='STUDENT')
+            utilisateurs.append(CustomUser.objects.get(username=username))
+        return utilisateurs
+
+    def mesurer(self, chapitre, questions, nb_ecrivains, nb_soumissions):
+        utilisateurs = self.etudiants(nb_ecrivains)
+        latences = []
+        erreurs = []
+        verrou = threading.Lock()
+        depart = threading.Barrier(nb_ecrivains)
+
+        def ecrivain(utilisateur, graine):
+            generateur = random.Random(graine)
+            latences_locales = []
+            erreurs_locales = []
+            depart.wait()
+            try:
+                for _ in range(nb_soumissions):
+                    reponses_brutes = {str(question.id): generateur.choice('ABCD') for question in questions}
+                    debut = time.perf_counter()
+                    try:
+                        nb_bonnes, reponses, _ = soumission.corriger_reponses(questions, reponses_brutes)
+                        soumission.enregistrer_soumission(utilisateur, chapitre, questions, reponses, nb_bonnes)
+                        latences_locales.append(time.perf_counter() - debut)
+                    except OperationalError as e:
+                        erreurs_locales.append(str(e))
+            finally:
+                connection.close()
+                with verrou:
+                    latences.extend(latences_locales)
+                    erreurs.extend(erreurs_locales)
+
+        threads = [
+            threading.Thread(target=ecrivain, args=(utilisateur, index))
+            for index, utilisateur in enumerate(utilisateurs)
+        ]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+        debit = len(latences) / duree if duree else 0
+        if latences:
+            latences_ms = sorted(latence * 1000 for latence in latences)
+            p50 = statistics.median(latences_ms)
+            p95 = latences_ms[min(len(latences_ms) - 1, int(len(latences_ms) * 0.95))]
+        else:
+            p50 = p95 = 0
+        self.stdout.write(
+            f'  ✍️  {nb_ecrivains:>3} écrivain(s) : {debit:8.1f} soumissions/s | '
+            f'p50 {p50:6.1f} ms | p95 {p95:6.1f} ms | {len(erreurs)} erreur(s)'
+        )
+        if erreurs:
+            self.stdout.write(self.style.WARNING(f'      Première erreur : {erreurs[0]}'))
+
+    def nettoyer(self):
+        """Supprime les données créées par le benchmark (cascade sur les résultats)."""
+        Formation.objects.filter(titre=f'{PREFIXE}formation').delete()
+        CustomUser.objects.filter(username__startswith=PREFIXE).delete()
+        self.stdout.write('Données de benchmark supprimées.')
@@ -0,0 +1,58 @@
+"""
+Commande Django pour afficher la consommation de tokens IA face aux budgets du jour.
+Usage: python manage.py budgets_ia [--jour 2026-10-19] [--top 20]
+
+Lit le registre ConsommationIA (voir formation/budgets.py) : tokens réels des
+appels terminés, estimations des appels en cours.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from django.utils import timezone
+
+from formation import budgets
+from formation.models import ConsommationIA
+
+
+class Command(BaseCommand):
+    help = 'Affiche les tokens IA consommés par formation et par professeur, et leur budget quotidien'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jour', help='Jour au format AAAA-MM-JJ (défaut: aujourd\'hui)')
+        parser.add_argument('--top', type=int, default=20, help='Nombre de lignes par tableau (défaut: 20)')
+
+    def handle(self, *args, **options):
+        try:
+            jour = date.fromisoformat(options['jour']) if options['jour'] else None
+        except ValueError:
+            raise CommandError(f"Jour invalide : {options['jour']}")
+
+        consommation = budgets.consommation(jour)
+
+        def ligne(libelle, element):
+            budget = element['budget']
+            part = f"{element['tokens'] / budget:>6.1%}" if budget else '     -'
+            return f"  {str(libelle)[:40]:<40} {element['appels']:>7} appel(s) {element['tokens']:>10} tokens {part}"
+
+        self.stdout.write('Formations')
+        for element in consommation['formations'][:options['top']]:
+            self.stdout.write(ligne(element['formation__titre'], element))
+        self.stdout.write('Professeurs')
+        for element in consommation['professeurs'][:options['top']]:
+            self.stdout.write(ligne(element['professeur__username'], element))
+
+        # Précision de l'estimation locale sur les appels dont l'usage réel est connu
+        totaux = ConsommationIA.objects.filter(jour=jour or timezone.localdate(), tokens_prompt__gt=0).aggregate(
+            estimes=Sum('tokens_estimes'), reels=Sum('tokens'),
+        )
+        if totaux['estimes']:
+            self.stdout.write(
+                f"Estimation : {totaux['estimes']} tokens estimés pour {totaux['reels']} consommés "
+                f"({totaux['reels'] / totaux['estimes']:.0%})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(consommation['formations'])} formation(s) ont consommé des tokens IA ce jour"
+        ))
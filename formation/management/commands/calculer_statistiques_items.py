@@ -0,0 +1,58 @@
+"""
+Commande Django pour calculer les statistiques d'items de toute la banque de questions.
+Usage: python manage.py calculer_statistiques_items [--chapitre ID] [--reconstruire-compteurs]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from formation.models import Chapitre
+from formation import statistiques
+
+
+class Command(BaseCommand):
+    help = "Calcule les indices d'items (difficulté, discrimination, distracteurs) avec NumPy"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chapitre',
+            type=int,
+            help='Limite le calcul à un seul chapitre (ID)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Nombre de résultats lus par lot (défaut: 2000)',
+        )
+        parser.add_argument(
+            '--reconstruire-compteurs',
+            action='store_true',
+            help='Réécrit aussi les compteurs incrémentaux à partir des QuizResult',
+        )
+
+    def handle(self, *args, **options):
+        if statistiques.np is None:
+            raise CommandError("NumPy est requis pour cette commande : pip install numpy")
+
+        chapitres = Chapitre.objects.all().order_by('id')
+        if options['chapitre']:
+            chapitres = chapitres.filter(id=options['chapitre'])
+            if not chapitres.exists():
+                raise CommandError(f"Chapitre {options['chapitre']} introuvable")
+
+        debut = time.perf_counter()
+        total_tentatives = 0
+        for chapitre in chapitres.iterator():
+            nb_tentatives = statistiques.calculer_indices_chapitre(
+                chapitre,
+                chunk_size=options['chunk_size'],
+                reconstruire_compteurs=options['reconstruire_compteurs'],
+            )
+            total_tentatives += nb_tentatives
+            self.stdout.write(f'  📊 {chapitre.titre} : {nb_tentatives} tentative(s) analysée(s)')
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Statistiques calculées : {total_tentatives} tentative(s) en {duree:.2f}s'
+        ))
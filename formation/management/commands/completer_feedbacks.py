@@ -0,0 +1,43 @@
+"""
+Commande Django pour terminer les feedbacks IA différés restés en attente
+(processus arrêté pendant la génération).
+Usage: python manage.py completer_feedbacks [--depuis-minutes 5]
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from formation import soumission
+from formation.models import QuizResult
+
+
+class Command(BaseCommand):
+    help = 'Génère les feedbacks IA encore en attente sur les résultats de quiz'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--depuis-minutes',
+            type=int,
+            default=5,
+            help='Ignore les résultats plus récents, encore traités par le serveur (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(minutes=options['depuis_minutes'])
+        resultat_ids = list(
+            QuizResult.objects.filter(feedbacks_en_cours=True, date_passage__lt=limite)
+            .order_by('date_passage')
+            .values_list('id', flat=True)
+        )
+
+        debut = time.perf_counter()
+        nb_feedbacks = 0
+        for resultat_id in resultat_ids:
+            nb_feedbacks += soumission.completer_feedbacks(resultat_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb_feedbacks} feedback(s) générés pour {len(resultat_ids)} résultat(s) '
+            f'en {time.perf_counter() - debut:.1f}s'
+        ))
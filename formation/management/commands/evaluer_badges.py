@@ -0,0 +1,40 @@
+"""
+Commande Django pour réévaluer les règles de badges pour tous les étudiants.
+Usage: python manage.py evaluer_badges [--revoquer-obsoletes]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from formation import badges
+
+
+class Command(BaseCommand):
+    help = 'Réévalue en un parcours les règles de badges pour tous les étudiants (après un changement de règles)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--revoquer-obsoletes',
+            action='store_true',
+            help='Supprime les badges dont la règle n\'existe plus',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Taille des lots de lecture et d\'insertion (défaut: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+
+        if options['revoquer_obsoletes']:
+            nb_supprimes = badges.revoquer_obsoletes()
+            self.stdout.write(self.style.WARNING(f'  🗑️  {nb_supprimes} badge(s) obsolète(s) supprimé(s)'))
+
+        for regle in badges.REGLES_BADGES:
+            self.stdout.write(f'  🏅 {regle.code} : {regle.description}')
+
+        nb_verifies = badges.evaluer_tous(chunk_size=options['chunk_size'])
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(f'\n✅ {nb_verifies} badge(s) vérifié(s) en {duree:.2f}s'))
@@ -0,0 +1,66 @@
+"""
+Commande Django pour exporter les résultats de quiz en flux (CSV ou JSONL).
+Usage: python manage.py exporter_resultats [--format csv|jsonl] [--formation ID] [--chapitre ID]
+                                           [--debut AAAA-MM-JJ] [--fin AAAA-MM-JJ] [--sortie fichier]
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formation import export
+from formation.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Exporte les résultats de quiz en CSV ou JSONL (lecture par lots, mémoire constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv', help='Format (défaut: csv)')
+        parser.add_argument('--formation', type=int, help='Limite à une formation (ID)')
+        parser.add_argument('--chapitre', type=int, help='Limite à un chapitre (ID)')
+        parser.add_argument('--debut', help='Date de début incluse (AAAA-MM-JJ)')
+        parser.add_argument('--fin', help='Date de fin incluse (AAAA-MM-JJ)')
+        parser.add_argument('--professeur', help='Limite aux formations créées par ce professeur (nom d\'utilisateur)')
+        parser.add_argument('--sortie', help='Fichier de sortie (défaut : sortie standard)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Taille des lots de lecture (défaut: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            debut = export.lire_date(options['debut'])
+            fin = export.lire_date(options['fin'])
+        except ValueError:
+            raise CommandError("Dates attendues au format AAAA-MM-JJ")
+
+        professeur = None
+        if options['professeur']:
+            professeur = CustomUser.objects.filter(username=options['professeur']).first()
+            if professeur is None:
+                raise CommandError(f"Utilisateur introuvable : {options['professeur']}")
+
+        resultats = export.resultats_a_exporter(
+            professeur=professeur,
+            formation_id=options['formation'],
+            chapitre_id=options['chapitre'],
+            debut=debut,
+            fin=fin,
+        )
+        generateur, _ = export.FORMATS[options['format']]
+        lignes = generateur(resultats, chunk_size=options['chunk_size'])
+
+        if not options['sortie']:
+            for ligne in lignes:
+                sys.stdout.write(ligne)
+            return
+
+        nb_lignes = 0
+        with open(options['sortie'], 'w', encoding='utf-8', newline='') as fichier:
+            for ligne in lignes:
+                fichier.write(ligne)
+                nb_lignes += 1
+        self.stdout.write(self.style.SUCCESS(f'✅ {nb_lignes} ligne(s) écrite(s) dans {options["sortie"]}'))
@@ -0,0 +1,103 @@
+"""
+Commande Django pour importer en flux des contenus de cours (JSONL ou Markdown).
+Usage: python manage.py importer_contenu cours.jsonl [--createur professeur] [--taille-lot 1000] [--sans-maj]
+       python manage.py importer_contenu cours.md.gz --format markdown
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formation.importation import Importeur, lire_jsonl, lire_markdown, ouvrir
+from formation.models import CustomUser
+
+LECTEURS = {
+    'jsonl': lire_jsonl,
+    'markdown': lire_markdown,
+}
+
+EXTENSIONS = {
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+}
+
+
+class Command(BaseCommand):
+    help = 'Importe des formations et chapitres depuis un fichier JSONL ou Markdown (lecture en flux, écriture par lots)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help='Fichier à importer (.jsonl, .ndjson, .md, éventuellement .gz)')
+        parser.add_argument(
+            '--format',
+            choices=sorted(LECTEURS),
+            help='Format du fichier (défaut : déduit de l\'extension)',
+        )
+        parser.add_argument(
+            '--createur',
+            help='Nom d\'utilisateur du créateur des formations sans clé "createur" (défaut : premier professeur)',
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=1000,
+            help='Nombre de chapitres écrits par transaction (défaut: 1000)',
+        )
+        parser.add_argument(
+            '--sans-maj',
+            action='store_true',
+            help='N\'écrit que les nouveaux enregistrements, sans mettre à jour les existants',
+        )
+
+    def handle(self, *args, **options):
+        chemin = options['fichier']
+        format_fichier = options['format'] or self._deduire_format(chemin)
+
+        if options['createur']:
+            createur = CustomUser.objects.filter(username=options['createur']).first()
+            if createur is None:
+                raise CommandError(f"Utilisateur introuvable : {options['createur']}")
+        else:
+            createur = CustomUser.objects.filter(role='TEACHER').order_by('id').first()
+
+        importeur = Importeur(
+            createur=createur,
+            taille_lot=options['taille_lot'],
+            mise_a_jour=not options['sans_maj'],
+            rapport=self._rapport,
+        )
+
+        self.stdout.write(self.style.WARNING(f'Import de {chemin} ({format_fichier})...'))
+        try:
+            with ouvrir(chemin) as lignes:
+                bilan = importeur.importer(LECTEURS[format_fichier](lignes))
+        except OSError as e:
+            raise CommandError(f"Lecture impossible : {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Formations : {bilan.formations_creees} créée(s), {bilan.formations_mises_a_jour} mise(s) à jour'
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Chapitres : {bilan.chapitres_crees} créé(s), {bilan.chapitres_mis_a_jour} mis à jour, '
+            f'{bilan.chapitres_ignores} ignoré(s)'
+        ))
+        self.stdout.write(
+            f'⏱️  {bilan.nb_lignes} enregistrement(s) en {bilan.duree:.2f}s '
+            f'({bilan.lignes_par_seconde:.0f} lignes/s)'
+        )
+        if bilan.nb_erreurs:
+            self.stdout.write(self.style.ERROR(f'❌ {bilan.nb_erreurs} ligne(s) rejetée(s)'))
+            for numero, message in bilan.erreurs[:20]:
+                self.stdout.write(f'   ligne {numero} : {message}')
+
+    @staticmethod
+    def _deduire_format(chemin):
+        nom = chemin[:-3] if chemin.endswith('.gz') else chemin
+        for extension, format_fichier in EXTENSIONS.items():
+            if nom.endswith(extension):
+                return format_fichier
+        raise CommandError("Format non reconnu : précisez --format jsonl ou --format markdown")
+
+    def _rapport(self, bilan, duree):
+        nb_chapitres = bilan.chapitres_crees + bilan.chapitres_mis_a_jour + bilan.chapitres_ignores
+        vitesse = bilan.nb_lignes / duree if duree else 0
+        self.stdout.write(f'   … {nb_chapitres} chapitre(s) écrit(s) ({vitesse:.0f} lignes/s)')
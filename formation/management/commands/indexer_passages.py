@@ -0,0 +1,36 @@
+"""
+Commande Django pour (ré)indexer les passages des chapitres (index BM25 des prompts IA).
+Usage: python manage.py indexer_passages [--forcer] [--chunk-size 500]
+
+À lancer après un import ou un seed en masse : seuls les chapitres dont le
+contenu a changé depuis la dernière indexation sont traités.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from formation import passages
+
+
+class Command(BaseCommand):
+    help = 'Indexe les passages des chapitres nouveaux ou modifiés (BM25)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forcer',
+            action='store_true',
+            help='Réindexe tous les chapitres, même inchangés',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Nombre de chapitres traités par lot (défaut: 500)',
+        )
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        nb_chapitres, nb_passages = passages.indexer_tout(chunk_size=options['chunk_size'], forcer=options['forcer'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb_chapitres} chapitre(s) indexé(s), {nb_passages} passage(s) en {time.perf_counter() - debut:.2f}s'
+        ))
@@ -0,0 +1,58 @@
+"""
+Commande Django pour afficher la consommation d'appels IA du jour.
+Usage: python manage.py quotas_ia [--jour 2026-10-19] [--top 20]
+
+Les compteurs sont ceux des seaux à jetons (formation/limites.py), tenus en
+base (formation/compteurs.py) par tous les processus du serveur.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from formation import limites
+from formation.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Affiche les appels IA, jetons consommés et refus du jour, globalement, par rôle et par utilisateur'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jour', help='Jour au format AAAA-MM-JJ (défaut: aujourd\'hui)')
+        parser.add_argument('--top', type=int, default=20, help='Nombre d\'utilisateurs affichés (défaut: 20)')
+
+    def handle(self, *args, **options):
+        try:
+            jour = date.fromisoformat(options['jour']) if options['jour'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Jour invalide : {options['jour']}")
+
+        consommation = limites.consommation_du_jour(jour)
+
+        def ligne(libelle, compteurs):
+            return (
+                f"  {libelle:<30} {compteurs['appels']:>7} appel(s) {compteurs['jetons']:>7} jeton(s) "
+                f"{compteurs['refus']:>6} refus"
+            )
+
+        self.stdout.write(f'Consommation IA du {jour.isoformat()}')
+        self.stdout.write(ligne('Global', consommation['global']))
+        for role, compteurs in consommation['roles'].items():
+            self.stdout.write(ligne(f'Rôle {role}', compteurs))
+
+        utilisateurs = sorted(
+            consommation['utilisateurs'].items(),
+            key=lambda element: (element[1]['jetons'], element[1]['refus']),
+            reverse=True,
+        )[:options['top']]
+        noms = dict(
+            CustomUser.objects.filter(pk__in=[utilisateur_id for utilisateur_id, _ in utilisateurs])
+            .values_list('pk', 'username')
+        )
+        for utilisateur_id, compteurs in utilisateurs:
+            self.stdout.write(ligne(noms.get(utilisateur_id, f'#{utilisateur_id}'), compteurs))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(consommation['utilisateurs'])} utilisateur(s) ont déclenché des appels IA ce jour"
+        ))
@@ -0,0 +1,53 @@
+"""
+Commande Django pour afficher les mesures de la cascade de modèles IA.
+Usage: python manage.py rapport_modeles_ia [--jour 2026-10-19] [--json]
+
+Par opération : demandes, taux d'escalade vers un palier supérieur ; par palier :
+appels, rejets, erreurs et latences. Les compteurs sont tenus en base par tous
+les processus du serveur (formation/modeles_ia.py, formation/compteurs.py).
+"""
+
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from formation import modeles_ia
+
+
+class Command(BaseCommand):
+    help = 'Affiche latences, rejets et taux d\'escalade par palier de modèle IA'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jour', help='Jour au format AAAA-MM-JJ (défaut: aujourd\'hui)')
+        parser.add_argument('--json', action='store_true', help='Sortie JSON (suivi, tableaux de bord)')
+
+    def handle(self, *args, **options):
+        try:
+            jour = date.fromisoformat(options['jour']) if options['jour'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Jour invalide : {options['jour']}")
+
+        rapport = modeles_ia.rapport(jour)
+        if options['json']:
+            self.stdout.write(json.dumps(rapport, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'Cascade de modèles IA du {jour.isoformat()}')
+        for operation, mesures in rapport.items():
+            self.stdout.write(
+                f"\n{operation} : {mesures['demandes']} demande(s), "
+                f"{mesures['escalades']} escalade(s) ({mesures['taux_escalade']:.1%}), "
+                f"{mesures['abandons']} sans réponse valide"
+            )
+            self.stdout.write(
+                f"  {'Palier':<32} {'Appels':>7} {'Rejets':>7} {'Erreurs':>8} {'Moy. ms':>8} {'p50 ms':>7} {'p95 ms':>7}"
+            )
+            for modele, palier in mesures['paliers'].items():
+                self.stdout.write(
+                    f"  {modele:<32} {palier['appels']:>7} {palier['rejet']:>7} {palier['erreur']:>8} "
+                    f"{palier['moyenne_ms']:>8} {str(palier['p50_ms']):>7} {str(palier['p95_ms']):>7}"
+                )
+
+        self.stdout.write(self.style.SUCCESS('✅ Rapport de la cascade de modèles IA'))
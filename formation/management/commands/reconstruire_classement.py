@@ -0,0 +1,28 @@
+"""
+Commande Django pour reconstruire les scores par formation utilisés par les classements.
+Usage: python manage.py reconstruire_classement
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from formation.classement import reconstruire_scores_formation
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les scores par formation à partir des résultats de quiz et vide les classements en cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Taille des lots de lecture et d\'insertion (défaut: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconstruction des scores par formation...'))
+        debut = time.perf_counter()
+        nb_scores = reconstruire_scores_formation(chunk_size=options['chunk_size'])
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(f'✅ {nb_scores} score(s) reconstruit(s) en {duree:.2f}s'))
@@ -0,0 +1,36 @@
+"""
+Commande Django pour reconstruire les résumés de progression à partir des QuizResult.
+Usage: python manage.py reconstruire_progression [--etudiant ID]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from formation.progression import reconstruire_progressions
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les agrégats de progression (étudiant, chapitre) à partir des résultats de quiz'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--etudiant',
+            type=int,
+            help='Limite la reconstruction à un seul utilisateur (ID)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Taille des lots de lecture et d\'insertion (défaut: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconstruction des agrégats de progression...'))
+        debut = time.perf_counter()
+        nb_ecrits = reconstruire_progressions(
+            chunk_size=options['chunk_size'],
+            etudiant_id=options['etudiant'],
+        )
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(f'✅ {nb_ecrits} résumé(s) reconstruit(s) en {duree:.2f}s'))
@@ -0,0 +1,31 @@
+"""
+Commande Django pour (ré)installer l'index de recherche plein texte (SQLite FTS5).
+Usage: python manage.py reconstruire_recherche
+
+Recrée la table et les déclencheurs s'ils manquent (par exemple après une
+migration qui a reconstruit une table source) et réindexe tout le contenu.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from formation import recherche
+
+
+class Command(BaseCommand):
+    help = 'Réinstalle l\'index FTS5 (table et déclencheurs) et réindexe formations, chapitres et questions'
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        if not recherche.installer_index():
+            raise CommandError(
+                f"FTS5 indisponible sur cette base ({connection.vendor}) : la recherche utilise le repli ORM"
+            )
+        with connection.cursor() as curseur:
+            curseur.execute(f'SELECT COUNT(*) FROM {recherche.TABLE}')
+            nb_documents = curseur.fetchone()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Index de recherche reconstruit : {nb_documents} document(s) en {time.perf_counter() - debut:.2f}s'
+        ))
@@ -0,0 +1,45 @@
+"""
+Commande Django pour étaler les révisions en retard sur les prochains jours.
+Usage: python manage.py replanifier_revisions [--jours 7] [--taille-lot 1000] [--etudiant ID]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from formation.revision import replanifier_en_retard
+
+
+class Command(BaseCommand):
+    help = 'Replanifie par lots les révisions en retard en les étalant sur plusieurs jours'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=7,
+            help='Nombre de jours sur lesquels étaler les révisions en retard (défaut: 7)',
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=1000,
+            help='Nombre d\'états mis à jour par transaction (défaut: 1000)',
+        )
+        parser.add_argument(
+            '--etudiant',
+            type=int,
+            help='Limite la replanification à un seul utilisateur (ID)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Replanification des révisions en retard...'))
+        debut = time.perf_counter()
+        nb_replanifies = replanifier_en_retard(
+            jours=options['jours'],
+            taille_lot=options['taille_lot'],
+            etudiant_id=options['etudiant'],
+        )
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {nb_replanifies} révision(s) replanifiée(s) sur {options["jours"]} jour(s) en {duree:.2f}s'
+        ))
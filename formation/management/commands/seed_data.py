@@ -1,16 +1,29 @@
 """
 Commande Django pour peupler la base de données avec des données de test.
 Usage: python manage.py seed_data
+       python manage.py seed_data --formations 50 --chapitres-par-formation 40 --questions-par-chapitre 10
+                                  --etudiants 20000 --resultats 2000000 [--graine 42] [--taille-lot 5000]
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import date, timedelta
+import time
 from formation.models import CustomUser, StudentUser, Formation, Chapitre, QuizQuestion
+from formation.synthetique import GenerateurSynthetique, reconstruire_agregats
 
 User = get_user_model()
 
+# Volumes par défaut du mode volume, pour les options non précisées
+VOLUMES_PAR_DEFAUT = {
+    'formations': 10,
+    'chapitres_par_formation': 20,
+    'questions_par_chapitre': 10,
+    'etudiants': 1000,
+    'resultats': 100000,
+}
+
 
 class Command(BaseCommand):
     help = 'Peuple la base de données avec des données de test (seed data)'
@@ -22,6 +35,21 @@ class Command(BaseCommand):
             help='Supprime toutes les données existantes avant d\'ajouter les nouvelles',
         )
 
+        # Mode volume : actif dès qu'un des volumes est précisé
+        volume = parser.add_argument_group('mode volume (données synthétiques)')
+        volume.add_argument('--formations', type=int, help='Nombre de formations synthétiques (défaut: 10)')
+        volume.add_argument('--chapitres-par-formation', type=int, help='Chapitres par formation (défaut: 20)')
+        volume.add_argument('--questions-par-chapitre', type=int, help='Questions par chapitre (défaut: 10)')
+        volume.add_argument('--etudiants', type=int, help='Nombre d\'étudiants synthétiques (défaut: 1000)')
+        volume.add_argument('--resultats', type=int, help='Nombre de résultats de quiz (défaut: 100000)')
+        volume.add_argument('--graine', type=int, default=42, help='Graine aléatoire, même graine = mêmes données (défaut: 42)')
+        volume.add_argument('--taille-lot', type=int, default=5000, help='Lignes écrites par lot (défaut: 5000)')
+        volume.add_argument(
+            '--sans-agregats',
+            action='store_true',
+            help='Ne recalcule pas progressions, scores et badges après l\'insertion',
+        )
+
     def handle(self, *args, **options):
         if options['clear']:
             self.stdout.write(self.style.WARNING('Suppression des données existantes...'))
@@ -40,8 +68,55 @@ class Command(BaseCommand):
         # Création des formations et chapitres
         self.create_formations()
 
+        if any(options[nom] is not None for nom in VOLUMES_PAR_DEFAUT):
+            self.create_volume(options)
+
         self.stdout.write(self.style.SUCCESS('\n✅ Seed terminé avec succès!'))
 
+    def create_volume(self, options):
+        """Génère un jeu de données synthétique volumineux et déterministe"""
+        volumes = {
+            nom: defaut if options[nom] is None else options[nom]
+            for nom, defaut in VOLUMES_PAR_DEFAUT.items()
+        }
+        if any(valeur < 0 for valeur in volumes.values()) or options['taille_lot'] < 1:
+            raise CommandError('Les volumes doivent être positifs et --taille-lot au moins 1')
+
+        self.stdout.write(f'\n🏭 Génération synthétique (graine {options["graine"]})...')
+        generateur = GenerateurSynthetique(
+            graine=options['graine'],
+            taille_lot=options['taille_lot'],
+            rapport=lambda message: self.stdout.write(f'  {message}'),
+        )
+        debut = time.perf_counter()
+        try:
+            bilan = generateur.generer(
+                createur=CustomUser.objects.get(username='professeur'),
+                nb_formations=volumes['formations'],
+                chapitres_par_formation=volumes['chapitres_par_formation'],
+                questions_par_chapitre=volumes['questions_par_chapitre'],
+                nb_etudiants=volumes['etudiants'],
+                nb_resultats=volumes['resultats'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not options['sans_agregats']:
+            self.stdout.write('\n📊 Reconstruction des agrégats...')
+            reconstruire_agregats(
+                rapport=lambda message: self.stdout.write(f'  {message}'),
+                chunk_size=options['taille_lot'],
+            )
+
+        duree = time.perf_counter() - debut
+        nb_lignes = sum(bilan.values())
+        self.stdout.write(self.style.SUCCESS(
+            '  ✅ ' + ', '.join(f'{nombre} {nom}' for nom, nombre in bilan.items())
+        ))
+        self.stdout.write(f'  ⏱️  {nb_lignes} ligne(s) en {duree:.1f}s ({nb_lignes / duree if duree else 0:.0f} lignes/s)')
+        self.stdout.write('  💡 Statistiques d\'items : python manage.py calculer_statistiques_items')
+        self.stdout.write('  💡 Passages pour les prompts IA : python manage.py indexer_passages')
+
     def create_users(self):
         """Crée les utilisateurs de test"""
         self.stdout.write('\n📝 Création des utilisateurs...')
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStatistique',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistique', serialize=False, to='formation.quizquestion')),
+                ('nb_passages', models.PositiveIntegerField(default=0, help_text='Nombre de tentatives où la question a été posée')),
+                ('nb_correctes', models.PositiveIntegerField(default=0)),
+                ('nb_sans_reponse', models.PositiveIntegerField(default=0)),
+                ('nb_choix_A', models.PositiveIntegerField(default=0)),
+                ('nb_choix_B', models.PositiveIntegerField(default=0)),
+                ('nb_choix_C', models.PositiveIntegerField(default=0)),
+                ('nb_choix_D', models.PositiveIntegerField(default=0)),
+                ('indice_difficulte', models.FloatField(blank=True, help_text='Proportion de bonnes réponses (p-value)', null=True)),
+                ('indice_discrimination', models.FloatField(blank=True, help_text='Corrélation point-bisériale item / reste du test', null=True)),
+                ('efficacite_distracteurs', models.FloatField(blank=True, help_text='Part des distracteurs choisis par au moins 5% des étudiants', null=True)),
+                ('date_calcul', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Statistique de question',
+            },
+        ),
+    ]
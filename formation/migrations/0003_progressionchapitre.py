@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0002_questionstatistique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressionChapitre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nb_tentatives', models.PositiveIntegerField(default=0)),
+                ('meilleur_score', models.IntegerField(default=0)),
+                ('dernier_score', models.IntegerField(default=0)),
+                ('moyenne_mobile', models.FloatField(default=0)),
+                ('date_derniere_tentative', models.DateTimeField(blank=True, null=True)),
+                ('chapitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progressions', to='formation.chapitre')),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progressions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progression par chapitre',
+                'constraints': [models.UniqueConstraint(fields=('etudiant', 'chapitre'), name='progression_unique_etudiant_chapitre')],
+            },
+        ),
+    ]
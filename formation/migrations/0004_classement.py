@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-19 10:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0003_progressionchapitre'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreFormation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Score par formation',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='studentuser',
+            index=models.Index(fields=['progression_globale'], name='etudiant_progression_idx'),
+        ),
+        migrations.AddField(
+            model_name='scoreformation',
+            name='etudiant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores_formation', to='formation.studentuser'),
+        ),
+        migrations.AddField(
+            model_name='scoreformation',
+            name='formation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='formation.formation'),
+        ),
+        migrations.AddIndex(
+            model_name='scoreformation',
+            index=models.Index(fields=['formation', 'points'], name='score_formation_points_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='scoreformation',
+            constraint=models.UniqueConstraint(fields=('etudiant', 'formation'), name='score_unique_etudiant_formation'),
+        ),
+    ]
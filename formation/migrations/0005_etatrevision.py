@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 11:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0004_classement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EtatRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repetitions', models.PositiveIntegerField(default=0, help_text='Nombre de rappels réussis consécutifs')),
+                ('intervalle', models.PositiveIntegerField(default=0, help_text='Intervalle courant en jours')),
+                ('facilite', models.FloatField(default=2.5, help_text='Facteur de facilité SM-2 (minimum 1.3)')),
+                ('date_echeance', models.DateTimeField(default=django.utils.timezone.now)),
+                ('derniere_revision', models.DateTimeField(blank=True, null=True)),
+                ('nb_revisions', models.PositiveIntegerField(default=0)),
+                ('nb_echecs', models.PositiveIntegerField(default=0)),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etats_revision', to=settings.AUTH_USER_MODEL)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etats_revision', to='formation.quizquestion')),
+            ],
+            options={
+                'verbose_name': 'État de révision',
+                'indexes': [models.Index(fields=['etudiant', 'date_echeance'], name='revision_file_echeance_idx')],
+                'constraints': [models.UniqueConstraint(fields=('etudiant', 'question'), name='revision_unique_etudiant_question')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0005_etatrevision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizquestion',
+            index=models.Index(fields=['chapitre', 'id'], name='question_chapitre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['etudiant', 'date_passage'], name='resultat_etudiant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['chapitre', 'date_passage'], name='resultat_chapitre_date_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-19 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copier_badges(apps, schema_editor):
+    """Reprend les badges stockés dans StudentUser.badges_obtenus (liste JSON)."""
+    StudentUser = apps.get_model('formation', 'StudentUser')
+    BadgeObtenu = apps.get_model('formation', 'BadgeObtenu')
+    badges = []
+    for etudiant_id, codes in StudentUser.objects.values_list('pk', 'badges_obtenus').iterator():
+        for code in set(codes or []):
+            badges.append(BadgeObtenu(etudiant_id=etudiant_id, code=code))
+    BadgeObtenu.objects.bulk_create(badges, batch_size=1000, ignore_conflicts=True)
+
+
+def restaurer_badges(apps, schema_editor):
+    StudentUser = apps.get_model('formation', 'StudentUser')
+    BadgeObtenu = apps.get_model('formation', 'BadgeObtenu')
+    codes_par_etudiant = {}
+    for etudiant_id, code in BadgeObtenu.objects.values_list('etudiant_id', 'code').iterator():
+        codes_par_etudiant.setdefault(etudiant_id, []).append(code)
+    for etudiant_id, codes in codes_par_etudiant.items():
+        StudentUser.objects.filter(pk=etudiant_id).update(badges_obtenus=codes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0006_index_composites'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BadgeObtenu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+                ('date_obtention', models.DateTimeField(auto_now_add=True)),
+                ('etudiant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='badges', to='formation.studentuser')),
+            ],
+            options={
+                'verbose_name': 'Badge obtenu',
+                'constraints': [models.UniqueConstraint(fields=('etudiant', 'code'), name='badge_unique_etudiant_code')],
+            },
+        ),
+        migrations.RunPython(copier_badges, restaurer_badges),
+        migrations.RemoveField(
+            model_name='studentuser',
+            name='badges_obtenus',
+        ),
+    ]
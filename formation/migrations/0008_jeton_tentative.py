@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0007_badgeobtenu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='jeton_tentative',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0009_tampons_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chapitre',
+            index=models.Index(fields=['formation', 'titre'], name='chapitre_formation_titre_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 06:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0010_chapitre_cle_naturelle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassageChapitre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(help_text='Rang du passage dans le chapitre')),
+                ('texte', models.TextField()),
+                ('termes', models.JSONField(help_text="Format: {'terme': nombre d'occurrences}")),
+                ('longueur', models.PositiveIntegerField(help_text='Nombre de termes indexés')),
+                ('empreinte', models.CharField(max_length=40)),
+                ('chapitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passages', to='formation.chapitre')),
+            ],
+            options={
+                'verbose_name': 'Passage de chapitre',
+                'constraints': [models.UniqueConstraint(fields=('chapitre', 'position'), name='passage_unique_chapitre_position')],
+            },
+        ),
+    ]
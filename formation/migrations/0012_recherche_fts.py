@@ -0,0 +1,120 @@
+# Generated by Django 6.0 on 2026-10-19 07:10
+
+from django.db import OperationalError, migrations
+
+# SQL figé à la date de la migration : formation/recherche.py peut évoluer
+# (reconstruire_recherche réinstalle alors l'index courant), pas cette migration.
+CREATION_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS formation_recherche USING fts5(
+        type UNINDEXED, objet_id UNINDEXED, lien_id UNINDEXED, titre, contenu,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+DECLENCHEURS = [
+    # Formations
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_formation_ai AFTER INSERT ON formation_formation BEGIN
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 1, 'formation', new.id, new.id, new.titre, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_formation_au AFTER UPDATE OF titre, description ON formation_formation
+    WHEN old.titre IS NOT new.titre OR old.description IS NOT new.description BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 1;
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 1, 'formation', new.id, new.id, new.titre, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_formation_ad AFTER DELETE ON formation_formation BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 1;
+    END
+    """,
+    # Chapitres
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_chapitre_ai AFTER INSERT ON formation_chapitre BEGIN
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 2, 'chapitre', new.id, new.formation_id, new.titre, new.contenu_texte);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_chapitre_au AFTER UPDATE OF titre, contenu_texte, formation_id ON formation_chapitre
+    WHEN old.titre IS NOT new.titre OR old.contenu_texte IS NOT new.contenu_texte OR old.formation_id IS NOT new.formation_id BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 2;
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 2, 'chapitre', new.id, new.formation_id, new.titre, new.contenu_texte);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_chapitre_ad AFTER DELETE ON formation_chapitre BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 2;
+    END
+    """,
+    # Questions
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_question_ai AFTER INSERT ON formation_quizquestion BEGIN
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 3, 'question', new.id, new.chapitre_id, '', new.question_texte);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_question_au AFTER UPDATE OF question_texte, chapitre_id ON formation_quizquestion
+    WHEN old.question_texte IS NOT new.question_texte OR old.chapitre_id IS NOT new.chapitre_id BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 3;
+        INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu)
+        VALUES (new.id * 4 + 3, 'question', new.id, new.chapitre_id, '', new.question_texte);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS formation_recherche_question_ad AFTER DELETE ON formation_quizquestion BEGIN
+        DELETE FROM formation_recherche WHERE rowid = old.id * 4 + 3;
+    END
+    """,
+]
+
+CONTENU_INITIAL = [
+    "INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu) "
+    "SELECT id * 4 + 1, 'formation', id, id, titre, description FROM formation_formation",
+    "INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu) "
+    "SELECT id * 4 + 2, 'chapitre', id, formation_id, titre, contenu_texte FROM formation_chapitre",
+    "INSERT INTO formation_recherche (rowid, type, objet_id, lien_id, titre, contenu) "
+    "SELECT id * 4 + 3, 'question', id, chapitre_id, '', question_texte FROM formation_quizquestion",
+    "INSERT INTO formation_recherche (formation_recherche) VALUES ('optimize')",
+]
+
+
+def creer_index(apps, schema_editor):
+    # Table FTS5, déclencheurs et contenus existants (SQLite avec FTS5 uniquement ;
+    # sinon la recherche passe par le repli ORM de formation/recherche.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as curseur:
+        try:
+            curseur.execute(CREATION_TABLE)
+        except OperationalError:
+            return
+        for instruction in DECLENCHEURS + CONTENU_INITIAL:
+            curseur.execute(instruction)
+
+
+def supprimer_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as curseur:
+        for type_objet in ('formation', 'chapitre', 'question'):
+            for evenement in ('ai', 'au', 'ad'):
+                curseur.execute(f'DROP TRIGGER IF EXISTS formation_recherche_{type_objet}_{evenement}')
+        curseur.execute('DROP TABLE IF EXISTS formation_recherche')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0011_passagechapitre'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
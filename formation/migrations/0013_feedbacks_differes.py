@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0012_recherche_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='feedbacks_en_attente',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quizresult',
+            name='feedbacks_en_cours',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(condition=models.Q(('feedbacks_en_cours', True)), fields=['date_passage'], name='resultat_feedbacks_cours_idx'),
+        ),
+    ]
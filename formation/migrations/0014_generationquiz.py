@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 07:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0013_feedbacks_differes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationQuiz',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(help_text='Chapitre et paramètres de la génération', max_length=100)),
+                ('nombre_questions', models.PositiveIntegerField()),
+                ('difficulte', models.CharField(max_length=20)),
+                ('statut', models.CharField(choices=[('EN_COURS', 'En cours'), ('TERMINEE', 'Terminée'), ('ECHEC', 'Échec')], default='EN_COURS', max_length=10)),
+                ('question_ids', models.JSONField(blank=True, default=list, help_text='Questions créées par la génération')),
+                ('date_debut', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('chapitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generations', to='formation.chapitre')),
+                ('createur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Génération de quiz',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('statut', 'EN_COURS')), fields=('cle',), name='generation_unique_cle_en_cours')],
+            },
+        ),
+    ]
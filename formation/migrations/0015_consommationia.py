@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 08:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0014_generationquiz'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsommationIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('operation', models.CharField(max_length=20)),
+                ('modele', models.CharField(max_length=100)),
+                ('appels', models.PositiveIntegerField(default=0)),
+                ('tokens', models.IntegerField(default=0)),
+                ('tokens_estimes', models.PositiveIntegerField(default=0)),
+                ('tokens_prompt', models.PositiveIntegerField(default=0)),
+                ('tokens_completion', models.PositiveIntegerField(default=0)),
+                ('formation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consommations_ia', to='formation.formation')),
+                ('professeur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consommations_ia', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Consommation IA',
+                'indexes': [models.Index(fields=['jour', 'professeur'], name='consommation_ia_jour_prof_idx')],
+                'constraints': [models.UniqueConstraint(fields=('jour', 'formation', 'operation', 'modele'), name='consommation_ia_unique_jour_formation')],
+            },
+        ),
+    ]
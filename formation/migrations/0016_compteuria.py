@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formation', '0015_consommationia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurIA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('cle', models.CharField(max_length=200)),
+                ('valeur', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Compteur IA',
+                'constraints': [models.UniqueConstraint(fields=('jour', 'cle'), name='compteur_ia_unique_jour_cle')],
+            },
+        ),
+    ]
@@ -0,0 +1,123 @@
+"""
+Cascade de modèles par opération IA et mesures par palier
+- modeles : paliers d'une opération ('feedback', 'quiz'), du plus rapide au plus capable
+  (les feedbacks groupés, mesurés sous 'feedback_lot', utilisent ceux de 'feedback')
+- enregistrer_appel : latence et issue (valide, rejet, erreur) d'un appel à un palier
+- enregistrer_demande : palier qui a fini par répondre (escalade s'il n'est pas le premier)
+- rapport : appels, latences (moyenne, p50, p95 approchés), taux de rejet par palier
+  et taux d'escalade par opération, pour un jour donné
+
+ServiceIA essaie le premier palier et ne passe au suivant que si la réponse
+échoue à la validation (ou si l'appel échoue). Les paliers sont configurés par
+fournisseur : MODELES_IA_GROQ, MODELES_IA_OPENAI ({'operation': [modèle, ...]}).
+
+Les compteurs sont en base, par jour (compteurs.py, comme ceux de limites.py) :
+partagés par tous les processus et lus par la commande rapport_modeles_ia. Les
+paliers vus dans la journée se déduisent des compteurs existants. Les
+percentiles sont lus dans un histogramme à bornes fixes (BORNES_MS) : borne
+supérieure de la tranche.
+"""
+
+from django.conf import settings
+
+from . import compteurs
+
+PREFIXE = 'modeles-ia'
+OPERATIONS = ('feedback', 'feedback_lot', 'quiz')
+ISSUES = ('valide', 'rejet', 'erreur')
+BORNES_MS = (250, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+def modeles(fournisseur, operation, defaut):
+    """Paliers configurés pour l'opération, ou [defaut]."""
+    configures = getattr(settings, f'MODELES_IA_{fournisseur.upper()}', {}).get(operation)
+    return list(configures) if configures else [defaut]
+
+
+def _cle_demandes(operation, nature):
+    return f'{PREFIXE}|{operation}|demande|{nature}'
+
+
+def _cle_palier(operation, nature, modele):
+    # Le modèle en dernier : son nom peut contenir n'importe quel caractère
+    return f'{PREFIXE}|{operation}|palier|{nature}|{modele}'
+
+
+def _tranche(duree_ms):
+    for borne in BORNES_MS:
+        if duree_ms <= borne:
+            return borne
+    return 'plus'
+
+
+def enregistrer_appel(operation, modele, duree_s, issue):
+    """Compte un appel au palier `modele` : issue 'valide', 'rejet' (validation) ou 'erreur' (API)."""
+    duree_ms = int(duree_s * 1000)
+    compteurs.incrementer({
+        _cle_palier(operation, issue, modele): 1,
+        _cle_palier(operation, 'ms', modele): duree_ms,
+        _cle_palier(operation, f'h{_tranche(duree_ms)}', modele): 1,
+    })
+
+
+def enregistrer_demande(operation, rang):
+    """Compte une demande résolue au palier `rang` (0 : premier palier ; None : aucun palier n'a convenu)."""
+    deltas = {_cle_demandes(operation, 'demandes'): 1}
+    if rang is None:
+        deltas[_cle_demandes(operation, 'abandons')] = 1
+    elif rang > 0:
+        deltas[_cle_demandes(operation, 'escalades')] = 1
+    compteurs.incrementer(deltas)
+
+
+def _percentile(histogramme, total, rang):
+    cumul = 0
+    for borne in (*BORNES_MS, 'plus'):
+        cumul += histogramme.get(borne, 0)
+        if total and cumul * 100 >= rang * total:
+            return borne
+    return None
+
+
+def rapport(jour=None):
+    """
+    Mesures du jour (aujourd'hui par défaut).
+
+    Returns:
+        {operation: {'demandes', 'escalades', 'abandons', 'taux_escalade',
+                     'paliers': {modele: {'appels', 'valide', 'rejet', 'erreur',
+                                          'taux_rejet', 'moyenne_ms', 'p50_ms', 'p95_ms'}}}}
+    """
+    valeurs = compteurs.lire_prefixe(f'{PREFIXE}|', jour)
+    # {operation: {modele: {nature: valeur}}}, paliers dans l'ordre où ils ont été appelés
+    par_palier = {operation: {} for operation in OPERATIONS}
+    for cle, valeur in valeurs.items():
+        _, operation, genre, nature, *modele = cle.split('|', 4)
+        if genre == 'palier' and operation in par_palier:
+            par_palier[operation].setdefault(modele[0], {})[nature] = valeur
+
+    resultat = {}
+    for operation in OPERATIONS:
+        demandes = valeurs.get(_cle_demandes(operation, 'demandes'), 0)
+        escalades = valeurs.get(_cle_demandes(operation, 'escalades'), 0)
+        paliers = {}
+        for modele, natures in par_palier[operation].items():
+            compteurs_palier = {nature: natures.get(nature, 0) for nature in (*ISSUES, 'ms')}
+            histogramme = {borne: natures.get(f'h{borne}', 0) for borne in (*BORNES_MS, 'plus')}
+            appels = sum(compteurs_palier[issue] for issue in ISSUES)
+            paliers[modele] = {
+                'appels': appels,
+                **{issue: compteurs_palier[issue] for issue in ISSUES},
+                'taux_rejet': round((compteurs_palier['rejet'] + compteurs_palier['erreur']) / appels, 3) if appels else 0,
+                'moyenne_ms': round(compteurs_palier['ms'] / appels) if appels else 0,
+                'p50_ms': _percentile(histogramme, appels, 50),
+                'p95_ms': _percentile(histogramme, appels, 95),
+            }
+        resultat[operation] = {
+            'demandes': demandes,
+            'escalades': escalades,
+            'abandons': valeurs.get(_cle_demandes(operation, 'abandons'), 0),
+            'taux_escalade': round(escalades / demandes, 3) if demandes else 0,
+            'paliers': paliers,
+        }
+    return resultat
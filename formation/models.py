@@ -30,16 +30,39 @@ class StudentUser(CustomUser):
     """
     date_inscription = models.DateField(auto_now_add=True)
     progression_globale = models.IntegerField(default=0)
-    badges_obtenus = models.JSONField(default=list, blank=True)
 
     class Meta:
         verbose_name = "Étudiant"
+        indexes = [
+            # Classement global : ORDER BY / COUNT sur la progression
+            models.Index(fields=['progression_globale'], name='etudiant_progression_idx'),
+        ]
 
 # ---------------------------------------------------------
 # 2. STRUCTURE PÉDAGOGIQUE (Formation -> Chapitre)
 # ---------------------------------------------------------
 
-class Formation(models.Model):
+# Tampon de version : avancé uniquement par versions.py (UPDATE ... F('version') + 1)
+CHAMPS_VERSION = ('version', 'date_modification')
+
+
+class TamponVersionMixin:
+    """
+    Le save() d'une instance existante n'écrit pas son tampon de version : la
+    valeur en mémoire est celle lue au chargement, périmée dès que versions.py
+    l'avance (y compris par le signal de ce même save).
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            champs = kwargs.get('update_fields')
+            if champs is None:
+                champs = [champ.name for champ in self._meta.concrete_fields if not champ.primary_key]
+            kwargs['update_fields'] = [champ for champ in champs if champ not in CHAMPS_VERSION]
+        super().save(*args, **kwargs)
+
+
+class Formation(TamponVersionMixin, models.Model):
     titre = models.CharField(max_length=200)
     description = models.TextField()
     niveau = models.CharField(max_length=50)
@@ -47,10 +70,14 @@ class Formation(models.Model):
     createur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='formations_creees')
     est_public = models.BooleanField(default=False)
 
+    # Tampon de version (ETag / Last-Modified), avancé à chaque écriture (voir versions.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    date_modification = models.DateTimeField(default=timezone.now, editable=False)
+
     def __str__(self):
         return self.titre
 
-class Chapitre(models.Model):
+class Chapitre(TamponVersionMixin, models.Model):
     titre = models.CharField(max_length=200)
     contenu_texte = models.TextField(verbose_name="Contenu du cours")
     ordre = models.IntegerField(default=1)
@@ -58,6 +85,16 @@ class Chapitre(models.Model):
     # Résumé généré par IA stocké ici
     resume_ia = models.TextField(blank=True, null=True)
 
+    # Tampon de version (ETag / Last-Modified), avancé à chaque écriture (voir versions.py)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    date_modification = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Clé naturelle (formation, titre) : upsert de l'import de contenus
+            models.Index(fields=['formation', 'titre'], name='chapitre_formation_titre_idx'),
+        ]
+
     def __str__(self):
         return f"{self.formation.titre} - {self.titre}"
 
@@ -88,6 +125,12 @@ class QuizQuestion(models.Model):
     chapitre = models.ForeignKey(Chapitre, on_delete=models.CASCADE, related_name='questions')
     createur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
+    class Meta:
+        indexes = [
+            # Questions d'un chapitre dans l'ordre d'affichage
+            models.Index(fields=['chapitre', 'id'], name='question_chapitre_id_idx'),
+        ]
+
     def __str__(self):
         return self.question_texte[:50]
 
@@ -101,11 +144,302 @@ class QuizResult(models.Model):
     # Stockage détaillé
     reponses_etudiant = models.JSONField(help_text="Format: {'question_id': 'A'}")
     explications_erreurs = models.JSONField(null=True, blank=True, help_text="Retours IA spécifiques")
-    
+
+    # Jeton de tentative émis à l'affichage du quiz : une seule soumission par jeton
+    jeton_tentative = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    # Feedbacks IA différés : questions dont le feedback personnalisé reste à générer
+    # (explications_erreurs contient d'ici là l'explication stockée de la question)
+    feedbacks_en_attente = models.JSONField(default=list, blank=True, editable=False)
+    feedbacks_en_cours = models.BooleanField(default=False, editable=False)
+
     # Relations
     chapitre = models.ForeignKey(Chapitre, on_delete=models.CASCADE)
     # Utilisation de AUTH_USER_MODEL pour permettre à tous les utilisateurs de passer des quiz
     etudiant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resultats_quiz')
 
+    class Meta:
+        indexes = [
+            # Historique d'un étudiant et résultats d'un chapitre par date
+            models.Index(fields=['etudiant', 'date_passage'], name='resultat_etudiant_date_idx'),
+            models.Index(fields=['chapitre', 'date_passage'], name='resultat_chapitre_date_idx'),
+            # Reprise des feedbacks interrompus : index partiel, limité aux résultats en attente
+            models.Index(
+                fields=['date_passage'],
+                name='resultat_feedbacks_cours_idx',
+                condition=models.Q(feedbacks_en_cours=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Résultat {self.etudiant} - Chapitre {self.chapitre.id}"
+
+# ---------------------------------------------------------
+# 4. STATISTIQUES D'ITEMS (analyse des questions)
+# ---------------------------------------------------------
+
+class QuestionStatistique(models.Model):
+    """
+    Compteurs cumulés et indices psychométriques d'une question.
+    Les compteurs sont incrémentés atomiquement à chaque soumission (F()),
+    les indices sont recalculés en lot par `calculer_statistiques_items`.
+    """
+    question = models.OneToOneField(QuizQuestion, on_delete=models.CASCADE, primary_key=True, related_name='statistique')
+
+    # Compteurs incrémentaux
+    nb_passages = models.PositiveIntegerField(default=0, help_text="Nombre de tentatives où la question a été posée")
+    nb_correctes = models.PositiveIntegerField(default=0)
+    nb_sans_reponse = models.PositiveIntegerField(default=0)
+    nb_choix_A = models.PositiveIntegerField(default=0)
+    nb_choix_B = models.PositiveIntegerField(default=0)
+    nb_choix_C = models.PositiveIntegerField(default=0)
+    nb_choix_D = models.PositiveIntegerField(default=0)
+
+    # Indices calculés en lot
+    indice_difficulte = models.FloatField(null=True, blank=True, help_text="Proportion de bonnes réponses (p-value)")
+    indice_discrimination = models.FloatField(null=True, blank=True, help_text="Corrélation point-bisériale item / reste du test")
+    efficacite_distracteurs = models.FloatField(null=True, blank=True, help_text="Part des distracteurs choisis par au moins 5% des étudiants")
+    date_calcul = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Statistique de question"
+
+    @property
+    def taux_reussite(self):
+        """Taux de réussite courant, calculé à partir des compteurs."""
+        if not self.nb_passages:
+            return None
+        return self.nb_correctes / self.nb_passages
+
+    def repartition_choix(self):
+        """Retourne [(lettre, nombre, pourcentage, est_correcte), ...] pour l'affichage."""
+        repartition = []
+        for lettre in ['A', 'B', 'C', 'D']:
+            nombre = getattr(self, f'nb_choix_{lettre}')
+            pourcentage = round(100 * nombre / self.nb_passages) if self.nb_passages else 0
+            repartition.append((lettre, nombre, pourcentage, lettre == self.question.bonne_reponse))
+        return repartition
+
+    def __str__(self):
+        return f"Statistiques - {self.question}"
+
+
+# ---------------------------------------------------------
+# 5. PROGRESSION (agrégats matérialisés par étudiant et chapitre)
+# ---------------------------------------------------------
+
+class ProgressionChapitre(models.Model):
+    """
+    Résumé des tentatives d'un étudiant sur un chapitre.
+    Mis à jour de façon incrémentale à chaque soumission, reconstructible
+    à partir des QuizResult via la commande `reconstruire_progression`.
+    """
+    etudiant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='progressions')
+    chapitre = models.ForeignKey(Chapitre, on_delete=models.CASCADE, related_name='progressions')
+
+    nb_tentatives = models.PositiveIntegerField(default=0)
+    meilleur_score = models.IntegerField(default=0)
+    dernier_score = models.IntegerField(default=0)
+    # Moyenne mobile exponentielle des scores (voir progression.LISSAGE)
+    moyenne_mobile = models.FloatField(default=0)
+    date_derniere_tentative = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Progression par chapitre"
+        constraints = [
+            models.UniqueConstraint(fields=['etudiant', 'chapitre'], name='progression_unique_etudiant_chapitre'),
+        ]
+
+    def __str__(self):
+        return f"Progression {self.etudiant} - {self.chapitre}"
+
+
+class BadgeObtenu(models.Model):
+    """
+    Badge attribué à un étudiant (règles déclarées dans formation/badges.py).
+    La contrainte d'unicité rend l'attribution idempotente sous concurrence.
+    """
+    etudiant = models.ForeignKey(StudentUser, on_delete=models.CASCADE, related_name='badges')
+    code = models.CharField(max_length=50)
+    date_obtention = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Badge obtenu"
+        constraints = [
+            models.UniqueConstraint(fields=['etudiant', 'code'], name='badge_unique_etudiant_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.etudiant} - {self.code}"
+
+
+class ScoreFormation(models.Model):
+    """
+    Points cumulés d'un étudiant dans une formation (classement par formation).
+    Incrémenté en même temps que StudentUser.progression_globale.
+    """
+    etudiant = models.ForeignKey(StudentUser, on_delete=models.CASCADE, related_name='scores_formation')
+    formation = models.ForeignKey(Formation, on_delete=models.CASCADE, related_name='scores')
+    points = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Score par formation"
+        constraints = [
+            models.UniqueConstraint(fields=['etudiant', 'formation'], name='score_unique_etudiant_formation'),
+        ]
+        indexes = [
+            models.Index(fields=['formation', 'points'], name='score_formation_points_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.etudiant} - {self.formation} : {self.points} pts"
+
+
+# ---------------------------------------------------------
+# 6. RÉVISION ESPACÉE (SM-2)
+# ---------------------------------------------------------
+
+class EtatRevision(models.Model):
+    """
+    État de mémorisation d'une question pour un étudiant (algorithme SM-2).
+    La file des révisions dues est lue via l'index (etudiant, date_echeance).
+    """
+    etudiant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='etats_revision')
+    question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE, related_name='etats_revision')
+
+    repetitions = models.PositiveIntegerField(default=0, help_text="Nombre de rappels réussis consécutifs")
+    intervalle = models.PositiveIntegerField(default=0, help_text="Intervalle courant en jours")
+    facilite = models.FloatField(default=2.5, help_text="Facteur de facilité SM-2 (minimum 1.3)")
+    date_echeance = models.DateTimeField(default=timezone.now)
+    derniere_revision = models.DateTimeField(null=True, blank=True)
+    nb_revisions = models.PositiveIntegerField(default=0)
+    nb_echecs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "État de révision"
+        constraints = [
+            models.UniqueConstraint(fields=['etudiant', 'question'], name='revision_unique_etudiant_question'),
+        ]
+        indexes = [
+            models.Index(fields=['etudiant', 'date_echeance'], name='revision_file_echeance_idx'),
+        ]
+
+    def __str__(self):
+        return f"Révision {self.etudiant} - {self.question} (échéance {self.date_echeance:%d/%m/%Y})"
+
+
+# ---------------------------------------------------------
+# 7. PASSAGES DES CHAPITRES (index BM25)
+# ---------------------------------------------------------
+
+class PassageChapitre(models.Model):
+    """
+    Passage (un ou quelques paragraphes) du contenu d'un chapitre, avec ses
+    fréquences de termes : index BM25 local pour ancrer les prompts IA (voir passages.py).
+    """
+    chapitre = models.ForeignKey(Chapitre, on_delete=models.CASCADE, related_name='passages')
+    position = models.PositiveIntegerField(help_text="Rang du passage dans le chapitre")
+    texte = models.TextField()
+    termes = models.JSONField(help_text="Format: {'terme': nombre d'occurrences}")
+    longueur = models.PositiveIntegerField(help_text="Nombre de termes indexés")
+    # Empreinte du contenu indexé : réindexation seulement si le texte du chapitre a changé
+    empreinte = models.CharField(max_length=40)
+
+    class Meta:
+        verbose_name = "Passage de chapitre"
+        constraints = [
+            models.UniqueConstraint(fields=['chapitre', 'position'], name='passage_unique_chapitre_position'),
+        ]
+
+    def __str__(self):
+        return f"{self.chapitre_id} #{self.position} : {self.texte[:50]}"
+
+
+class GenerationQuiz(models.Model):
+    """
+    Génération de quiz par l'IA pour un chapitre et des paramètres donnés.
+    La ligne EN_COURS sert de verrou inter-processus (unicité partielle sur `cle`) :
+    les demandes identiques concurrentes attendent sa fin et partagent ses questions
+    (voir generation.py).
+    """
+    STATUTS = [
+        ('EN_COURS', 'En cours'),
+        ('TERMINEE', 'Terminée'),
+        ('ECHEC', 'Échec'),
+    ]
+    cle = models.CharField(max_length=100, help_text="Chapitre et paramètres de la génération")
+    chapitre = models.ForeignKey(Chapitre, on_delete=models.CASCADE, related_name='generations')
+    createur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    nombre_questions = models.PositiveIntegerField()
+    difficulte = models.CharField(max_length=20)
+    statut = models.CharField(max_length=10, choices=STATUTS, default='EN_COURS')
+    question_ids = models.JSONField(default=list, blank=True, help_text="Questions créées par la génération")
+    date_debut = models.DateTimeField(default=timezone.now)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Génération de quiz"
+        constraints = [
+            # Une seule génération en vol par clé
+            models.UniqueConstraint(
+                fields=['cle'],
+                condition=models.Q(statut='EN_COURS'),
+                name='generation_unique_cle_en_cours',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cle} ({self.statut})"
+
+
+class ConsommationIA(models.Model):
+    """
+    Registre quotidien des tokens IA d'une formation, par opération et par modèle.
+    Le professeur (créateur de la formation) est recopié pour les budgets par
+    professeur (voir budgets.py).
+    """
+    jour = models.DateField()
+    formation = models.ForeignKey(Formation, on_delete=models.CASCADE, related_name='consommations_ia')
+    professeur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='consommations_ia')
+    operation = models.CharField(max_length=20)
+    modele = models.CharField(max_length=100)
+    appels = models.PositiveIntegerField(default=0)
+    # Tokens imputés au budget : estimation réservée pendant l'appel, puis usage réel
+    tokens = models.IntegerField(default=0)
+    tokens_estimes = models.PositiveIntegerField(default=0)
+    tokens_prompt = models.PositiveIntegerField(default=0)
+    tokens_completion = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Consommation IA"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['jour', 'formation', 'operation', 'modele'],
+                name='consommation_ia_unique_jour_formation',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['jour', 'professeur'], name='consommation_ia_jour_prof_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.jour} {self.formation_id} {self.operation} {self.modele} : {self.tokens} tokens"
+
+
+class CompteurIA(models.Model):
+    """
+    Compteur journalier des appels IA (limites d'appels, mesures par palier de modèle),
+    incrémenté par UPDATE atomique et lu par les commandes de suivi (voir compteurs.py).
+    """
+    jour = models.DateField()
+    cle = models.CharField(max_length=200)
+    valeur = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteur IA"
+        constraints = [
+            models.UniqueConstraint(fields=['jour', 'cle'], name='compteur_ia_unique_jour_cle'),
+        ]
+
     def __str__(self):
-        return f"Résultat {self.etudiant} - Chapitre {self.chapitre.id}"
\ No newline at end of file
+        return f"{self.jour} {self.cle} : {self.valeur}"
@@ -0,0 +1,254 @@
+"""
+Index BM25 local des passages de chapitres (ancrage des prompts IA)
+- decouper : contenu d'un chapitre -> passages (paragraphes regroupés ou coupés)
+- termes : texte -> termes normalisés (minuscules, sans accents, sans mots vides)
+- indexer_chapitre : (ré)indexe un chapitre si son contenu a changé
+- indexer_tout : rattrapage incrémental de tous les chapitres, par lots
+- passages_pertinents : top-k passages d'un chapitre pour une requête (BM25)
+- contexte : passages retenus, dans l'ordre du cours, sous une limite de caractères
+
+Chaque passage stocke ses fréquences de termes et l'empreinte du contenu
+indexé : un chapitre n'est réindexé que si son texte a changé (pas pour un
+simple changement de titre ou de questions). L'enregistrement d'un chapitre
+déclenche la réindexation en arrière-plan après commit ; les écritures en
+masse (import, seed) passent par la commande indexer_passages, et un chapitre
+jamais indexé l'est à la première recherche.
+"""
+
+import hashlib
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Chapitre, PassageChapitre
+from . import taches
+
+logger = logging.getLogger(__name__)
+
+# Paramètres BM25 usuels
+K1 = 1.2
+B = 0.75
+
+# Bornes de taille d'un passage (caractères)
+TAILLE_MIN = 200
+TAILLE_MAX = 1200
+
+MOTS_VIDES = frozenset("""
+a au aux avec ce ces cet cette dans de des du elle elles en est et etre eux il ils je la le les leur leurs lui
+ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sont sur ta te tes
+toi ton tu un une vos votre vous y ete etait peut plus tres tout tous toute toutes aussi comme donc ainsi
+si sans entre dont cela ceci the of and to in is for on with
+""".split())
+
+_MOT = re.compile(r'[a-z0-9]+')
+_PARAGRAPHES = re.compile(r'\n\s*\n')
+_PHRASES = re.compile(r'(?<=[.!?])\s+')
+
+
+def termes(texte):
+    """Termes indexés : minuscules, accents retirés, mots vides et lettres isolées exclus, pluriel simple retiré."""
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    resultat = []
+    for mot in _MOT.findall(texte):
+        if len(mot) < 2 or mot in MOTS_VIDES:
+            continue
+        if len(mot) > 3 and mot[-1] in 'sx':
+            mot = mot[:-1]
+        resultat.append(mot)
+    return resultat
+
+
+def empreinte(texte):
+    return hashlib.sha1((texte or '').encode('utf-8')).hexdigest()
+
+
+def decouper(texte):
+    """
+    Passages d'un contenu : paragraphes (séparés par une ligne vide), les
+    courts regroupés jusqu'à TAILLE_MIN, les longs coupés entre phrases vers TAILLE_MAX.
+    """
+    passages = []
+    courant = ''
+    for paragraphe in _PARAGRAPHES.split(texte or ''):
+        paragraphe = paragraphe.strip()
+        if not paragraphe:
+            continue
+        morceaux = [paragraphe]
+        if len(paragraphe) > TAILLE_MAX:
+            morceaux, morceau = [], ''
+            for phrase in _PHRASES.split(paragraphe):
+                if morceau and len(morceau) + len(phrase) > TAILLE_MAX:
+                    morceaux.append(morceau)
+                    morceau = ''
+                morceau = f'{morceau} {phrase}' if morceau else phrase
+            if morceau:
+                morceaux.append(morceau)
+        for morceau in morceaux:
+            courant = f'{courant}\n\n{morceau}' if courant else morceau
+            if len(courant) >= TAILLE_MIN:
+                passages.append(courant)
+                courant = ''
+    if courant:
+        # Reliquat trop court : rattaché au passage précédent s'il y en a un
+        if passages and len(passages[-1]) + len(courant) <= TAILLE_MAX:
+            passages[-1] = f'{passages[-1]}\n\n{courant}'
+        else:
+            passages.append(courant)
+    return passages
+
+
+def _construire_passages(chapitre_id, contenu):
+    signature = empreinte(contenu)
+    passages = []
+    for position, texte in enumerate(decouper(contenu)):
+        liste_termes = termes(texte)
+        passages.append(PassageChapitre(
+            chapitre_id=chapitre_id,
+            position=position,
+            texte=texte,
+            termes=dict(Counter(liste_termes)),
+            longueur=len(liste_termes),
+            empreinte=signature,
+        ))
+    return passages
+
+
+def indexer_chapitre(chapitre_id, contenu=None):
+    """
+    Réindexe un chapitre si le texte indexé diffère de son contenu actuel.
+
+    Args:
+        contenu: contenu_texte déjà lu (évite une requête), None pour le relire
+
+    Returns:
+        True si le chapitre a été réindexé
+    """
+    if contenu is None:
+        contenu = Chapitre.objects.filter(id=chapitre_id).values_list('contenu_texte', flat=True).first()
+        if contenu is None:
+            return False
+    indexee = PassageChapitre.objects.filter(chapitre_id=chapitre_id).values_list('empreinte', flat=True).first()
+    if indexee == empreinte(contenu) or (indexee is None and not decouper(contenu)):
+        return False
+
+    passages = _construire_passages(chapitre_id, contenu)
+    with transaction.atomic():
+        PassageChapitre.objects.filter(chapitre_id=chapitre_id).delete()
+        PassageChapitre.objects.bulk_create(passages)
+    logger.info(f"Chapitre {chapitre_id} indexé : {len(passages)} passage(s)")
+    return True
+
+
+def indexer_tout(chunk_size=500, forcer=False):
+    """
+    Indexe les chapitres nouveaux ou modifiés (tous avec forcer=True).
+
+    Returns:
+        (nombre de chapitres réindexés, nombre de passages écrits)
+    """
+    nb_chapitres = nb_passages = 0
+    lot = []
+
+    def traiter(lot):
+        indexees = dict(
+            PassageChapitre.objects.filter(chapitre_id__in=[chapitre_id for chapitre_id, _ in lot], position=0)
+            .values_list('chapitre_id', 'empreinte')
+        )
+        a_ecrire = []
+        a_reindexer = []
+        for chapitre_id, contenu in lot:
+            indexee = indexees.get(chapitre_id)
+            if not forcer and (indexee == empreinte(contenu) or (indexee is None and not decouper(contenu))):
+                continue
+            a_reindexer.append(chapitre_id)
+            a_ecrire += _construire_passages(chapitre_id, contenu)
+        if a_reindexer:
+            with transaction.atomic():
+                PassageChapitre.objects.filter(chapitre_id__in=a_reindexer).delete()
+                PassageChapitre.objects.bulk_create(a_ecrire, batch_size=chunk_size)
+        return len(a_reindexer), len(a_ecrire)
+
+    for chapitre in Chapitre.objects.order_by('id').values_list('id', 'contenu_texte').iterator(chunk_size=chunk_size):
+        lot.append(chapitre)
+        if len(lot) >= chunk_size:
+            chapitres, passages = traiter(lot)
+            nb_chapitres += chapitres
+            nb_passages += passages
+            lot = []
+    if lot:
+        chapitres, passages = traiter(lot)
+        nb_chapitres += chapitres
+        nb_passages += passages
+    return nb_chapitres, nb_passages
+
+
+def passages_pertinents(chapitre_id, requete, k=3):
+    """
+    Top-k passages du chapitre pour la requête, par score BM25 décroissant
+    (à score égal, ordre du cours). Les statistiques (idf, longueur moyenne)
+    sont celles des passages du chapitre.
+
+    Returns:
+        [(score, PassageChapitre), ...]
+    """
+    passages = list(PassageChapitre.objects.filter(chapitre_id=chapitre_id).order_by('position'))
+    if not passages and indexer_chapitre(chapitre_id):
+        passages = list(PassageChapitre.objects.filter(chapitre_id=chapitre_id).order_by('position'))
+    if not passages:
+        return []
+
+    termes_requete = set(termes(requete or ''))
+    nb_passages = len(passages)
+    longueur_moyenne = sum(passage.longueur for passage in passages) / nb_passages or 1
+    frequences_documents = Counter(terme for passage in passages for terme in termes_requete if terme in passage.termes)
+
+    classes = []
+    for passage in passages:
+        score = 0.0
+        for terme in termes_requete:
+            frequence = passage.termes.get(terme, 0)
+            if not frequence:
+                continue
+            idf = math.log(1 + (nb_passages - frequences_documents[terme] + 0.5) / (frequences_documents[terme] + 0.5))
+            normalisation = K1 * (1 - B + B * passage.longueur / longueur_moyenne)
+            score += idf * frequence * (K1 + 1) / (frequence + normalisation)
+        classes.append((score, passage))
+    classes.sort(key=lambda element: (-element[0], element[1].position))
+    return classes[:k]
+
+
+def contexte(chapitre_id, requete, k=3, limite=4000, pertinents_seulement=False):
+    """
+    Texte des passages retenus pour un prompt, dans l'ordre du cours.
+
+    Les passages sont pris par score décroissant tant que la limite de
+    caractères le permet. Avec pertinents_seulement, les passages de score
+    nul sont écartés (chaîne vide si rien ne correspond).
+    """
+    retenus = []
+    taille = 0
+    for score, passage in passages_pertinents(chapitre_id, requete, k):
+        if pertinents_seulement and score <= 0:
+            break
+        if retenus and taille + len(passage.texte) > limite:
+            continue
+        retenus.append(passage)
+        taille += len(passage.texte)
+    retenus.sort(key=lambda passage: passage.position)
+    return '\n\n[...]\n\n'.join(passage.texte[:limite] for passage in retenus)
+
+
+@receiver(post_save, sender=Chapitre)
+def _chapitre_enregistre(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # La tâche relit le contenu : le chapitre a pu changer encore, ou être supprimé, d'ici là
+    chapitre_id = instance.id
+    transaction.on_commit(lambda: taches.executer_en_arriere_plan(indexer_chapitre, chapitre_id))
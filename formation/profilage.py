@@ -0,0 +1,168 @@
+"""
+Profilage des requêtes
+- ProfilageMiddleware : temps SQL (nombre et durée des requêtes), temps IA et
+  temps de rendu des gabarits par requête, émis dans l'en-tête Server-Timing
+  et dans un journal structuré (une ligne JSON par requête)
+- mesurer : mesure un bloc de code dans la catégorie donnée (utilisé par ServiceIA)
+- GabaritsMesures : moteur de gabarits Django qui mesure le temps de rendu (installé
+  par settings.py seulement si PROFILAGE_ACTIF)
+
+Un profil cProfile (.prof, lisible avec pstats ou snakeviz) est écrit dans
+PROFILAGE_REPERTOIRE pour les requêtes tirées au sort (PROFILAGE_TAUX_ECHANTILLON)
+et pour celles qui dépassent PROFILAGE_SEUIL_MS. Avec un seuil, toutes les
+requêtes sont profilées (surcoût notable) : à réserver aux sessions de diagnostic.
+
+Les catégories peuvent se recouvrir : une requête SQL exécutée pendant le rendu
+(queryset paresseux évalué dans le gabarit) compte à la fois dans 'db' et 'rendu'.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import random
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# Mesures de la requête en cours : {'categorie': [nombre, durée en secondes]}
+_mesures = contextvars.ContextVar('profilage_mesures', default=None)
+
+
+@contextmanager
+def mesurer(categorie):
+    """
+    Ajoute la durée du bloc à la catégorie (ex. 'llm', 'rendu') de la requête en
+    cours. Sans requête profilée (commande, tâche d'arrière-plan), ne fait rien.
+    """
+    mesures = _mesures.get()
+    if mesures is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        compteur = mesures.setdefault(categorie, [0, 0.0])
+        compteur[0] += 1
+        compteur[1] += time.perf_counter() - debut
+
+
+def _mesurer_requete_sql(execute, sql, params, many, context):
+    with mesurer('db'):
+        return execute(sql, params, many, context)
+
+
+class _GabaritMesure:
+    """Enveloppe d'un gabarit compilé : chaque rendu est compté dans 'rendu'."""
+
+    def __init__(self, gabarit):
+        self.gabarit = gabarit
+
+    def __getattr__(self, nom):
+        return getattr(self.gabarit, nom)
+
+    def render(self, context=None, request=None):
+        with mesurer('rendu'):
+            return self.gabarit.render(context, request)
+
+
+class GabaritsMesures(DjangoTemplates):
+    """Moteur DjangoTemplates dont les rendus alimentent la mesure 'rendu'."""
+
+    def from_string(self, template_code):
+        return _GabaritMesure(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _GabaritMesure(super().get_template(template_name))
+
+
+class ProfilageMiddleware:
+    """
+    Mesure chaque requête et publie Server-Timing (db, llm, rendu, total).
+    Inactif si PROFILAGE_ACTIF vaut False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILAGE_ACTIF', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.taux_echantillon = getattr(settings, 'PROFILAGE_TAUX_ECHANTILLON', 0.0)
+        self.seuil_ms = getattr(settings, 'PROFILAGE_SEUIL_MS', None)
+        self.repertoire = Path(getattr(settings, 'PROFILAGE_REPERTOIRE', settings.BASE_DIR / 'profils'))
+
+    def __call__(self, request):
+        echantillonnee = random.random() < self.taux_echantillon
+        profileur = cProfile.Profile() if echantillonnee or self.seuil_ms is not None else None
+
+        mesures = {}
+        jeton = _mesures.set(mesures)
+        debut = time.perf_counter()
+        try:
+            with ExitStack() as pile:
+                for connexion in connections.all():
+                    pile.enter_context(connexion.execute_wrapper(_mesurer_requete_sql))
+                if profileur:
+                    try:
+                        profileur.enable()
+                    except ValueError:
+                        # Python 3.12+ : un seul profileur actif par processus (sys.monitoring)
+                        profileur = None
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profileur:
+                        profileur.disable()
+        finally:
+            _mesures.reset(jeton)
+        total_ms = (time.perf_counter() - debut) * 1000
+
+        response.headers['Server-Timing'] = self._server_timing(mesures, total_ms)
+        lent = self.seuil_ms is not None and total_ms >= self.seuil_ms
+        fichier = self._ecrire_profil(profileur, request, total_ms) if profileur and (echantillonnee or lent) else None
+        self._journaliser(request, response, mesures, total_ms, fichier)
+        return response
+
+    @staticmethod
+    def _server_timing(mesures, total_ms):
+        entrees = []
+        for categorie in ('db', 'llm', 'rendu'):
+            nombre, duree = mesures.get(categorie, (0, 0.0))
+            entrees.append(f'{categorie};dur={duree * 1000:.1f};desc="{nombre}"')
+        entrees.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entrees)
+
+    def _ecrire_profil(self, profileur, request, total_ms):
+        self.repertoire.mkdir(parents=True, exist_ok=True)
+        chemin = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'racine'
+        fichier = self.repertoire / f'{time.strftime("%Y%m%d-%H%M%S")}_{request.method}_{chemin[:60]}_{int(total_ms)}ms.prof'
+        try:
+            profileur.dump_stats(fichier)
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire le profil {fichier} : {e}")
+            return None
+        return str(fichier)
+
+    @staticmethod
+    def _journaliser(request, response, mesures, total_ms, fichier):
+        ligne = {
+            'methode': request.method,
+            'chemin': request.path,
+            'statut': response.status_code,
+            'total_ms': round(total_ms, 1),
+        }
+        for categorie in ('db', 'llm', 'rendu'):
+            nombre, duree = mesures.get(categorie, (0, 0.0))
+            ligne[f'{categorie}_nb'] = nombre
+            ligne[f'{categorie}_ms'] = round(duree * 1000, 1)
+        if fichier:
+            ligne['profil'] = fichier
+        logger.info(json.dumps(ligne, ensure_ascii=False))
@@ -0,0 +1,109 @@
+"""
+Agrégats de progression par (étudiant, chapitre)
+- enregistrer_tentative : mise à jour incrémentale à chaque soumission
+- reconstruire_progressions : recalcul complet à partir des QuizResult
+"""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import ProgressionChapitre, QuizResult
+
+logger = logging.getLogger(__name__)
+
+# Poids de la dernière tentative dans la moyenne mobile exponentielle
+LISSAGE = 0.3
+
+
+def enregistrer_tentative(etudiant, chapitre, score, date_passage):
+    """
+    Met à jour le résumé (étudiant, chapitre) avec une nouvelle tentative.
+
+    Une seule requête UPDATE avec des expressions F() dans le cas courant ;
+    la ligne n'est créée qu'à la première tentative.
+    """
+    mise_a_jour = {
+        'nb_tentatives': F('nb_tentatives') + 1,
+        'meilleur_score': Greatest(F('meilleur_score'), Value(score)),
+        'dernier_score': score,
+        'moyenne_mobile': F('moyenne_mobile') * (1 - LISSAGE) + score * LISSAGE,
+        'date_derniere_tentative': date_passage,
+    }
+    lignes = ProgressionChapitre.objects.filter(etudiant=etudiant, chapitre=chapitre).update(**mise_a_jour)
+    if lignes:
+        return
+
+    try:
+        with transaction.atomic():
+            ProgressionChapitre.objects.create(
+                etudiant=etudiant,
+                chapitre=chapitre,
+                nb_tentatives=1,
+                meilleur_score=score,
+                dernier_score=score,
+                moyenne_mobile=score,
+                date_derniere_tentative=date_passage,
+            )
+    except IntegrityError:
+        # Une soumission concurrente a créé la ligne entre-temps
+        ProgressionChapitre.objects.filter(etudiant=etudiant, chapitre=chapitre).update(**mise_a_jour)
+
+
+def reconstruire_progressions(chunk_size=2000, etudiant_id=None):
+    """
+    Recalcule tous les résumés en un seul parcours trié des QuizResult.
+
+    Les résultats sont lus par lots (iterator) et les résumés insérés par
+    bulk_create : la mémoire reste bornée par un lot, quel que soit le volume.
+
+    Returns:
+        Nombre de résumés écrits
+    """
+    resultats = QuizResult.objects.order_by('etudiant_id', 'chapitre_id', 'date_passage', 'id')
+    existants = ProgressionChapitre.objects.all()
+    if etudiant_id is not None:
+        resultats = resultats.filter(etudiant_id=etudiant_id)
+        existants = existants.filter(etudiant_id=etudiant_id)
+
+    nb_ecrits = 0
+    lot = []
+    courant = None
+
+    with transaction.atomic():
+        existants.delete()
+
+        for etudiant_id_ligne, chapitre_id, score, date_passage in resultats.values_list(
+            'etudiant_id', 'chapitre_id', 'score', 'date_passage'
+        ).iterator(chunk_size=chunk_size):
+            if courant is None or (courant.etudiant_id, courant.chapitre_id) != (etudiant_id_ligne, chapitre_id):
+                if courant is not None:
+                    lot.append(courant)
+                courant = ProgressionChapitre(
+                    etudiant_id=etudiant_id_ligne,
+                    chapitre_id=chapitre_id,
+                    meilleur_score=score,
+                    moyenne_mobile=score,
+                )
+            else:
+                courant.moyenne_mobile = courant.moyenne_mobile * (1 - LISSAGE) + score * LISSAGE
+            courant.nb_tentatives += 1
+            courant.meilleur_score = max(courant.meilleur_score, score)
+            courant.dernier_score = score
+            courant.date_derniere_tentative = date_passage
+
+            if len(lot) >= chunk_size:
+                ProgressionChapitre.objects.bulk_create(lot)
+                nb_ecrits += len(lot)
+                lot = []
+
+        if courant is not None:
+            lot.append(courant)
+        if lot:
+            ProgressionChapitre.objects.bulk_create(lot)
+            nb_ecrits += len(lot)
+
+    logger.info(f"Progression reconstruite : {nb_ecrits} résumé(s)")
+    return nb_ecrits
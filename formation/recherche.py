@@ -0,0 +1,284 @@
+"""
+Recherche plein texte dans les formations, chapitres et questions
+- installer_index : table SQLite FTS5, déclencheurs de synchronisation et contenu initial
+- supprimer_index : retire table et déclencheurs (migration inverse)
+- fts_disponible : l'index FTS5 existe-t-il sur la base courante ?
+- rechercher : résultats classés (bm25, titres pondérés) avec extraits surlignés
+- rechercher_page : une page de résultats et l'existence d'une page suivante
+
+L'index est tenu à jour par des déclencheurs SQLite : toutes les écritures
+sont couvertes, y compris bulk_create et les UPDATE en masse de l'import
+(que les signaux ne voient pas). Le rowid encode le type et l'identifiant
+(id * 4 + type), d'où des mises à jour par clé primaire.
+
+Sur une autre base, ou un SQLite compilé sans FTS5, rechercher passe par un
+repli ORM (icontains sur chaque champ, classement simple) : correct mais en
+parcours de table, à réserver aux petits volumes.
+
+Attention : sur SQLite, une migration qui reconstruit une de ces tables
+(AlterField...) supprime ses déclencheurs ; relancer alors
+`python manage.py reconstruire_recherche`.
+"""
+
+import logging
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Chapitre, Formation, QuizQuestion
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'formation_recherche'
+
+# type -> (code du rowid, table source, colonne du lien, expression du titre, colonne du contenu)
+SOURCES = {
+    'formation': (1, Formation._meta.db_table, 'id', 'titre', 'description'),
+    'chapitre': (2, Chapitre._meta.db_table, 'formation_id', 'titre', 'contenu_texte'),
+    'question': (3, QuizQuestion._meta.db_table, 'chapitre_id', "''", 'question_texte'),
+}
+
+# Pondération bm25 par colonne (type, objet_id, lien_id, titre, contenu)
+POIDS_BM25 = (0.0, 0.0, 0.0, 10.0, 1.0)
+
+# Marqueurs de surlignage posés par FTS5, remplacés par <mark> après échappement HTML
+DEBUT_MARQUE, FIN_MARQUE = '\x02', '\x03'
+
+NB_TERMES_MAX = 10
+LONGUEUR_EXTRAIT = 200
+
+_TERME = re.compile(r'\w+')
+
+_fts = {}
+
+
+def _colonnes_surveillees(type_objet):
+    _, _, lien, titre, contenu = SOURCES[type_objet]
+    return [colonne for colonne in (titre, contenu, lien) if colonne not in ("''", 'id')]
+
+
+def _instructions_creation():
+    instructions = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+            type UNINDEXED, objet_id UNINDEXED, lien_id UNINDEXED, titre, contenu,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    ]
+    for type_objet, (code, table, lien, titre, contenu) in SOURCES.items():
+        valeur_titre = titre if titre == "''" else f'new.{titre}'
+        valeurs = f"new.id * 4 + {code}, '{type_objet}', new.id, new.{lien}, {valeur_titre}, new.{contenu}"
+        insertion = f'INSERT INTO {TABLE} (rowid, type, objet_id, lien_id, titre, contenu) VALUES ({valeurs});'
+        suppression = f'DELETE FROM {TABLE} WHERE rowid = old.id * 4 + {code};'
+        colonnes = _colonnes_surveillees(type_objet)
+        changement = ' OR '.join(f'old.{colonne} IS NOT new.{colonne}' for colonne in colonnes)
+        instructions += [
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{type_objet}_ai AFTER INSERT ON {table} BEGIN {insertion} END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{type_objet}_au AFTER UPDATE OF {", ".join(colonnes)} ON {table} '
+            f'WHEN {changement} BEGIN {suppression} {insertion} END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{type_objet}_ad AFTER DELETE ON {table} BEGIN {suppression} END',
+        ]
+    return instructions
+
+
+def installer_index(connexion=None):
+    """
+    Crée (si besoin) la table FTS5 et ses déclencheurs, puis reconstruit son
+    contenu à partir des tables sources. Idempotent.
+
+    Returns:
+        True si l'index est en place, False hors SQLite ou sans FTS5
+    """
+    connexion = connexion or connection
+    _fts.pop(connexion.alias, None)
+    if connexion.vendor != 'sqlite':
+        return False
+    instructions = _instructions_creation()
+    with connexion.cursor() as curseur:
+        try:
+            curseur.execute(instructions[0])
+        except OperationalError as e:
+            logger.warning(f"FTS5 indisponible, recherche par repli ORM : {e}")
+            return False
+        for instruction in instructions[1:]:
+            curseur.execute(instruction)
+        curseur.execute(f'DELETE FROM {TABLE}')
+        for type_objet, (code, table, lien, titre, contenu) in SOURCES.items():
+            curseur.execute(
+                f'INSERT INTO {TABLE} (rowid, type, objet_id, lien_id, titre, contenu) '
+                f"SELECT id * 4 + {code}, '{type_objet}', id, {lien}, {titre}, {contenu} FROM {table}"
+            )
+        curseur.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return True
+
+
+def supprimer_index(connexion=None):
+    connexion = connexion or connection
+    _fts.pop(connexion.alias, None)
+    if connexion.vendor != 'sqlite':
+        return
+    with connexion.cursor() as curseur:
+        for type_objet in SOURCES:
+            for evenement in ('ai', 'au', 'ad'):
+                curseur.execute(f'DROP TRIGGER IF EXISTS {TABLE}_{type_objet}_{evenement}')
+        curseur.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def fts_disponible():
+    """Vrai si la table FTS5 existe sur la base courante (vérifié une fois par processus)."""
+    if connection.alias not in _fts:
+        _fts[connection.alias] = connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+    return _fts[connection.alias]
+
+
+def termes_recherche(texte):
+    return _TERME.findall(texte or '')[:NB_TERMES_MAX]
+
+
+def _surligner_marques(texte):
+    """Échappe le texte produit par FTS5 puis remplace ses marqueurs par <mark>."""
+    return mark_safe(escape(texte).replace(DEBUT_MARQUE, '<mark>').replace(FIN_MARQUE, '</mark>'))
+
+
+def _surligner(texte, termes, longueur=None):
+    """Repli : surligne les termes (sans tenir compte de la casse), extrait centré sur la première occurrence."""
+    texte = texte or ''
+    motif = re.compile('|'.join(re.escape(terme) for terme in termes), re.IGNORECASE) if termes else None
+    if longueur and len(texte) > longueur:
+        occurrence = motif.search(texte) if motif else None
+        debut = max(0, (occurrence.start() if occurrence else 0) - longueur // 4)
+        texte = ('…' if debut else '') + texte[debut:debut + longueur] + ('…' if debut + longueur < len(texte) else '')
+    if motif is None:
+        return mark_safe(escape(texte))
+    morceaux = []
+    position = 0
+    for occurrence in motif.finditer(texte):
+        morceaux.append(escape(texte[position:occurrence.start()]))
+        morceaux.append(f'<mark>{escape(occurrence.group())}</mark>')
+        position = occurrence.end()
+    morceaux.append(escape(texte[position:]))
+    return mark_safe(''.join(morceaux))
+
+
+def _rechercher_fts(termes, type_objet, limite, decalage):
+    requete = ' '.join(f'"{terme}"*' for terme in termes)
+    sql = (
+        f"SELECT type, objet_id, lien_id, titre, "
+        f"highlight({TABLE}, 3, %s, %s), snippet({TABLE}, 4, %s, %s, '…', 24), "
+        f"bm25({TABLE}, {', '.join(str(poids) for poids in POIDS_BM25)}) AS score "
+        f"FROM {TABLE} WHERE {TABLE} MATCH %s"
+    )
+    parametres = [DEBUT_MARQUE, FIN_MARQUE, DEBUT_MARQUE, FIN_MARQUE, requete]
+    if type_objet:
+        sql += ' AND type = %s'
+        parametres.append(type_objet)
+    sql += ' ORDER BY score LIMIT %s OFFSET %s'
+    parametres += [limite, decalage]
+    with connection.cursor() as curseur:
+        curseur.execute(sql, parametres)
+        lignes = curseur.fetchall()
+    return [
+        {
+            'type': type_ligne,
+            'id': objet_id,
+            'lien_id': lien_id,
+            'titre': titre,
+            'titre_html': _surligner_marques(titre_marque),
+            'extrait_html': _surligner_marques(extrait),
+            # bm25 est négatif, plus petit = plus pertinent
+            'score': round(-score, 4),
+        }
+        for type_ligne, objet_id, lien_id, titre, titre_marque, extrait, score in lignes
+    ]
+
+
+def _rechercher_orm(termes, type_objet, limite, decalage):
+    resultats = []
+    for type_source, (_, _, lien, titre, contenu) in SOURCES.items():
+        if type_objet and type_source != type_objet:
+            continue
+        modele = {'formation': Formation, 'chapitre': Chapitre, 'question': QuizQuestion}[type_source]
+        champs = [champ for champ in (titre, contenu) if champ != "''"]
+        condition = Q()
+        for terme in termes:
+            condition &= Q(*[Q(**{f'{champ}__icontains': terme}) for champ in champs], _connector=Q.OR)
+        lignes = modele.objects.filter(condition).order_by('id').values_list(
+            'id', lien, *champs
+        )[:limite + decalage]
+        for objet_id, lien_id, *textes in lignes:
+            texte_titre = textes[0] if len(champs) == 2 else ''
+            texte_contenu = textes[-1]
+            score = sum(
+                10 * texte_titre.lower().count(terme.lower()) + texte_contenu.lower().count(terme.lower())
+                for terme in termes
+            )
+            resultats.append({
+                'type': type_source,
+                'id': objet_id,
+                'lien_id': lien_id,
+                'titre': texte_titre,
+                'titre_html': _surligner(texte_titre, termes),
+                'extrait_html': _surligner(texte_contenu, termes, LONGUEUR_EXTRAIT),
+                'score': float(score),
+            })
+    resultats.sort(key=lambda resultat: -resultat['score'])
+    return resultats[decalage:decalage + limite]
+
+
+def _completer(resultats):
+    """Contexte (formation ou chapitre parent) et URL de chaque résultat, en deux requêtes au plus."""
+    formations = dict(Formation.objects.filter(
+        id__in=[resultat['lien_id'] for resultat in resultats if resultat['type'] == 'chapitre']
+    ).values_list('id', 'titre'))
+    chapitres = dict(Chapitre.objects.filter(
+        id__in=[resultat['lien_id'] for resultat in resultats if resultat['type'] == 'question']
+    ).values_list('id', 'titre'))
+    for resultat in resultats:
+        if resultat['type'] == 'formation':
+            resultat['contexte'] = ''
+            resultat['url'] = reverse('formation_detail', args=[resultat['id']])
+        elif resultat['type'] == 'chapitre':
+            resultat['contexte'] = formations.get(resultat['lien_id'], '')
+            resultat['url'] = reverse('formation_detail', args=[resultat['lien_id']])
+        else:
+            resultat['contexte'] = chapitres.get(resultat['lien_id'], '')
+            resultat['url'] = reverse('quiz_detail', args=[resultat['lien_id']])
+    return resultats
+
+
+def rechercher(texte, type_objet=None, limite=20, decalage=0):
+    """
+    Résultats classés par pertinence.
+
+    Args:
+        texte: Saisie de l'utilisateur (termes en ET, préfixes acceptés)
+        type_objet: 'formation', 'chapitre', 'question' ou None pour tous
+
+    Returns:
+        Liste de dictionnaires : type, id, lien_id, titre, titre_html,
+        extrait_html (HTML sûr, termes en <mark>), score, contexte, url
+    """
+    termes = termes_recherche(texte)
+    if not termes:
+        return []
+    if type_objet and type_objet not in SOURCES:
+        raise ValueError(f"Type de résultat inconnu : {type_objet}")
+    if fts_disponible():
+        resultats = _rechercher_fts(termes, type_objet, limite, decalage)
+    else:
+        resultats = _rechercher_orm(termes, type_objet, limite, decalage)
+    return _completer(resultats)
+
+
+def rechercher_page(texte, type_objet=None, page=1, taille=20):
+    """
+    Returns:
+        Tuple (résultats de la page, True s'il existe une page suivante)
+    """
+    resultats = rechercher(texte, type_objet, limite=taille + 1, decalage=(page - 1) * taille)
+    return resultats[:taille], len(resultats) > taille
@@ -0,0 +1,62 @@
+"""
+Lectures analytiques sur une base réplique
+- alias_replique : alias de la réplique configurée, ou None (tout reste sur 'default')
+- analytique : manager d'un modèle dont les requêtes de lecture vont à la réplique
+- RouteurReplique : routeur Django (DATABASE_ROUTERS)
+
+Seules les lectures marquées par analytique() (exports, calcul des indices
+d'items, statistiques professeur) partent vers la réplique : les soumissions de
+quiz, les écritures et toutes les autres lectures restent sur la base
+principale. Une lecture marquée faite dans une transaction ouverte sur
+'default' y reste aussi : elle doit voir les écritures de la transaction.
+
+Le marquage passe par les hints du queryset : il suit le queryset jusqu'à son
+évaluation, y compris pour un export en flux lu après la fin de la vue.
+Configuration : BASE_ANALYTIQUE (second fichier SQLite, ou URI SQLite en lecture
+seule sur le fichier principal) ; alias dans REPLIQUE_ANALYTIQUE_ALIAS.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+INDICE = 'lecture_analytique'
+
+
+def alias_replique():
+    alias = getattr(settings, 'REPLIQUE_ANALYTIQUE_ALIAS', 'analytique')
+    return alias if alias in settings.DATABASES else None
+
+
+def analytique(modele):
+    """
+    Manager de `modele` dont les requêtes de lecture sont servies par la réplique.
+
+    Exemple : replique.analytique(QuizResult).filter(chapitre=chapitre)
+    """
+    return modele._default_manager.db_manager(hints={INDICE: True})
+
+
+class RouteurReplique:
+    """Envoie les lectures analytiques à la réplique, tout le reste à la base principale."""
+
+    def db_for_read(self, model, **hints):
+        if not hints.get(INDICE):
+            return None
+        alias = alias_replique()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Y compris pour une instance lue sur la réplique
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données des deux côtés
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique est une copie de la base principale : jamais migrée directement
+        if db == alias_replique():
+            return False
+        return None
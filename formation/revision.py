@@ -0,0 +1,162 @@
+"""
+Révision espacée (algorithme SM-2)
+- appliquer_sm2 : met à jour un état à partir d'une note de rappel (0-5)
+- enregistrer_revisions : met à jour en lot les états à partir des réponses d'une soumission
+- revisions_dues : file des révisions dues, lue via l'index (etudiant, date_echeance)
+- replanifier_en_retard : étale les révisions en retard par lots
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EtatRevision
+
+logger = logging.getLogger(__name__)
+
+# Notes de rappel SM-2 associées aux réponses de QCM
+QUALITE_CORRECTE = 4
+QUALITE_INCORRECTE = 1
+QUALITE_SANS_REPONSE = 0
+
+FACILITE_MIN = 1.3
+
+CHAMPS_ETAT = ['repetitions', 'intervalle', 'facilite', 'date_echeance', 'derniere_revision', 'nb_revisions', 'nb_echecs']
+
+
+def qualite_reponse(reponse, bonne_reponse):
+    """Convertit une réponse de QCM en note de rappel SM-2."""
+    if not reponse:
+        return QUALITE_SANS_REPONSE
+    return QUALITE_CORRECTE if reponse == bonne_reponse else QUALITE_INCORRECTE
+
+
+def appliquer_sm2(etat, qualite, maintenant):
+    """
+    Applique une révision de note `qualite` (0-5) à l'état, sans l'enregistrer.
+
+    Rappel réussi (qualite >= 3) : intervalle 1 jour, puis 6 jours, puis intervalle x facilité.
+    Échec : retour à 1 jour. La facilité est ajustée dans les deux cas.
+    """
+    if qualite >= 3:
+        if etat.repetitions == 0:
+            etat.intervalle = 1
+        elif etat.repetitions == 1:
+            etat.intervalle = 6
+        else:
+            etat.intervalle = max(1, round(etat.intervalle * etat.facilite))
+        etat.repetitions += 1
+    else:
+        etat.repetitions = 0
+        etat.intervalle = 1
+        etat.nb_echecs += 1
+
+    ecart = 5 - qualite
+    etat.facilite = max(FACILITE_MIN, etat.facilite + 0.1 - ecart * (0.08 + ecart * 0.02))
+    etat.nb_revisions += 1
+    etat.derniere_revision = maintenant
+    etat.date_echeance = maintenant + timedelta(days=etat.intervalle)
+    return etat
+
+
+def enregistrer_revisions(etudiant, questions, reponses_etudiant, maintenant=None):
+    """
+    Met à jour les états de révision de l'étudiant pour les questions d'une soumission.
+
+    Trois requêtes quel que soit le nombre de questions, dans une transaction :
+    création des états manquants (bulk_create, conflits ignorés), relecture de
+    tous les états, bulk_update. La création vient en premier : elle prend le
+    verrou d'écriture SQLite (verrous de lignes ailleurs, select_for_update), et
+    une soumission concurrente est donc appliquée avant ou après celle-ci, jamais
+    écrasée.
+
+    Args:
+        etudiant: Utilisateur ayant répondu
+        questions: Itérable de QuizQuestion présentées
+        reponses_etudiant: Dictionnaire {'question_id': 'A' | None}
+    """
+    maintenant = maintenant or timezone.now()
+    questions = list(questions)
+    if not questions:
+        return
+
+    with transaction.atomic():
+        EtatRevision.objects.bulk_create(
+            [EtatRevision(etudiant=etudiant, question=question) for question in questions],
+            ignore_conflicts=True,
+        )
+        etats = {
+            etat.question_id: etat
+            for etat in EtatRevision.objects.select_for_update().filter(
+                etudiant=etudiant,
+                question_id__in=[question.id for question in questions],
+            )
+        }
+        for question in questions:
+            qualite = qualite_reponse(reponses_etudiant.get(str(question.id)), question.bonne_reponse)
+            appliquer_sm2(etats[question.id], qualite, maintenant)
+        EtatRevision.objects.bulk_update(list(etats.values()), CHAMPS_ETAT)
+
+
+def revisions_dues(etudiant, limite=None, maintenant=None):
+    """
+    Retourne les révisions dues de l'étudiant, les plus en retard d'abord.
+    Parcours de la plage (etudiant, date_echeance <= maintenant) de l'index, borné par `limite`.
+    """
+    maintenant = maintenant or timezone.now()
+    limite = limite or getattr(settings, 'REVISION_TAILLE_SESSION', 20)
+    return (
+        EtatRevision.objects.filter(etudiant=etudiant, date_echeance__lte=maintenant)
+        .select_related('question')
+        .order_by('date_echeance')[:limite]
+    )
+
+
+def nombre_revisions_dues(etudiant, maintenant=None):
+    """Nombre de révisions dues (COUNT couvert par l'index)."""
+    maintenant = maintenant or timezone.now()
+    return EtatRevision.objects.filter(etudiant=etudiant, date_echeance__lte=maintenant).count()
+
+
+def replanifier_en_retard(jours=7, taille_lot=1000, etudiant_id=None, maintenant=None):
+    """
+    Étale les révisions en retard sur les `jours` prochains jours.
+
+    Parcours par pagination sur la clé primaire (pk > dernier_pk) et mise à jour
+    par bulk_update, une transaction par lot : la mémoire et la durée des verrous
+    restent bornées par `taille_lot`.
+
+    Returns:
+        Nombre d'états replanifiés
+    """
+    maintenant = maintenant or timezone.now()
+    jours = max(1, jours)
+    en_retard = EtatRevision.objects.filter(date_echeance__lt=maintenant)
+    if etudiant_id is not None:
+        en_retard = en_retard.filter(etudiant_id=etudiant_id)
+
+    dernier_pk = 0
+    nb_replanifies = 0
+    while True:
+        lot = list(
+            en_retard.filter(pk__gt=dernier_pk)
+            .order_by('pk')
+            .only('pk', 'date_echeance')[:taille_lot]
+        )
+        if not lot:
+            break
+
+        for position, etat in enumerate(lot, start=nb_replanifies):
+            etat.date_echeance = maintenant + timedelta(days=position % jours)
+
+        with transaction.atomic():
+            EtatRevision.objects.bulk_update(lot, ['date_echeance'])
+
+        nb_replanifies += len(lot)
+        dernier_pk = lot[-1].pk
+        logger.info(f"Replanification : {nb_replanifies} état(s) traités")
+
+    return nb_replanifies
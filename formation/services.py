@@ -1,6 +1,10 @@
 """
 Service IA pour la génération de contenu via OpenAI API ou Groq (API gratuite)
 Gestion robuste des erreurs, retry automatique, logging et validation JSON
+
+Le SDK openai (et httpx, pydantic) n'est importé qu'à la création du premier
+ServiceIA : les processus qui n'appellent jamais l'IA (démarrage des workers,
+commandes, tests) ne paient pas son import (voir benchmark_demarrage).
 """
 
 import json
@@ -9,12 +13,28 @@ import logging
 import time
 from typing import Dict, List, Optional, Any
 from django.conf import settings
-from openai import OpenAI
-from openai import APITimeoutError, APIError, APIConnectionError
+
+from .profilage import mesurer
+from . import budgets, modeles_ia, passages
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+# Appels API : timeout (secondes) et tentatives par défaut (pause de 2**n s entre deux tentatives)
+TIMEOUT_DEFAUT = 30
+TENTATIVES_DEFAUT = 3
+
+# Plafond de tokens d'un appel de génération : fixe + par question demandée (2000 au plus)
+TOKENS_QUIZ_BASE = 300
+TOKENS_PAR_QUESTION = 250
+
+# Feedback : longueur minimale (caractères) d'une réponse acceptée sans passer au palier suivant
+FEEDBACK_LONGUEUR_MIN = 40
+
+# Plafond de tokens d'un feedback groupé : fixe + par question (2000 au plus)
+TOKENS_FEEDBACK_BASE = 100
+TOKENS_PAR_FEEDBACK = 200
+
 
 class ServiceIA:
     """
@@ -25,7 +45,8 @@ class ServiceIA:
     Pour utiliser OpenAI, définir USE_OPENAI=True dans settings.
     """
     
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 30, max_retries: int = 3, provider: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, timeout: int = TIMEOUT_DEFAUT, max_retries: int = TENTATIVES_DEFAUT,
+                 provider: Optional[str] = None):
         """
         Initialise le client OpenAI/Groq avec gestion d'erreur.
         
@@ -36,6 +57,9 @@ class ServiceIA:
             provider: "groq" ou "openai" (si None, utilise la config dans settings)
         """
         try:
+            # Import différé du SDK (coûteux) : seulement quand un appel IA est prévu
+            from openai import OpenAI
+            
             # Détermination du provider à utiliser
             if provider:
                 self.provider = provider.lower()
@@ -86,6 +110,13 @@ class ServiceIA:
             logger.error(f"Erreur lors de l'initialisation de ServiceIA : {e}")
             raise Exception(f"Impossible d'initialiser le service IA : {str(e)}")
     
+    def modeles(self, operation: str) -> List[str]:
+        """
+        Paliers de modèles d'une opération ('feedback', 'quiz'), du plus rapide au
+        plus capable (MODELES_IA_GROQ / MODELES_IA_OPENAI, défaut : model_name).
+        """
+        return modeles_ia.modeles(self.provider, operation, self.model_name)
+    
     def nettoyer_json(self, texte: str) -> str:
         """
         Nettoie le texte JSON retourné par l'API OpenAI.
@@ -139,12 +170,16 @@ class ServiceIA:
         Raises:
             Exception: Si toutes les tentatives échouent
         """
+        # Déjà chargé par __init__ : l'import ne coûte ici qu'une recherche dans sys.modules
+        from openai import APITimeoutError, APIError, APIConnectionError
+        
         dernier_erreur = None
         
         for tentative in range(1, self.max_retries + 1):
             try:
                 logger.info(f"Tentative {tentative}/{self.max_retries} d'appel API")
-                resultat = fonction_appel(*args, **kwargs)
+                with mesurer('llm'):
+                    resultat = fonction_appel(*args, **kwargs)
                 logger.info("Appel API réussi")
                 return resultat
                 
@@ -225,6 +260,121 @@ class ServiceIA:
         logger.error(f"Échec après {self.max_retries} tentatives")
         raise Exception(f"Impossible de contacter l'API OpenAI après {self.max_retries} tentatives : {str(dernier_erreur)}")
     
+    def _appel_chat(self, operation: str, chapitre_id: int, modele: str, prompt_systeme: str, prompt_user: str,
+                    temperature: float, max_tokens: int) -> Any:
+        """
+        Appel de complétion imputé au budget de la formation du chapitre : les tokens
+        sont estimés et réservés avant l'appel (budgets.BudgetIADepasse si un budget
+        du jour serait dépassé), puis remplacés par l'usage réel de la réponse.
+        """
+        messages = [
+            {"role": "system", "content": prompt_systeme},
+            {"role": "user", "content": prompt_user}
+        ]
+        imputation = budgets.reserver(operation, chapitre_id, modele, budgets.estimer_appel(messages, max_tokens))
+        
+        def appel_api():
+            return self.client.chat.completions.create(
+                model=modele,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=self.timeout
+            )
+        
+        try:
+            response = self._appel_api_avec_retry(appel_api)
+        except BaseException:
+            budgets.annuler(imputation)
+            raise
+        budgets.reconcilier(imputation, getattr(response, 'usage', None))
+        return response
+    
+    @staticmethod
+    def valider_question(q) -> Optional[str]:
+        """
+        Vérifie une question renvoyée par le modèle.
+        
+        Returns:
+            None si la question est valide, sinon la raison du rejet
+        """
+        if not isinstance(q, dict) or not all(key in q for key in ["question", "choix", "bonne_reponse", "explication"]):
+            return "question incomplète"
+        if not isinstance(q["choix"], list) or len(q["choix"]) != 4:
+            return "format de choix invalide"
+        bonne_reponse_idx = q["bonne_reponse"]
+        if not isinstance(bonne_reponse_idx, int) or bonne_reponse_idx < 0 or bonne_reponse_idx > 3:
+            return "index de bonne réponse invalide"
+        return None
+    
+    @staticmethod
+    def valider_feedback(feedback: str, finish_reason: Optional[str] = None) -> Optional[str]:
+        """
+        Vérifie un feedback renvoyé par le modèle.
+        
+        Returns:
+            None si le feedback est utilisable, sinon la raison du rejet
+        """
+        if len(feedback) < FEEDBACK_LONGUEUR_MIN:
+            return "feedback vide ou trop court"
+        if finish_reason == 'length':
+            return "feedback tronqué (max_tokens atteint)"
+        if feedback.startswith(('{', '[', '`')):
+            return "format inattendu"
+        return None
+    
+    @staticmethod
+    def _normaliser_question(texte) -> str:
+        return ' '.join(str(texte).lower().split())
+    
+    @staticmethod
+    def _prompt_quiz(extrait: str, nombre_questions: int, niveau_difficulte: str, exclusions: List[Dict[str, Any]]) -> str:
+        """Prompt utilisateur de génération ; `exclusions` : questions déjà retenues à ne pas reposer."""
+        prompt = f"""Génère exactement {nombre_questions} questions QCM {niveau_difficulte} basées sur ce texte de cours :
+
+{extrait}
+
+Assure-toi que :
+- Chaque question teste une compétence différente
+- Les choix de réponses sont plausibles (évite les réponses évidentes)
+- La bonne réponse est bien répartie (pas toujours la première)
+- Les explications sont claires et pédagogiques"""
+        if exclusions:
+            deja_posees = "\n".join(f"- {q['question']}" for q in exclusions)
+            prompt += f"""
+
+Ces questions sont déjà retenues : ne les repose pas et ne les reformule pas.
+{deja_posees}"""
+        return prompt
+    
+    def _demander_questions(self, chapitre_id: int, prompt_systeme: str, prompt_user: str, max_tokens: int,
+                            modele: str) -> List[Any]:
+        """
+        Un appel de génération ; retourne la liste brute des questions, vide si la
+        réponse n'est pas un JSON exploitable (l'appelant redemande les manquantes).
+        """
+        response = self._appel_chat('quiz', chapitre_id, modele, prompt_systeme, prompt_user,
+                                    temperature=0.7, max_tokens=max_tokens)
+        
+        # Récupération et nettoyage de la réponse
+        content = response.choices[0].message.content or ""
+        logger.debug(f"Réponse brute reçue (premiers 200 caractères) : {content[:200]}...")
+        content_nettoye = self.nettoyer_json(content)
+        
+        # Parsing et normalisation de la structure
+        try:
+            questions_data = json.loads(content_nettoye)
+        except json.JSONDecodeError as e:
+            logger.error(f"Erreur de parsing JSON : {e}")
+            logger.error(f"Contenu reçu : {content_nettoye[:500]}")
+            return []
+        if isinstance(questions_data, dict) and isinstance(questions_data.get("questions"), list):
+            return questions_data["questions"]
+        if isinstance(questions_data, list):
+            return questions_data
+        logger.error("Format de réponse inattendu : structure JSON invalide")
+        return []
+    
     def generer_quiz(self, chapitre, nombre_questions: int = 5, difficulte: str = "Moyen") -> List[Dict[str, Any]]:
         """
         Génère un quiz complet à partir du contenu d'un chapitre.
@@ -237,6 +387,12 @@ class ServiceIA:
         Returns:
             Liste de dictionnaires contenant les questions au format standardisé
             
+        Les questions invalides (choix, index) sont écartées et seules les
+        manquantes sont redemandées, au plus GENERATION_QUIZ_APPELS_MAX appels
+        au total : le quiz peut rester incomplet, jamais vide. Un complément en
+        échec (API, budget du jour) garde les questions déjà retenues ; l'erreur
+        n'est levée que si aucune ne l'a été.
+            
         Format JSON attendu:
         {
             "questions": [
@@ -287,84 +443,90 @@ RÈGLES IMPORTANTES :
                 "Difficile": "des questions complexes nécessitant une analyse approfondie"
             }.get(difficulte, "des questions de niveau intermédiaire")
             
-            prompt_user = f"""Génère exactement {nombre_questions} questions QCM {niveau_difficulte} basées sur ce texte de cours :
-
-{texte[:4000]}  # Limite à 4000 caractères pour éviter les tokens excessifs
-
-Assure-toi que :
-- Chaque question teste une compétence différente
-- Les choix de réponses sont plausibles (évite les réponses évidentes)
-- La bonne réponse est bien répartie (pas toujours la première)
-- Les explications sont claires et pédagogiques"""
-            
-            logger.info(f"Génération de quiz pour chapitre '{chapitre.titre}' ({nombre_questions} questions, {difficulte})")
-            
-            # Appel API avec retry
-            def appel_api():
-                return self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": prompt_systeme},
-                        {"role": "user", "content": prompt_user}
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000,
-                    timeout=self.timeout
-                )
-            
-            response = self._appel_api_avec_retry(appel_api)
-            
-            # Récupération et nettoyage de la réponse
-            content = response.choices[0].message.content
-            logger.debug(f"Réponse brute reçue (premiers 200 caractères) : {content[:200]}...")
-            
-            # Nettoyage du JSON
-            content_nettoye = self.nettoyer_json(content)
-            
-            # Parsing et validation du JSON
-            try:
-                questions_data = json.loads(content_nettoye)
-            except json.JSONDecodeError as e:
-                logger.error(f"Erreur de parsing JSON : {e}")
-                logger.error(f"Contenu reçu : {content_nettoye[:500]}")
-                raise ValueError(f"Le format JSON retourné par l'IA est invalide : {str(e)}")
-            
-            # Normalisation de la structure
-            if isinstance(questions_data, dict) and "questions" in questions_data:
-                questions_list = questions_data["questions"]
-            elif isinstance(questions_data, list):
-                questions_list = questions_data
-            else:
-                raise ValueError("Format de réponse inattendu : structure JSON invalide")
-            
-            # Validation de chaque question
+            # Passages du cours les plus pertinents pour le thème du chapitre (index BM25),
+            # dans la limite de PASSAGES_LIMITE_QUIZ caractères
+            passages.indexer_chapitre(chapitre.id, texte)
+            extrait = passages.contexte(
+                chapitre.id,
+                chapitre.titre,
+                k=getattr(settings, 'PASSAGES_NB_QUIZ', 8),
+                limite=getattr(settings, 'PASSAGES_LIMITE_QUIZ', 4000),
+            ) or texte[:getattr(settings, 'PASSAGES_LIMITE_QUIZ', 4000)]
+            
+            # Boucle de complément : chaque appel ne demande que les questions manquantes,
+            # en excluant celles déjà retenues (pas de régénération complète du quiz).
+            # Cascade : un appel qui n'apporte pas toutes les questions demandées (rejets,
+            # JSON invalide, erreur d'API) fait passer les compléments au palier suivant.
             questions_validees = []
-            for idx, q in enumerate(questions_list):
+            paliers = self.modeles('quiz')
+            rang = rang_utilise = 0
+            appels_max = getattr(settings, 'GENERATION_QUIZ_APPELS_MAX', 3)
+            for appel in range(1, appels_max + 1):
+                manquantes = nombre_questions - len(questions_validees)
+                if manquantes <= 0:
+                    break
+                
+                modele = paliers[rang]
+                logger.info(
+                    f"Génération de quiz pour chapitre '{chapitre.titre}' "
+                    f"({manquantes}/{nombre_questions} questions, {difficulte}, appel {appel}/{appels_max}, {modele})"
+                )
+                debut = time.perf_counter()
                 try:
-                    # Vérification des champs requis
-                    if not all(key in q for key in ["question", "choix", "bonne_reponse", "explication"]):
-                        logger.warning(f"Question {idx + 1} incomplète, ignorée")
-                        continue
-                    
-                    # Vérification du format des choix
-                    if not isinstance(q["choix"], list) or len(q["choix"]) != 4:
-                        logger.warning(f"Question {idx + 1} : format de choix invalide, ignorée")
+                    questions_list = self._demander_questions(
+                        chapitre.id,
+                        prompt_systeme,
+                        self._prompt_quiz(extrait, manquantes, niveau_difficulte, questions_validees),
+                        max_tokens=min(2000, TOKENS_QUIZ_BASE + TOKENS_PAR_QUESTION * manquantes),
+                        modele=modele,
+                    )
+                except budgets.BudgetIADepasse as e:
+                    if not questions_validees:
+                        raise
+                    # Les questions déjà retenues ont été payées : quiz incomplet plutôt que rien
+                    logger.warning(f"Compléments interrompus : {e}")
+                    break
+                except Exception as e:
+                    modeles_ia.enregistrer_appel('quiz', modele, time.perf_counter() - debut, 'erreur')
+                    if rang == len(paliers) - 1:
+                        if not questions_validees:
+                            raise
+                        logger.warning(f"Échec du complément avec le modèle {modele} ({e}), quiz incomplet")
+                        break
+                    logger.warning(f"Échec de l'appel au modèle {modele}, passage au palier suivant")
+                    rang += 1
+                    continue
+                duree = time.perf_counter() - debut
+                rang_utilise = rang
+                
+                # Validation de chaque question (les doublons d'une question déjà retenue sont ignorés)
+                nb_avant = len(questions_validees)
+                deja_retenues = {self._normaliser_question(q["question"]) for q in questions_validees}
+                for idx, q in enumerate(questions_list):
+                    raison = self.valider_question(q)
+                    if raison:
+                        logger.warning(f"Question {idx + 1} (appel {appel}) : {raison}, ignorée")
                         continue
-                    
-                    # Vérification de l'index de bonne réponse
-                    bonne_reponse_idx = q["bonne_reponse"]
-                    if not isinstance(bonne_reponse_idx, int) or bonne_reponse_idx < 0 or bonne_reponse_idx > 3:
-                        logger.warning(f"Question {idx + 1} : index de bonne réponse invalide, ignorée")
+                    if self._normaliser_question(q["question"]) in deja_retenues:
+                        logger.warning(f"Question {idx + 1} (appel {appel}) : doublon, ignorée")
                         continue
-                    
+                    deja_retenues.add(self._normaliser_question(q["question"]))
                     questions_validees.append(q)
-                    
-                except Exception as e:
-                    logger.warning(f"Erreur lors de la validation de la question {idx + 1} : {e}")
-                    continue
+                    if len(questions_validees) == nombre_questions:
+                        break
+                
+                complet = len(questions_validees) - nb_avant >= manquantes
+                modeles_ia.enregistrer_appel('quiz', modele, duree, 'valide' if complet else 'rejet')
+                if not complet and rang < len(paliers) - 1:
+                    rang += 1
             
+            modeles_ia.enregistrer_demande('quiz', rang_utilise if questions_validees else None)
             if not questions_validees:
                 raise ValueError("Aucune question valide n'a pu être générée")
+            if len(questions_validees) < nombre_questions:
+                logger.warning(
+                    f"Quiz incomplet après {appel} appel(s) : {len(questions_validees)}/{nombre_questions} questions"
+                )
             
             logger.info(f"Quiz généré avec succès : {len(questions_validees)} questions valides")
             return questions_validees
@@ -372,6 +534,9 @@ Assure-toi que :
         except ValueError as e:
             logger.error(f"Erreur de validation : {e}")
             raise e
+        except budgets.BudgetIADepasse as e:
+            logger.warning(f"Génération refusée : {e}")
+            raise
         except Exception as e:
             logger.error(f"Erreur lors de la génération du quiz : {e}")
             raise Exception(f"Impossible de générer le quiz : {str(e)}")
@@ -405,42 +570,176 @@ Assure-toi que :
 Ton rôle est d'expliquer les erreurs des étudiants de manière constructive et pédagogique.
 Utilise un ton positif et motivant, même quand l'étudiant s'est trompé."""
             
+            # Extraits du cours liés à la question et à la bonne réponse (index BM25)
+            extrait = passages.contexte(
+                question.chapitre_id,
+                f"{question.question_texte} {bonne_reponse_texte} {reponse_texte}",
+                k=getattr(settings, 'PASSAGES_NB_FEEDBACK', 3),
+                limite=getattr(settings, 'PASSAGES_LIMITE_FEEDBACK', 1500),
+                pertinents_seulement=True,
+            )
+            extrait_cours = f"""
+
+Extraits du cours sur lesquels t'appuyer :
+{extrait}""" if extrait else ""
+            
             prompt_user = f"""L'étudiant a répondu "{reponse_utilisateur}) {reponse_texte}" à la question suivante :
 
 "{question.question_texte}"
 
-La bonne réponse était "{bonne_reponse}) {bonne_reponse_texte}".
+La bonne réponse était "{bonne_reponse}) {bonne_reponse_texte}".{extrait_cours}
 
 Génère un feedback pédagogique en 2-3 phrases qui :
 1. Explique pourquoi la réponse choisie est incorrecte (si applicable)
-2. Explique pourquoi la bonne réponse est correcte
+2. Explique pourquoi la bonne réponse est correcte (en t'appuyant sur les extraits du cours s'il y en a)
 3. Encourage l'étudiant à continuer à apprendre
 
 Réponds UNIQUEMENT avec le feedback, sans introduction ni conclusion."""
             
             logger.info(f"Génération de feedback pour question {question.id}")
             
-            # Appel API avec retry
-            def appel_api():
-                return self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": prompt_systeme},
-                        {"role": "user", "content": prompt_user}
-                    ],
-                    temperature=0.8,
-                    max_tokens=200,
-                    timeout=self.timeout
-                )
-            
-            response = self._appel_api_avec_retry(appel_api)
-            
-            feedback = response.choices[0].message.content.strip()
-            logger.info("Feedback généré avec succès")
-            
-            return feedback
+            # Cascade : palier rapide d'abord, palier suivant si la réponse est rejetée
+            paliers = self.modeles('feedback')
+            for rang, modele in enumerate(paliers):
+                dernier = rang == len(paliers) - 1
+                debut = time.perf_counter()
+                try:
+                    response = self._appel_chat('feedback', question.chapitre_id, modele, prompt_systeme, prompt_user,
+                                                temperature=0.8, max_tokens=200)
+                except budgets.BudgetIADepasse:
+                    raise
+                except Exception as e:
+                    modeles_ia.enregistrer_appel('feedback', modele, time.perf_counter() - debut, 'erreur')
+                    if dernier:
+                        raise
+                    logger.warning(f"Échec de l'appel au modèle {modele} ({e}), passage au palier suivant")
+                    continue
+                duree = time.perf_counter() - debut
+                
+                choix = response.choices[0]
+                feedback = (choix.message.content or "").strip()
+                raison = self.valider_feedback(feedback, getattr(choix, 'finish_reason', None))
+                modeles_ia.enregistrer_appel('feedback', modele, duree, 'rejet' if raison else 'valide')
+                if not raison:
+                    modeles_ia.enregistrer_demande('feedback', rang)
+                    logger.info(f"Feedback généré avec succès ({modele})")
+                    return feedback
+                logger.warning(f"Feedback du modèle {modele} rejeté : {raison}")
+            
+            modeles_ia.enregistrer_demande('feedback', None)
+            raise ValueError("Aucun feedback valide n'a pu être généré")
             
         except Exception as e:
             logger.error(f"Erreur lors de la génération du feedback : {e}")
             # Fallback : retourne une explication basique
             return f"La bonne réponse était {bonne_reponse}. {question.explication}"
+    
+    def generer_feedbacks(self, elements: List[Any]) -> Dict[int, str]:
+        """
+        Génère en un seul appel les feedbacks de plusieurs réponses fausses.
+        
+        Le modèle renvoie un objet JSON {id de question: feedback}, validé élément
+        par élément (valider_feedback). Les éléments absents ou rejetés sont
+        redemandés, en lot, au palier de modèle suivant ; ceux qui manquent encore
+        sont absents du résultat (l'appelant utilise l'explication stockée).
+        
+        Args:
+            elements: Liste de (question, reponse_utilisateur) ; la bonne réponse
+                est celle de la question
+            
+        Returns:
+            Dictionnaire {question.id: feedback} des feedbacks valides
+        """
+        feedbacks = {}
+        restants = list(elements)
+        paliers = self.modeles('feedback')
+        rang_utilise = 0
+        for rang, modele in enumerate(paliers):
+            if not restants:
+                break
+            debut = time.perf_counter()
+            try:
+                reponses = self._demander_feedbacks(restants, modele)
+            except budgets.BudgetIADepasse as e:
+                # Budget du jour épuisé : les feedbacks restants gardent l'explication stockée
+                logger.info(f"Feedbacks groupés interrompus : {e}")
+                break
+            except Exception as e:
+                modeles_ia.enregistrer_appel('feedback_lot', modele, time.perf_counter() - debut, 'erreur')
+                logger.warning(f"Échec du feedback groupé avec le modèle {modele} : {e}")
+                continue
+            duree = time.perf_counter() - debut
+            rang_utilise = rang
+            
+            rejetes = []
+            for question, reponse_utilisateur in restants:
+                feedback = reponses.get(str(question.id))
+                raison = self.valider_feedback(feedback.strip()) if isinstance(feedback, str) else "feedback absent"
+                if raison:
+                    logger.warning(f"Feedback groupé de la question {question.id} ({modele}) rejeté : {raison}")
+                    rejetes.append((question, reponse_utilisateur))
+                else:
+                    feedbacks[question.id] = feedback.strip()
+            modeles_ia.enregistrer_appel('feedback_lot', modele, duree, 'rejet' if rejetes else 'valide')
+            restants = rejetes
+        
+        modeles_ia.enregistrer_demande('feedback_lot', rang_utilise if feedbacks else None)
+        logger.info(f"Feedbacks groupés : {len(feedbacks)}/{len(elements)} générés")
+        return feedbacks
+    
+    def _demander_feedbacks(self, elements: List[Any], modele: str) -> Dict[str, Any]:
+        """Un appel de feedback groupé ; retourne l'objet JSON {id: feedback} de la réponse."""
+        prompt_systeme = """Tu es un tuteur pédagogique bienveillant et encourageant.
+Ton rôle est d'expliquer les erreurs des étudiants de manière constructive et pédagogique.
+Utilise un ton positif et motivant, même quand l'étudiant s'est trompé.
+
+FORMAT DE SORTIE OBLIGATOIRE (JSON strict) : un objet dont les clés sont les
+identifiants des questions et les valeurs le feedback de chacune :
+{"12": "Feedback de la question 12", "15": "Feedback de la question 15"}
+Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
+        
+        # Extraits du cours par question, le budget de caractères étant partagé entre les questions
+        limite = max(400, getattr(settings, 'PASSAGES_LIMITE_FEEDBACK', 1500) // len(elements))
+        blocs = []
+        for question, reponse_utilisateur in elements:
+            choix_map = {'A': question.choix_A, 'B': question.choix_B, 'C': question.choix_C, 'D': question.choix_D}
+            reponse_texte = choix_map.get(reponse_utilisateur, "Réponse inconnue")
+            bonne_reponse_texte = choix_map.get(question.bonne_reponse, "Réponse inconnue")
+            extrait = passages.contexte(
+                question.chapitre_id,
+                f"{question.question_texte} {bonne_reponse_texte} {reponse_texte}",
+                k=getattr(settings, 'PASSAGES_NB_FEEDBACK', 3),
+                limite=limite,
+                pertinents_seulement=True,
+            )
+            bloc = f"""Question {question.id} : "{question.question_texte}"
+Réponse de l'étudiant : "{reponse_utilisateur}) {reponse_texte}"
+Bonne réponse : "{question.bonne_reponse}) {bonne_reponse_texte}\""""
+            if extrait:
+                bloc += f"\nExtraits du cours :\n{extrait}"
+            blocs.append(bloc)
+        
+        separateur = "\n\n---\n\n"
+        prompt_user = f"""L'étudiant s'est trompé aux questions suivantes :
+
+{separateur.join(blocs)}
+
+Pour chaque question, génère un feedback pédagogique en 2-3 phrases qui :
+1. Explique pourquoi la réponse choisie est incorrecte (si applicable)
+2. Explique pourquoi la bonne réponse est correcte (en t'appuyant sur les extraits du cours s'il y en a)
+3. Encourage l'étudiant à continuer à apprendre"""
+        
+        response = self._appel_chat(
+            'feedback_lot', elements[0][0].chapitre_id, modele, prompt_systeme, prompt_user,
+            temperature=0.8, max_tokens=min(2000, TOKENS_FEEDBACK_BASE + TOKENS_PAR_FEEDBACK * len(elements)),
+        )
+        content = response.choices[0].message.content or ""
+        
+        # Pas de nettoyer_json ici : les feedbacks peuvent contenir des crochets
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if not match:
+            raise ValueError("Aucun objet JSON dans la réponse")
+        donnees = json.loads(match.group(0))
+        if not isinstance(donnees, dict):
+            raise ValueError("Format de réponse inattendu : objet JSON attendu")
+        return donnees
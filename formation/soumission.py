@@ -0,0 +1,386 @@
+"""
+Correction et enregistrement des soumissions de quiz
+- corriger_reponses : calcul du score et normalisation des réponses
+- generer_feedbacks : explications IA des erreurs en un appel groupé (avec repli sur
+  l'explication stockée, y compris quand la limite d'appels IA de l'étudiant est
+  atteinte, voir limites.py)
+- enregistrer_soumission : création du QuizResult et mise à jour de tous les agrégats
+- apres_soumission : badges et classements en cache, exécutés après commit
+- completer_feedbacks : feedbacks IA différés, générés en arrière-plan après commit
+- soumettre_une_fois : soumission idempotente par jeton de tentative
+- soumettre_quiz : chaîne complète (correction, feedbacks, enregistrement),
+  partagée par la vue HTML et l'API JSON
+
+Le jeton (UUID) est émis à l'affichage du quiz et stocké sur le QuizResult
+(contrainte d'unicité) : un double clic ou un renvoi du formulaire retrouve le
+premier résultat au lieu de refaire la correction, les appels IA et les écritures.
+Il est dérivé des tentatives déjà enregistrées, donc stable jusqu'à la soumission
+(la page du quiz peut être resservie telle quelle en 304).
+
+Avec FEEDBACKS_IA_DIFFERES (défaut), la soumission ne dépend plus de la
+latence du modèle : le résultat est enregistré avec l'explication stockée de
+chaque question ratée, et les feedbacks personnalisés la remplacent dès l'appel
+groupé terminé (completer_feedbacks, après commit) ; la page de résultat les
+récupère par interrogation périodique de l'API.
+
+Partagé par quiz_detail_view et les outils de benchmark, pour que tous
+passent par exactement les mêmes écritures.
+"""
+
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import ProgressionChapitre, QuizQuestion, QuizResult, StudentUser
+from .services import ServiceIA
+from . import statistiques, progression, classement, revision, badges, taches, coalescence, limites
+
+logger = logging.getLogger(__name__)
+
+
+def corriger_reponses(questions, reponses_brutes):
+    """
+    Corrige les réponses d'un étudiant.
+
+    Args:
+        questions: Itérable de QuizQuestion du quiz
+        reponses_brutes: Dictionnaire {'question_id': 'A'} (valeurs vides = sans réponse)
+
+    Returns:
+        Tuple (nb_bonnes, reponses_etudiant, erreurs) où reponses_etudiant vaut
+        {'question_id': 'A' | None} et erreurs est la liste des QuizQuestion ratées
+    """
+    nb_bonnes = 0
+    reponses_etudiant = {}
+    erreurs = []
+
+    for question in questions:
+        reponse_choisie = reponses_brutes.get(str(question.id))
+
+        if reponse_choisie:
+            reponses_etudiant[str(question.id)] = reponse_choisie
+            if reponse_choisie == question.bonne_reponse:
+                nb_bonnes += 1
+            else:
+                erreurs.append(question)
+        else:
+            # Question non répondue
+            reponses_etudiant[str(question.id)] = None
+
+    return nb_bonnes, reponses_etudiant, erreurs
+
+
+def generer_feedbacks(service, erreurs, reponses_etudiant, utilisateur=None):
+    """
+    Génère un feedback IA pour chaque question ratée : un seul appel groupé
+    (ServiceIA.generer_feedbacks) à partir de deux erreurs, l'explication
+    stockée pour les questions auxquelles il n'a pas répondu.
+
+    Args:
+        service: Instance ServiceIA
+        erreurs: Questions ratées (retournées par corriger_reponses)
+        reponses_etudiant: Réponses normalisées par corriger_reponses
+        utilisateur: Étudiant dont les seaux d'appels IA sont débités (facultatif)
+
+    Returns:
+        Dictionnaire {'question_id': 'explication'}
+    """
+    utilisateur_id = utilisateur.pk if utilisateur else None
+    role = utilisateur.role if utilisateur else None
+    return generer_feedbacks_groupes(service, erreurs, reponses_etudiant, utilisateur_id, role)
+
+
+def generer_feedbacks_groupes(service, questions, reponses_etudiant, utilisateur_id=None, role=None):
+    """
+    Feedbacks des questions ratées en un appel IA (un appel simple pour une seule
+    question) ; repli sur l'explication stockée question par question.
+    Un appel groupé débite les limites d'appels IA comme un feedback.
+    """
+    if len(questions) == 1:
+        question = questions[0]
+        return {str(question.id): generer_feedback(
+            service, question, reponses_etudiant.get(str(question.id)), utilisateur_id=utilisateur_id, role=role
+        )}
+
+    feedbacks = {}
+    if questions:
+        try:
+            if utilisateur_id is not None:
+                limites.consommer(utilisateur_id, role, 'feedback')
+            feedbacks = service.generer_feedbacks(
+                [(question, reponses_etudiant.get(str(question.id))) for question in questions]
+            )
+        except limites.LimiteIAAtteinte as e:
+            logger.info(f"Feedbacks IA non générés pour l'utilisateur {utilisateur_id} : {e}")
+        except Exception as e:
+            logger.warning(f"Erreur lors de la génération des feedbacks groupés : {e}")
+    return {
+        str(question.id): feedbacks.get(question.id) or explication_par_defaut(question)
+        for question in questions
+    }
+
+
+def explication_par_defaut(question):
+    """Explication stockée de la question, utilisée en attendant (ou à défaut) du feedback IA."""
+    return f"La bonne réponse était {question.bonne_reponse}. {question.explication}"
+
+
+def generer_feedback(service, question, reponse, utilisateur_id=None, role=None):
+    """
+    Feedback IA d'une question ratée, ou l'explication par défaut si l'appel
+    échoue ou si la limite d'appels IA de l'utilisateur est atteinte.
+    """
+    if utilisateur_id is not None:
+        try:
+            limites.consommer(utilisateur_id, role, 'feedback')
+        except limites.LimiteIAAtteinte as e:
+            logger.info(f"Feedback IA non généré pour l'utilisateur {utilisateur_id} : {e}")
+            return explication_par_defaut(question)
+    try:
+        return service.generer_feedback(
+            question=question,
+            reponse_utilisateur=reponse,
+            bonne_reponse=question.bonne_reponse
+        )
+    except Exception as e:
+        logger.warning(f"Erreur lors de la génération du feedback : {e}")
+        return explication_par_defaut(question)
+
+
+def enregistrer_soumission(utilisateur, chapitre, questions, reponses_etudiant, nb_bonnes, explications_erreurs=None,
+                           jeton_tentative=None, feedbacks_en_attente=None):
+    """
+    Enregistre une soumission corrigée et met à jour les agrégats.
+
+    Args:
+        utilisateur: Utilisateur ayant passé le quiz (tout CustomUser)
+        chapitre: Chapitre du quiz
+        questions: Questions présentées (déjà évaluées, réutilisées sans requête)
+        reponses_etudiant: Réponses normalisées par corriger_reponses
+        nb_bonnes: Nombre de bonnes réponses
+        explications_erreurs: Feedbacks par question ratée (facultatif)
+        jeton_tentative: Jeton de la tentative (facultatif) ; IntegrityError s'il a déjà servi
+        feedbacks_en_attente: Ids (str) des questions dont le feedback IA sera généré
+            en arrière-plan après commit (facultatif)
+
+    Returns:
+        Instance QuizResult créée
+    """
+    total = len(questions)
+    # Calcul du score en pourcentage
+    score_pourcentage = int((nb_bonnes / total) * 100) if total > 0 else 0
+
+    with transaction.atomic():
+        # Création du résultat en base
+        resultat = QuizResult.objects.create(
+            score=score_pourcentage,  # Score en pourcentage
+            reponses_etudiant=reponses_etudiant,
+            explications_erreurs=explications_erreurs if explications_erreurs else None,
+            jeton_tentative=jeton_tentative,
+            feedbacks_en_attente=feedbacks_en_attente or [],
+            feedbacks_en_cours=bool(feedbacks_en_attente),
+            chapitre=chapitre,
+            etudiant=utilisateur  # Accepte tous les utilisateurs (CustomUser)
+        )
+        if feedbacks_en_attente:
+            transaction.on_commit(lambda: taches.executer_en_arriere_plan(completer_feedbacks, resultat.id))
+
+        # Mise à jour des agrégats (compteurs d'items, progression par chapitre, révisions)
+        statistiques.enregistrer_reponses(questions, reponses_etudiant)
+        progression.enregistrer_tentative(utilisateur, chapitre, score_pourcentage, resultat.date_passage)
+        revision.enregistrer_revisions(utilisateur, questions, reponses_etudiant, resultat.date_passage)
+
+        # Progression de l'étudiant (si c'est un StudentUser) : UPDATE atomiques, sans relecture
+        est_etudiant = StudentUser.objects.filter(pk=utilisateur.pk).exists()
+        if est_etudiant:
+            # Points gagnés : 10 points par bonne réponse
+            points_gagnes = nb_bonnes * classement.POINTS_PAR_BONNE_REPONSE
+            classement.ajouter_points(utilisateur.pk, chapitre.formation_id, points_gagnes)
+
+            # Badges et classements en cache : après commit, hors du chemin de la requête
+            transaction.on_commit(
+                lambda: taches.executer_en_arriere_plan(apres_soumission, utilisateur.pk, chapitre.formation_id)
+            )
+
+    logger.info(f"Quiz soumis : score {nb_bonnes}/{total} ({score_pourcentage}%) pour {utilisateur.username}")
+    return resultat
+
+
+def apres_soumission(etudiant_id, formation_id):
+    """
+    Traitements différés d'une soumission d'étudiant : évaluation des règles
+    de badges sur les agrégats à jour et report des totaux dans les tops en cache.
+    """
+    badges.evaluer_etudiant(etudiant_id)
+    classement.rafraichir_tops(etudiant_id, formation_id)
+
+
+def completer_feedbacks(resultat_id):
+    """
+    Génère les feedbacks IA en attente d'un résultat, en un appel groupé, et
+    les écrit ensemble (la page de résultat les récupère par interrogation).
+    Les questions supprimées entre-temps gardent l'explication enregistrée.
+
+    Returns:
+        Nombre de feedbacks traités
+    """
+    ligne = QuizResult.objects.filter(id=resultat_id).values_list(
+        'reponses_etudiant', 'explications_erreurs', 'feedbacks_en_attente', 'etudiant_id', 'etudiant__role'
+    ).first()
+    if ligne is None or not ligne[2]:
+        return 0
+    reponses_etudiant, explications_erreurs, en_attente, etudiant_id, role = ligne
+    explications_erreurs = dict(explications_erreurs or {})
+    questions = QuizQuestion.objects.in_bulk([int(question_id) for question_id in en_attente])
+
+    try:
+        service = ServiceIA()
+    except Exception as e:
+        # Service indisponible : les explications stockées restent affichées
+        logger.warning(f"Feedbacks IA du résultat {resultat_id} abandonnés : {e}")
+        service = None
+
+    if service is not None:
+        explications_erreurs.update(generer_feedbacks_groupes(
+            service,
+            [questions[int(question_id)] for question_id in en_attente if int(question_id) in questions],
+            reponses_etudiant,
+            utilisateur_id=etudiant_id,
+            role=role,
+        ))
+    QuizResult.objects.filter(id=resultat_id).update(
+        explications_erreurs=explications_erreurs,
+        feedbacks_en_attente=[],
+        feedbacks_en_cours=False,
+    )
+    return len(en_attente)
+
+
+def etat_tentatives(utilisateur, chapitre_id):
+    """(nb_tentatives, date_derniere_tentative) de l'utilisateur sur le chapitre, (0, None) au départ."""
+    etat = ProgressionChapitre.objects.filter(etudiant=utilisateur, chapitre_id=chapitre_id).values_list(
+        'nb_tentatives', 'date_derniere_tentative'
+    ).first()
+    return etat or (0, None)
+
+
+def jeton_tentative(utilisateur, chapitre_id, etat=None):
+    """
+    Jeton de la prochaine tentative de l'utilisateur sur le chapitre.
+
+    Dérivé de SECRET_KEY et des tentatives déjà enregistrées (etat_tentatives) :
+    identique tant que la tentative n'est pas soumise, nouveau après chaque
+    soumission, et impossible à deviner sans la clé secrète.
+    """
+    nb_tentatives, date_derniere_tentative = etat or etat_tentatives(utilisateur, chapitre_id)
+    derniere = date_derniere_tentative.isoformat() if date_derniere_tentative else ''
+    return uuid.uuid5(
+        uuid.NAMESPACE_URL,
+        f'{settings.SECRET_KEY}:tentative:{utilisateur.pk}:{chapitre_id}:{nb_tentatives}:{derniere}',
+    )
+
+
+def lire_jeton(valeur):
+    """Jeton posté par le formulaire, ou None s'il est absent ou mal formé."""
+    if not valeur:
+        return None
+    try:
+        return uuid.UUID(str(valeur))
+    except ValueError:
+        return None
+
+
+def resultat_existant(utilisateur, jeton):
+    """QuizResult déjà enregistré pour ce jeton et cet utilisateur, ou None."""
+    if jeton is None:
+        return None
+    return QuizResult.objects.filter(jeton_tentative=jeton, etudiant=utilisateur).first()
+
+
+def soumettre_une_fois(utilisateur, jeton, traiter):
+    """
+    Exécute `traiter()` (correction, feedbacks IA, enregistrement) au plus une
+    fois par jeton de tentative.
+
+    - jeton déjà utilisé : le résultat existant est retourné sans autre travail
+    - soumissions concurrentes du même jeton : une seule exécute `traiter`,
+      les autres attendent son résultat (coalescence.executer_une_seule_fois)
+    - course perdue à l'insertion : l'unicité du jeton lève IntegrityError
+      et le résultat gagnant est retourné
+
+    Args:
+        utilisateur: Utilisateur qui soumet
+        jeton: Jeton de tentative (lire_jeton) ; None désactive la déduplication
+        traiter: Fonction sans argument qui retourne le QuizResult créé
+
+    Returns:
+        Tuple (QuizResult, cree) : cree vaut False quand le résultat existait déjà
+        ou a été créé par une soumission concurrente du même jeton
+    """
+    if jeton is None:
+        return traiter(), True
+
+    existant = resultat_existant(utilisateur, jeton)
+    if existant is not None:
+        logger.info(f"Soumission {jeton} déjà enregistrée, résultat {existant.id} réutilisé")
+        return existant, False
+
+    # Ids des résultats créés par cet appel (les suiveurs n'exécutent pas calculer)
+    crees = set()
+
+    def calculer():
+        try:
+            resultat = traiter()
+        except IntegrityError:
+            existant = resultat_existant(utilisateur, jeton)
+            if existant is None:
+                raise
+            return existant
+        crees.add(resultat.id)
+        return resultat
+
+    resultat = coalescence.executer_une_seule_fois(
+        f'soumission:{jeton}',
+        calculer,
+        lambda: resultat_existant(utilisateur, jeton),
+        delai=getattr(settings, 'SOUMISSION_DELAI_COALESCENCE', 120),
+    )
+    return resultat, resultat.id in crees
+
+
+def soumettre_quiz(utilisateur, chapitre, questions, reponses_brutes, jeton=None):
+    """
+    Corrige, génère les feedbacks et enregistre une soumission, au plus une
+    fois par jeton de tentative. Avec FEEDBACKS_IA_DIFFERES, les feedbacks IA
+    sont générés après la réponse (completer_feedbacks).
+
+    Args:
+        utilisateur: Utilisateur qui soumet
+        chapitre: Chapitre du quiz
+        questions: Questions présentées (évaluées une seule fois)
+        reponses_brutes: Dictionnaire {'question_id': 'A'}
+        jeton: Jeton de tentative (lire_jeton) ou None
+
+    Returns:
+        Tuple (QuizResult, cree), voir soumettre_une_fois
+    """
+    questions = list(questions)
+
+    def traiter():
+        nb_bonnes, reponses_etudiant, erreurs = corriger_reponses(questions, reponses_brutes)
+        if not getattr(settings, 'FEEDBACKS_IA_DIFFERES', True):
+            explications_erreurs = generer_feedbacks(ServiceIA(), erreurs, reponses_etudiant, utilisateur) if erreurs else {}
+            return enregistrer_soumission(
+                utilisateur, chapitre, questions, reponses_etudiant, nb_bonnes, explications_erreurs,
+                jeton_tentative=jeton,
+            )
+        return enregistrer_soumission(
+            utilisateur, chapitre, questions, reponses_etudiant, nb_bonnes,
+            {str(question.id): explication_par_defaut(question) for question in erreurs},
+            jeton_tentative=jeton,
+            feedbacks_en_attente=[str(question.id) for question in erreurs],
+        )
+
+    return soumettre_une_fois(utilisateur, jeton, traiter)
@@ -0,0 +1,191 @@
+"""
+Analyse d'items (statistiques par question)
+- enregistrer_reponses : mise à jour atomique des compteurs à chaque soumission
+- calculer_indices_chapitre : calcul en lot (NumPy) des indices classiques
+  (difficulté p, discrimination point-bisériale, efficacité des distracteurs),
+  à partir de la réplique analytique si elle est configurée (voir replique.py)
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QuizQuestion, QuizResult, QuestionStatistique
+from . import replique
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy n'est nécessaire que pour le calcul en lot
+    np = None
+
+logger = logging.getLogger(__name__)
+
+LETTRES = ['A', 'B', 'C', 'D']
+
+# Un distracteur est "fonctionnel" s'il est choisi par au moins 5% des étudiants
+SEUIL_DISTRACTEUR = 0.05
+
+
+def enregistrer_reponses(questions, reponses_etudiant):
+    """
+    Incrémente les compteurs des questions d'une soumission.
+
+    Les questions sont regroupées par (choix, correcte) : une seule requête UPDATE
+    par groupe, soit au plus 10 (A-D justes ou fausses, sans réponse, réponse
+    invalide) quel que soit le nombre de questions.
+
+    Args:
+        questions: Itérable de QuizQuestion présentées à l'étudiant
+        reponses_etudiant: Dictionnaire {'question_id': 'A' | None}
+    """
+    groupes = defaultdict(list)
+    for question in questions:
+        reponse = reponses_etudiant.get(str(question.id))
+        if reponse not in LETTRES:
+            reponse = None if not reponse else 'X'
+        groupes[(reponse, reponse == question.bonne_reponse)].append(question.id)
+
+    if not groupes:
+        return
+
+    ids = [question_id for ids_groupe in groupes.values() for question_id in ids_groupe]
+
+    with transaction.atomic():
+        # Création des lignes manquantes (questions jamais posées)
+        QuestionStatistique.objects.bulk_create(
+            [QuestionStatistique(question_id=question_id) for question_id in ids],
+            ignore_conflicts=True,
+        )
+
+        for (reponse, est_correcte), ids_groupe in groupes.items():
+            increments = {'nb_passages': F('nb_passages') + 1}
+            if est_correcte:
+                increments['nb_correctes'] = F('nb_correctes') + 1
+            if reponse is None:
+                increments['nb_sans_reponse'] = F('nb_sans_reponse') + 1
+            elif reponse in LETTRES:
+                champ = f'nb_choix_{reponse}'
+                increments[champ] = F(champ) + 1
+            QuestionStatistique.objects.filter(question_id__in=ids_groupe).update(**increments)
+
+
+def _correlation_point_biseriale(item, reste):
+    """
+    Corrélation point-bisériale entre un item (0/1) et le score sur le reste du test.
+    Retourne None si l'indice n'est pas défini (item constant ou scores constants).
+    """
+    p = item.mean()
+    ecart_type = reste.std()
+    if p <= 0 or p >= 1 or ecart_type == 0:
+        return None
+    moyenne_correctes = reste[item == 1].mean()
+    moyenne_incorrectes = reste[item == 0].mean()
+    return float((moyenne_correctes - moyenne_incorrectes) / ecart_type * np.sqrt(p * (1 - p)))
+
+
+def calculer_indices_chapitre(chapitre, chunk_size=2000, reconstruire_compteurs=False):
+    """
+    Calcule les indices d'items de toutes les questions d'un chapitre en un seul
+    parcours des QuizResult du chapitre.
+
+    Les réponses sont chargées dans une matrice (tentatives x questions) codée en int8 :
+    -2 = question absente de la tentative, -1 = sans réponse, 0-3 = choix A-D.
+
+    Args:
+        chapitre: Instance du modèle Chapitre
+        chunk_size: Taille des lots lus depuis la base
+        reconstruire_compteurs: Réécrit aussi les compteurs incrémentaux à partir des résultats
+
+    Returns:
+        Nombre de tentatives analysées
+    """
+    if np is None:
+        raise ImportError("NumPy est requis pour le calcul des statistiques d'items (pip install numpy)")
+
+    # Les compteurs reconstruits remplacent ceux tenus à chaque soumission : ils sont
+    # relus sur la base principale, où aucune soumission récente ne peut manquer
+    lecture = (lambda modele: modele.objects) if reconstruire_compteurs else replique.analytique
+    questions = list(lecture(QuizQuestion).filter(chapitre=chapitre).order_by('id').only('id', 'bonne_reponse'))
+    if not questions:
+        return 0
+
+    colonnes = {str(question.id): index for index, question in enumerate(questions)}
+    codes_lettres = {lettre: index for index, lettre in enumerate(LETTRES)}
+    bonnes = np.array([codes_lettres[question.bonne_reponse] for question in questions], dtype=np.int8)
+
+    # Remplissage par blocs de chunk_size lignes pour limiter les allocations
+    blocs = []
+    bloc = np.full((chunk_size, len(questions)), -2, dtype=np.int8)
+    position = 0
+    tentatives = (
+        lecture(QuizResult).filter(chapitre=chapitre)
+        .order_by()
+        .values_list('reponses_etudiant', flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    for reponses in tentatives:
+        for question_id, reponse in (reponses or {}).items():
+            index = colonnes.get(question_id)
+            if index is not None:
+                bloc[position, index] = codes_lettres.get(reponse, -1)
+        position += 1
+        if position == chunk_size:
+            blocs.append(bloc)
+            bloc = np.full((chunk_size, len(questions)), -2, dtype=np.int8)
+            position = 0
+    if position:
+        blocs.append(bloc[:position])
+
+    if not blocs:
+        return 0
+
+    maintenant = timezone.now()
+    matrice = np.vstack(blocs)
+    presentes = matrice != -2
+    correctes = (matrice == bonnes).astype(np.float64)
+    scores_totaux = correctes.sum(axis=1)
+
+    mises_a_jour = []
+    for index, question in enumerate(questions):
+        masque = presentes[:, index]
+        nb_passages = int(masque.sum())
+        statistique = QuestionStatistique(question_id=question.id, date_calcul=maintenant)
+
+        if nb_passages:
+            item = correctes[masque, index]
+            reste = scores_totaux[masque] - item
+            choix = matrice[masque, index]
+            repartition = np.bincount(choix[choix >= 0], minlength=4)
+
+            statistique.indice_difficulte = float(item.mean())
+            statistique.indice_discrimination = _correlation_point_biseriale(item, reste)
+            distracteurs = [repartition[code] for code in range(4) if code != bonnes[index]]
+            fonctionnels = sum(1 for nombre in distracteurs if nombre / nb_passages >= SEUIL_DISTRACTEUR)
+            statistique.efficacite_distracteurs = fonctionnels / len(distracteurs)
+
+            if reconstruire_compteurs:
+                statistique.nb_passages = nb_passages
+                statistique.nb_correctes = int(item.sum())
+                statistique.nb_sans_reponse = int((choix == -1).sum())
+                for lettre, code in codes_lettres.items():
+                    setattr(statistique, f'nb_choix_{lettre}', int(repartition[code]))
+
+        mises_a_jour.append(statistique)
+
+    champs = ['indice_difficulte', 'indice_discrimination', 'efficacite_distracteurs', 'date_calcul']
+    if reconstruire_compteurs:
+        champs += ['nb_passages', 'nb_correctes', 'nb_sans_reponse'] + [f'nb_choix_{lettre}' for lettre in LETTRES]
+
+    with transaction.atomic():
+        QuestionStatistique.objects.bulk_create(
+            [QuestionStatistique(question_id=question.id) for question in questions],
+            ignore_conflicts=True,
+        )
+        QuestionStatistique.objects.bulk_update(mises_a_jour, champs, batch_size=500)
+
+    logger.info(f"Statistiques calculées pour le chapitre '{chapitre.titre}' : {len(matrice)} tentatives, {len(questions)} questions")
+    return len(matrice)
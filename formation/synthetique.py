@@ -0,0 +1,319 @@
+"""
+Génération de données synthétiques à grande échelle (mode volume de seed_data)
+- GenerateurSynthetique : formations, chapitres, questions, étudiants et résultats
+  déterministes (graine), insérés par lots
+- reconstruire_agregats : progression, scores, classement global et badges
+  recalculés une fois les résultats insérés
+
+Les résultats suivent un modèle de Rasch simplifié (niveau de l'étudiant contre
+difficulté de la question) pour que les statistiques d'items, les classements et
+les badges aient des distributions réalistes.
+
+Les étudiants (héritage multi-tables) et les résultats (date de passage
+étalée dans le temps, alors que le champ est auto_now_add) sont insérés par
+INSERT paramétrés en executemany ; le reste passe par bulk_create.
+"""
+
+import logging
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, reset_queries, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Chapitre, CustomUser, Formation, QuizQuestion, QuizResult, ScoreFormation, StudentUser
+from . import badges, classement, progression
+
+logger = logging.getLogger(__name__)
+
+PREFIXE = 'synth'
+LETTRES = ('A', 'B', 'C', 'D')
+NIVEAUX = ('Débutant', 'Intermédiaire', 'Avancé')
+
+VOCABULAIRE = (
+    "algorithme variable fonction boucle condition liste dictionnaire classe objet méthode attribut "
+    "héritage module paquet exception fichier requête base données index transaction modèle vue gabarit "
+    "formulaire session cache serveur client réseau protocole sécurité chiffrement authentification "
+    "permission test intégration déploiement conteneur image volume processus thread mémoire pile tas "
+    "compilation interprétation syntaxe sémantique grammaire analyse lexique jeton arbre graphe noeud "
+    "arête parcours recherche tri fusion rapide insertion complexité temps espace optimisation profil "
+    "mesure latence débit charge montée échelle réplique partition journal événement file message "
+    "apprentissage réseau neurone couche gradient perte précision rappel régression classification "
+    "donnée entraînement validation prédiction vecteur matrice tenseur probabilité statistique moyenne"
+).split()
+
+
+def _phrase(rng, nb_mots):
+    mots = rng.choices(VOCABULAIRE, k=nb_mots)
+    return (' '.join(mots)).capitalize() + '.'
+
+
+def inserer_en_masse(modele, champs, lignes, taille_lot=5000):
+    """
+    INSERT paramétré exécuté en executemany, par lots.
+
+    Les valeurs passent par get_db_prep_save (JSON, dates) comme avec l'ORM.
+
+    Args:
+        modele: Modèle Django cible
+        champs: Noms des champs, dans l'ordre des valeurs
+        lignes: Itérable de tuples de valeurs
+    """
+    champs_modele = [modele._meta.get_field(nom) for nom in champs]
+    table = connection.ops.quote_name(modele._meta.db_table)
+    colonnes = ', '.join(connection.ops.quote_name(champ.column) for champ in champs_modele)
+    requete = f'INSERT INTO {table} ({colonnes}) VALUES ({", ".join(["%s"] * len(champs))})'
+
+    lot = []
+    nb_inseres = 0
+    with connection.cursor() as curseur:
+        for ligne in lignes:
+            lot.append([champ.get_db_prep_save(valeur, connection) for champ, valeur in zip(champs_modele, ligne)])
+            if len(lot) >= taille_lot:
+                curseur.executemany(requete, lot)
+                nb_inseres += len(lot)
+                lot = []
+        if lot:
+            curseur.executemany(requete, lot)
+            nb_inseres += len(lot)
+    return nb_inseres
+
+
+class GenerateurSynthetique:
+    """
+    Construit un jeu de données déterministe : même graine et mêmes volumes
+    donnent les mêmes contenus, réponses et scores.
+    """
+
+    def __init__(self, graine=42, taille_lot=5000, jours=180, rapport=None):
+        self.rng = random.Random(graine)
+        self.graine = graine
+        self.taille_lot = taille_lot
+        self.jours = jours
+        self.rapport = rapport or (lambda message: None)
+
+    @property
+    def prefixe_etudiants(self):
+        return f'{PREFIXE}{self.graine}_etudiant_'
+
+    def _etape(self, message, debut, nombre):
+        duree = time.perf_counter() - debut
+        self.rapport(f'{message} : {nombre} en {duree:.1f}s ({nombre / duree if duree else 0:.0f}/s)')
+        # Avec DEBUG, Django garde chaque requête SQL en mémoire
+        reset_queries()
+
+    def generer(self, createur, nb_formations, chapitres_par_formation, questions_par_chapitre, nb_etudiants, nb_resultats):
+        """
+        Returns:
+            Dictionnaire {type: nombre de lignes créées}
+        """
+        if CustomUser.objects.filter(username__startswith=self.prefixe_etudiants).exists():
+            raise ValueError(
+                f"Des étudiants '{self.prefixe_etudiants}*' existent déjà : utilisez --clear ou une autre --graine"
+            )
+
+        bilan = {}
+        chapitres = self.creer_formations_et_chapitres(createur, nb_formations, chapitres_par_formation)
+        bilan['formations'] = nb_formations
+        bilan['chapitres'] = len(chapitres)
+        questions = self.creer_questions(chapitres, questions_par_chapitre)
+        bilan['questions'] = sum(len(ids) for ids in questions.values())
+        etudiants = self.creer_etudiants(nb_etudiants)
+        bilan['etudiants'] = len(etudiants)
+        bilan['resultats'] = self.creer_resultats(questions, etudiants, nb_resultats)
+        return bilan
+
+    def creer_formations_et_chapitres(self, createur, nb_formations, chapitres_par_formation):
+        """Returns: liste des ids de chapitres créés."""
+        debut = time.perf_counter()
+        formations = [
+            Formation(
+                titre=f'Formation {PREFIXE}-{self.graine}-{numero} : {" ".join(self.rng.choices(VOCABULAIRE, k=3))}',
+                description=' '.join(_phrase(self.rng, self.rng.randint(8, 20)) for _ in range(3)),
+                niveau=self.rng.choice(NIVEAUX),
+                createur=createur,
+                est_public=self.rng.random() < 0.7,
+            )
+            for numero in range(1, nb_formations + 1)
+        ]
+        with transaction.atomic():
+            formations = Formation.objects.bulk_create(formations, batch_size=self.taille_lot)
+
+        chapitre_ids = []
+        lot = []
+
+        def ecrire():
+            with transaction.atomic():
+                chapitre_ids.extend(chapitre.id for chapitre in Chapitre.objects.bulk_create(lot, batch_size=self.taille_lot))
+            lot.clear()
+
+        for formation in formations:
+            for ordre in range(1, chapitres_par_formation + 1):
+                paragraphes = [
+                    ' '.join(_phrase(self.rng, self.rng.randint(8, 18)) for _ in range(self.rng.randint(3, 6)))
+                    for _ in range(self.rng.randint(2, 5))
+                ]
+                lot.append(Chapitre(
+                    titre=f'Chapitre {ordre} : {" ".join(self.rng.choices(VOCABULAIRE, k=2))}',
+                    contenu_texte='\n\n'.join(paragraphes),
+                    ordre=ordre,
+                    formation=formation,
+                ))
+                if len(lot) >= self.taille_lot:
+                    ecrire()
+        if lot:
+            ecrire()
+        self._etape('Formations et chapitres', debut, len(formations) + len(chapitre_ids))
+        return chapitre_ids
+
+    def creer_questions(self, chapitre_ids, questions_par_chapitre):
+        """
+        Returns:
+            {chapitre_id: [(question_id, bonne_reponse, difficulte), ...]}
+        """
+        debut = time.perf_counter()
+        questions = {}
+        lot = []
+        difficultes = []
+
+        def ecrire():
+            with transaction.atomic():
+                creees = QuizQuestion.objects.bulk_create(lot, batch_size=self.taille_lot)
+            for question, difficulte in zip(creees, difficultes):
+                questions.setdefault(question.chapitre_id, []).append((question.id, question.bonne_reponse, difficulte))
+            lot.clear()
+            difficultes.clear()
+
+        for chapitre_id in chapitre_ids:
+            for _ in range(questions_par_chapitre):
+                lot.append(QuizQuestion(
+                    question_texte=_phrase(self.rng, self.rng.randint(6, 14))[:-1] + ' ?',
+                    choix_A=_phrase(self.rng, 3),
+                    choix_B=_phrase(self.rng, 3),
+                    choix_C=_phrase(self.rng, 3),
+                    choix_D=_phrase(self.rng, 3),
+                    bonne_reponse=self.rng.choice(LETTRES),
+                    explication=_phrase(self.rng, 12),
+                    generee_ia=False,
+                    chapitre_id=chapitre_id,
+                ))
+                difficultes.append(self.rng.gauss(0, 1))
+                if len(lot) >= self.taille_lot:
+                    ecrire()
+        if lot:
+            ecrire()
+        self._etape('Questions', debut, sum(len(liste) for liste in questions.values()))
+        return questions
+
+    def creer_etudiants(self, nb_etudiants):
+        """
+        Returns:
+            [(etudiant_id, niveau), ...] ; le niveau sert à générer les réponses
+        """
+        debut = time.perf_counter()
+        prefixe = self.prefixe_etudiants
+        # Un seul hachage pour tous les comptes (mot de passe : etudiant123)
+        mot_de_passe = make_password('etudiant123')
+        maintenant = timezone.now()
+        etudiants = []
+        for depart in range(0, nb_etudiants, self.taille_lot):
+            utilisateurs = [
+                CustomUser(
+                    username=f'{prefixe}{numero}',
+                    email=f'{prefixe}{numero}@exemple.com',
+                    password=mot_de_passe,
+                    role='STUDENT',
+                    date_joined=maintenant,
+                )
+                for numero in range(depart + 1, min(depart + self.taille_lot, nb_etudiants) + 1)
+            ]
+            with transaction.atomic():
+                utilisateurs = CustomUser.objects.bulk_create(utilisateurs)
+                # Lignes enfants de l'héritage multi-tables (bulk_create ne les gère pas)
+                inserer_en_masse(
+                    StudentUser,
+                    ['customuser_ptr', 'date_inscription', 'progression_globale'],
+                    ((utilisateur.id, maintenant.date(), 0) for utilisateur in utilisateurs),
+                    self.taille_lot,
+                )
+            etudiants += [(utilisateur.id, self.rng.gauss(0, 1)) for utilisateur in utilisateurs]
+        self._etape('Étudiants', debut, len(etudiants))
+        return etudiants
+
+    def creer_resultats(self, questions, etudiants, nb_resultats):
+        """Résultats répartis sur les `jours` derniers jours, réponses selon le modèle de Rasch."""
+        if not questions or not etudiants:
+            return 0
+        debut = time.perf_counter()
+        chapitre_ids = list(questions)
+        maintenant = timezone.now()
+        etendue = self.jours * 86400
+
+        def lignes():
+            for _ in range(nb_resultats):
+                etudiant_id, niveau = self.rng.choice(etudiants)
+                chapitre_id = self.rng.choice(chapitre_ids)
+                reponses = {}
+                nb_bonnes = 0
+                for question_id, bonne_reponse, difficulte in questions[chapitre_id]:
+                    tirage = self.rng.random()
+                    if tirage < 0.03:
+                        reponses[str(question_id)] = None
+                    elif tirage < 0.03 + 0.97 / (1 + math.exp(difficulte - niveau)):
+                        reponses[str(question_id)] = bonne_reponse
+                        nb_bonnes += 1
+                    else:
+                        reponses[str(question_id)] = self.rng.choice([lettre for lettre in LETTRES if lettre != bonne_reponse])
+                score = int(nb_bonnes / len(reponses) * 100) if reponses else 0
+                date_passage = maintenant - timedelta(seconds=self.rng.randrange(etendue))
+                yield (score, date_passage, reponses, None, [], False, chapitre_id, etudiant_id)
+
+        champs = [
+            'score', 'date_passage', 'reponses_etudiant', 'explications_erreurs',
+            'feedbacks_en_attente', 'feedbacks_en_cours', 'chapitre', 'etudiant',
+        ]
+        nb_inseres = 0
+        generateur = lignes()
+        while nb_inseres < nb_resultats:
+            taille = min(self.taille_lot * 10, nb_resultats - nb_inseres)
+            with transaction.atomic():
+                nb_inseres += inserer_en_masse(
+                    QuizResult, champs, (next(generateur) for _ in range(taille)), self.taille_lot
+                )
+            reset_queries()
+            self.rapport(f'   … {nb_inseres}/{nb_resultats} résultats')
+        self._etape('Résultats', debut, nb_inseres)
+        return nb_inseres
+
+
+def reconstruire_agregats(rapport=None, chunk_size=5000):
+    """
+    Recalcule les agrégats matérialisés après une insertion en masse de
+    résultats : progression par chapitre, scores par formation, progression
+    globale des étudiants et badges.
+    """
+    rapport = rapport or (lambda message: None)
+
+    debut = time.perf_counter()
+    progression.reconstruire_progressions(chunk_size=chunk_size)
+    rapport(f'Progression par chapitre reconstruite en {time.perf_counter() - debut:.1f}s')
+
+    debut = time.perf_counter()
+    classement.reconstruire_scores_formation(chunk_size=chunk_size)
+    StudentUser.objects.update(progression_globale=Coalesce(
+        Subquery(
+            ScoreFormation.objects.filter(etudiant_id=OuterRef('pk'))
+            .order_by().values('etudiant_id').annotate(total=Sum('points')).values('total')
+        ),
+        Value(0),
+    ))
+    rapport(f'Scores et classements reconstruits en {time.perf_counter() - debut:.1f}s')
+
+    debut = time.perf_counter()
+    badges.evaluer_tous(chunk_size=chunk_size)
+    rapport(f'Badges évalués en {time.perf_counter() - debut:.1f}s')
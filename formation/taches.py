@@ -0,0 +1,83 @@
+"""
+Exécution de tâches en arrière-plan, hors du chemin de la requête
+- executer_en_arriere_plan : soumet une fonction à un pool de threads du processus
+- attendre : attend la fin des tâches soumises (benchmarks, commandes)
+
+Utilisé après commit (transaction.on_commit) pour les traitements dont la
+réponse HTTP n'a pas besoin d'attendre. Avec TACHES_SYNCHRONES = True
+(tests, commandes), la fonction est exécutée immédiatement.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_executeur = None
+
+# Tâches soumises et pas encore terminées
+_en_cours = set()
+_verrou = threading.Lock()
+
+
+def _obtenir_executeur():
+    global _executeur
+    if _executeur is None:
+        _executeur = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TACHES_NB_THREADS', 2),
+            thread_name_prefix='taches',
+        )
+    return _executeur
+
+
+def _executer(fonction, args, kwargs):
+    try:
+        fonction(*args, **kwargs)
+    except Exception as e:
+        logger.exception(f"Erreur dans la tâche d'arrière-plan {fonction.__name__} : {e}")
+    finally:
+        # Chaque thread du pool a sa propre connexion : on la libère après la tâche
+        connection.close()
+
+
+def executer_en_arriere_plan(fonction, *args, **kwargs):
+    """
+    Exécute `fonction(*args, **kwargs)` dans un thread du pool.
+    Les erreurs sont journalisées, jamais propagées à l'appelant.
+    """
+    if getattr(settings, 'TACHES_SYNCHRONES', False):
+        try:
+            fonction(*args, **kwargs)
+        except Exception as e:
+            logger.exception(f"Erreur dans la tâche {fonction.__name__} : {e}")
+        return
+    tache = _obtenir_executeur().submit(_executer, fonction, args, kwargs)
+    with _verrou:
+        _en_cours.add(tache)
+    tache.add_done_callback(_terminee)
+
+
+def _terminee(tache):
+    with _verrou:
+        _en_cours.discard(tache)
+
+
+def attendre(delai=None):
+    """
+    Attend la fin des tâches en cours, y compris celles qu'elles soumettent.
+
+    Returns:
+        True si toutes les tâches sont terminées avant `delai` secondes
+    """
+    while True:
+        with _verrou:
+            taches = set(_en_cours)
+        if not taches:
+            return True
+        _, restantes = wait(taches, timeout=delai)
+        if restantes:
+            return False
@@ -1,3 +1,907 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    BadgeObtenu, Chapitre, ConsommationIA, CustomUser, EtatRevision, Formation, GenerationQuiz, ProgressionChapitre,
+    QuestionStatistique, QuizQuestion, QuizResult, StudentUser,
+)
+from . import (
+    badges, budgets, charge, classement, compteurs, export, generation, importation, limites, modeles_ia, passages,
+    recherche, replique, revision, soumission, statistiques, versions,
+)
+from .services import ServiceIA
+
+
+def reponse_chat(contenu, finish_reason='stop', tokens=(100, 50)):
+    """Réponse de chat.completions.create réduite aux champs lus par ServiceIA."""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=contenu), finish_reason=finish_reason)],
+        usage=SimpleNamespace(prompt_tokens=tokens[0], completion_tokens=tokens[1], total_tokens=sum(tokens)),
+    )
+
+
+def service_ia(*reponses):
+    """ServiceIA dont le client renvoie successivement `reponses` (pas d'appel réseau)."""
+    service = ServiceIA()
+    service.client = mock.Mock()
+    service.client.chat.completions.create.side_effect = list(reponses)
+    return service
+
+
+def creer_donnees(nb_questions=3):
+    """Professeur, étudiant, formation publique et chapitre avec `nb_questions` questions (bonne réponse A)."""
+    professeur = CustomUser.objects.create_user(username='prof', password='x', role='TEACHER')
+    etudiant = StudentUser.objects.create_user(username='etudiant', password='x', role='STUDENT')
+    formation = Formation.objects.create(
+        titre='Python', description='Bases', niveau='Débutant', createur=professeur, est_public=True,
+    )
+    chapitre = Chapitre.objects.create(titre='Variables', contenu_texte='Une variable nomme une valeur.', formation=formation)
+    questions = [
+        QuizQuestion.objects.create(
+            question_texte=f'Question {numero} ?', choix_A='a', choix_B='b', choix_C='c', choix_D='d',
+            bonne_reponse='A', explication=f'Explication {numero}', chapitre=chapitre, createur=professeur,
+        )
+        for numero in range(nb_questions)
+    ]
+    return professeur, etudiant, chapitre, questions
+
+
+class StatistiquesItemsTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, self.chapitre, self.questions = creer_donnees(nb_questions=4)
+
+    def test_indices_sur_une_matrice_calculee_a_la_main(self):
+        q0, q1, q2, absente = (str(question.id) for question in self.questions)
+        # Bonne réponse A partout ; scores totaux 3, 2, 1, 0 ; la dernière question n'est jamais posée
+        for reponses in (
+            {q0: 'A', q1: 'A', q2: 'A'},
+            {q0: 'A', q1: 'A', q2: 'B'},
+            {q0: 'B', q1: 'C', q2: 'A'},
+            {q0: None, q1: 'C', q2: 'D'},
+        ):
+            QuizResult.objects.create(score=0, reponses_etudiant=reponses, chapitre=self.chapitre, etudiant=self.etudiant)
+
+        self.assertEqual(statistiques.calculer_indices_chapitre(self.chapitre, chunk_size=3, reconstruire_compteurs=True), 4)
+
+        indices = {
+            str(ligne.question_id): ligne for ligne in QuestionStatistique.objects.filter(question__chapitre=self.chapitre)
+        }
+        # q0 : item 1100, reste 2110 (moyenne 1, écart-type √0.5) : (1.5 - 0.5) / √0.5 x √(0.5 x 0.5) = √0.5
+        self.assertAlmostEqual(indices[q0].indice_difficulte, 0.5)
+        self.assertAlmostEqual(indices[q0].indice_discrimination, 0.5 ** 0.5)
+        self.assertAlmostEqual(indices[q0].efficacite_distracteurs, 1 / 3)
+        self.assertEqual((indices[q0].nb_passages, indices[q0].nb_sans_reponse, indices[q0].nb_choix_B), (4, 1, 1))
+        self.assertAlmostEqual(indices[q1].indice_discrimination, 0.5 ** 0.5)
+        # q2 : item 1010, reste 2200 : mêmes moyennes pour les deux groupes
+        self.assertAlmostEqual(indices[q2].indice_discrimination, 0.0)
+        self.assertAlmostEqual(indices[q2].efficacite_distracteurs, 2 / 3)
+        self.assertIsNone(indices[absente].indice_difficulte)
+        self.assertEqual(indices[absente].nb_passages, 0)
+
+
+class ClassementTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        _, self.etudiant, _, _ = creer_donnees(nb_questions=0)
+        StudentUser.objects.filter(pk=self.etudiant.pk).update(progression_globale=30)
+        self.cle = 'classement:global'
+
+    def test_reconstruction_sous_verrou(self):
+        self.assertEqual(classement.top_k(), [
+            {'rang': 1, 'etudiant_id': self.etudiant.pk, 'username': 'etudiant', 'points': 30},
+        ])
+        self.assertEqual(cache.get(self.cle), [(self.etudiant.pk, 'etudiant', 30)])
+        self.assertIsNone(cache.get(f'{self.cle}:verrou'))
+
+        autre = StudentUser.objects.create_user(username='autre', password='x', role='STUDENT', progression_globale=50)
+        classement.rafraichir_tops(autre.pk, None)
+        self.assertEqual([entree['username'] for entree in classement.top_k()], ['autre', 'etudiant'])
+
+    def test_reconstruction_sans_verrou_non_mise_en_cache(self):
+        # Une mise à jour du top est en cours : le top lu en base n'écrase pas le sien
+        cache.add(f'{self.cle}:verrou', 1)
+        with mock.patch.object(classement.time, 'sleep'):
+            self.assertEqual(classement.top_k()[0]['points'], 30)
+        self.assertIsNone(cache.get(self.cle))
+
+
+class BadgesTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, self.chapitre, _ = creer_donnees()
+
+    def test_badge_attribue_une_seule_fois(self):
+        ProgressionChapitre.objects.create(etudiant=self.etudiant, chapitre=self.chapitre, nb_tentatives=1, meilleur_score=50)
+
+        self.assertEqual(badges.evaluer_etudiant(self.etudiant.pk), ['Débutant'])
+        self.assertEqual(badges.evaluer_etudiant(self.etudiant.pk), [])
+        badges.evaluer_tous()
+        # Insertion concurrente du même badge : ignorée par la contrainte d'unicité
+        BadgeObtenu.objects.bulk_create([BadgeObtenu(etudiant_id=self.etudiant.pk, code='Débutant')], ignore_conflicts=True)
+
+        self.assertEqual(BadgeObtenu.objects.filter(etudiant=self.etudiant, code='Débutant').count(), 1)
+
+
+class MigrationBadgesTests(TransactionTestCase):
+    """0007 : reprise de StudentUser.badges_obtenus dans la table BadgeObtenu."""
+
+    avant = [('formation', '0006_index_composites')]
+    apres = [('formation', '0007_badgeobtenu')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrer(self, cible):
+        executor = MigrationExecutor(connection)
+        executor.migrate(cible)
+        return executor.loader.project_state(cible).apps
+
+    def test_badges_existants_repris(self):
+        apps = self.migrer(self.avant)
+        ancien_etudiant = apps.get_model('formation', 'StudentUser')
+        etudiant = ancien_etudiant.objects.create(
+            username='ancien', password='x', role='STUDENT', badges_obtenus=['Débutant', 'Expert', 'Débutant'],
+        )
+        sans_badge = ancien_etudiant.objects.create(username='nouveau', password='x', role='STUDENT', badges_obtenus=[])
+
+        apps = self.migrer(self.apres)
+        badge_obtenu = apps.get_model('formation', 'BadgeObtenu')
+
+        self.assertEqual(
+            sorted(badge_obtenu.objects.filter(etudiant_id=etudiant.pk).values_list('code', flat=True)),
+            ['Débutant', 'Expert'],
+        )
+        self.assertFalse(badge_obtenu.objects.filter(etudiant_id=sans_badge.pk).exists())
+
+
+class RevisionTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, _, self.questions = creer_donnees(nb_questions=2)
+        self.maintenant = timezone.now()
+
+    def test_intervalles_sm2(self):
+        etat = EtatRevision()
+        intervalles = [revision.appliquer_sm2(etat, 5, self.maintenant).intervalle for _ in range(3)]
+
+        # 1 jour, 6 jours, puis intervalle x facilité (2.5 + 0.1 par rappel parfait, ajustée après)
+        self.assertEqual(intervalles, [1, 6, round(6 * 2.7)])
+        self.assertAlmostEqual(etat.facilite, 2.8)
+        self.assertEqual((etat.repetitions, etat.nb_revisions), (3, 3))
+        self.assertEqual(etat.date_echeance, self.maintenant + timedelta(days=16))
+
+        revision.appliquer_sm2(etat, revision.QUALITE_INCORRECTE, self.maintenant)
+        self.assertEqual((etat.repetitions, etat.intervalle, etat.nb_echecs), (0, 1, 1))
+        self.assertAlmostEqual(etat.facilite, 2.8 - 0.54)
+
+    def test_facilite_plancher(self):
+        etat = EtatRevision(facilite=1.4)
+        revision.appliquer_sm2(etat, revision.QUALITE_SANS_REPONSE, self.maintenant)
+        self.assertEqual(etat.facilite, revision.FACILITE_MIN)
+
+    def test_etat_cree_par_une_soumission_concurrente_est_mis_a_jour(self):
+        question, nouvelle = self.questions
+        creation = EtatRevision.objects.bulk_create
+
+        def soumission_concurrente(etats, **options):
+            # Une autre soumission crée l'état juste avant l'insertion de celle-ci
+            EtatRevision.objects.create(
+                etudiant=self.etudiant, question=question, repetitions=1, intervalle=1, nb_revisions=1,
+            )
+            return creation(etats, **options)
+
+        with mock.patch.object(EtatRevision.objects, 'bulk_create', side_effect=soumission_concurrente):
+            revision.enregistrer_revisions(
+                self.etudiant, self.questions, {str(question.id): 'A', str(nouvelle.id): 'B'}, self.maintenant,
+            )
+
+        fusionne = EtatRevision.objects.get(question=question)
+        self.assertEqual((fusionne.repetitions, fusionne.intervalle, fusionne.nb_revisions), (2, 6, 2))
+        cree = EtatRevision.objects.get(question=nouvelle)
+        self.assertEqual((cree.repetitions, cree.intervalle, cree.nb_echecs), (0, 1, 1))
+
+
+@override_settings(FEEDBACKS_IA_DIFFERES=True)
+class SoumissionIdempotenteTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, self.chapitre, self.questions = creer_donnees()
+        self.reponses = {str(question.id): 'A' for question in self.questions}
+
+    def soumettre(self, jeton):
+        resultat, _ = soumission.soumettre_quiz(self.etudiant, self.chapitre, self.questions, self.reponses, jeton)
+        return resultat
+
+    def test_meme_jeton_un_seul_resultat(self):
+        jeton = soumission.jeton_tentative(self.etudiant, self.chapitre.id)
+
+        premier = self.soumettre(jeton)
+        second = self.soumettre(jeton)
+
+        self.assertEqual(premier.id, second.id)
+        self.assertEqual(QuizResult.objects.filter(etudiant=self.etudiant).count(), 1)
+        self.assertEqual(ProgressionChapitre.objects.get(etudiant=self.etudiant).nb_tentatives, 1)
+
+    def test_renvoi_apres_expiration_du_verrou_retrouve_le_resultat(self):
+        jeton = soumission.jeton_tentative(self.etudiant, self.chapitre.id)
+        premier = self.soumettre(jeton)
+        # Verrou de coalescence expiré, et vérification initiale perdue dans la course :
+        # seule l'unicité du jeton en base arrête la seconde insertion
+        cache.delete(f'vol-unique:soumission:{jeton}')
+        lecture = soumission.resultat_existant
+        with mock.patch.object(soumission, 'resultat_existant', side_effect=[None, lecture(self.etudiant, jeton)]):
+            second = self.soumettre(jeton)
+
+        self.assertEqual(second.id, premier.id)
+        self.assertEqual(QuizResult.objects.filter(etudiant=self.etudiant).count(), 1)
+        self.assertEqual(ProgressionChapitre.objects.get(etudiant=self.etudiant).nb_tentatives, 1)
+
+    def test_nouvelle_tentative_nouveau_jeton(self):
+        jeton = soumission.jeton_tentative(self.etudiant, self.chapitre.id)
+        self.assertEqual(soumission.jeton_tentative(self.etudiant, self.chapitre.id), jeton)
+
+        premier = self.soumettre(jeton)
+        nouveau_jeton = soumission.jeton_tentative(self.etudiant, self.chapitre.id)
+        second = self.soumettre(nouveau_jeton)
+
+        self.assertNotEqual(nouveau_jeton, jeton)
+        self.assertNotEqual(second.id, premier.id)
+        self.assertEqual(QuizResult.objects.filter(etudiant=self.etudiant).count(), 2)
+
+    def test_api_201_puis_200_au_renvoi(self):
+        self.client.force_login(self.etudiant)
+        url = reverse('api_soumettre_quiz', args=[self.chapitre.id])
+        corps = json.dumps({'jeton': str(soumission.jeton_tentative(self.etudiant, self.chapitre.id)), 'reponses': self.reponses})
+
+        premiere = self.client.post(url, corps, content_type='application/json')
+        renvoi = self.client.post(url, corps, content_type='application/json')
+
+        self.assertEqual(premiere.status_code, 201)
+        self.assertEqual(renvoi.status_code, 200)
+        self.assertEqual(renvoi.json()['resultat'], premiere.json()['resultat'])
+
+
+class GetConditionnelTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, self.chapitre, _ = creer_donnees()
+        self.client.force_login(self.etudiant)
+        self.url = reverse('quiz_detail', args=[self.chapitre.id])
+
+    def test_304_des_la_premiere_revisite(self):
+        premiere = self.client.get(self.url)
+        revisite = self.client.get(self.url, HTTP_IF_NONE_MATCH=premiere['ETag'])
+
+        self.assertEqual(premiere.status_code, 200)
+        self.assertEqual(revisite.status_code, 304)
+
+    def test_pas_de_304_avec_des_messages_en_attente(self):
+        request = RequestFactory().get(self.url)
+        request.user = self.etudiant
+        SessionMiddleware(lambda request: None).process_request(request)
+        request._messages = FallbackStorage(request)
+        etag_sans_message = versions.etag('page', versions.signature_utilisateur(request))
+        request.META['HTTP_IF_NONE_MATCH'] = etag_sans_message
+        self.assertIsNotNone(versions.reponse_conditionnelle(request, etag_sans_message, None))
+
+        messages.info(request, 'Quiz généré')
+
+        self.assertIsNone(versions.reponse_conditionnelle(request, etag_sans_message, None))
+        self.assertNotEqual(versions.etag('page', versions.signature_utilisateur(request)), etag_sans_message)
+        # Le test n'a pas consommé le message
+        self.assertEqual(versions.messages_en_attente(request), 1)
+
+    def test_save_d_une_instance_perimee_n_ecrit_pas_son_tampon(self):
+        chapitre = Chapitre.objects.get(id=self.chapitre.id)
+        formation = chapitre.formation
+
+        def tampons(modele, objet):
+            return modele.objects.values_list('version', flat=True).get(id=objet.id)
+
+        version_chapitre, version_formation = tampons(Chapitre, chapitre), tampons(Formation, formation)
+
+        # Avance les tampons en base ; les instances gardent les valeurs lues
+        QuizQuestion.objects.filter(chapitre=chapitre).first().save()
+        formation.titre = 'Python avancé'
+        formation.save()
+        chapitre.titre = 'Variables et types'
+        chapitre.save()
+
+        # Question, formation (recopiée sur ses chapitres), puis chapitre : jamais de retour en arrière
+        self.assertEqual(tampons(Chapitre, chapitre), version_chapitre + 3)
+        self.assertEqual(tampons(Formation, formation), version_formation + 2)
+        self.assertEqual(Chapitre.objects.get(id=chapitre.id).titre, 'Variables et types')
+
+
+class ImportationTests(TestCase):
+
+    def setUp(self):
+        self.professeur = CustomUser.objects.create_user(username='prof', password='x', role='TEACHER')
+
+    def importer(self, *enregistrements):
+        importeur = importation.Importeur(createur=self.professeur)
+        return importeur.importer(enumerate(enregistrements, start=1))
+
+    def test_est_public_texte_interprete(self):
+        bilan = self.importer(
+            {'type': 'formation', 'titre': 'A', 'est_public': 'false'},
+            {'type': 'formation', 'titre': 'B', 'est_public': '1'},
+            {'type': 'formation', 'titre': 'C', 'est_public': True},
+        )
+
+        self.assertEqual(bilan.nb_erreurs, 0)
+        self.assertEqual(
+            dict(Formation.objects.values_list('titre', 'est_public')),
+            {'A': False, 'B': True, 'C': True},
+        )
+
+    def test_est_public_invalide_refuse_a_la_creation_et_a_la_mise_a_jour(self):
+        self.importer({'type': 'formation', 'titre': 'A', 'est_public': 'true'})
+
+        bilan = self.importer(
+            {'type': 'formation', 'titre': 'A', 'est_public': 'non'},
+            {'type': 'formation', 'titre': 'B', 'est_public': 'oui'},
+        )
+        self.assertEqual(bilan.nb_erreurs, 2)
+        self.assertTrue(Formation.objects.get(titre='A').est_public)
+        self.assertFalse(Formation.objects.filter(titre='B').exists())
+
+        self.importer({'type': 'formation', 'titre': 'A', 'est_public': '0'})
+        self.assertFalse(Formation.objects.get(titre='A').est_public)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.professeur, self.etudiant, self.chapitre, self.questions = creer_donnees()
+        q0, q1, q2 = (str(question.id) for question in self.questions)
+        self.recent = self.resultat(self.chapitre, {q0: 'A', q1: 'B', q2: None}, datetime(2026, 10, 1, 23, 30))
+        self.ancien = self.resultat(self.chapitre, {q0: 'C'}, datetime(2026, 9, 1, 8, 0))
+
+        # Formation d'un autre professeur : jamais exportée pour le premier
+        autre = CustomUser.objects.create_user(username='autre_prof', password='x', role='TEACHER')
+        formation = Formation.objects.create(titre='Java', description='...', niveau='Débutant', createur=autre)
+        chapitre = Chapitre.objects.create(titre='Classes', contenu_texte='...', formation=formation)
+        self.resultat(chapitre, {}, datetime(2026, 10, 1, 12, 0))
+
+    def resultat(self, chapitre, reponses, date_passage):
+        resultat = QuizResult.objects.create(score=1, reponses_etudiant=reponses, chapitre=chapitre, etudiant=self.etudiant)
+        QuizResult.objects.filter(id=resultat.id).update(date_passage=timezone.make_aware(date_passage))
+        return resultat
+
+    def exporter(self, format_export, **filtres):
+        reponse = self.client.get(reverse('export_resultats', args=[format_export]), filtres)
+        self.assertEqual(reponse.status_code, 200)
+        return b''.join(reponse.streaming_content).decode('utf-8')
+
+    def test_csv_aplati_du_professeur(self):
+        self.client.force_login(self.professeur)
+        contenu = self.exporter('csv')
+
+        self.assertTrue(contenu.startswith('\ufeff'))
+        lignes = list(csv.DictReader(contenu.lstrip('\ufeff').splitlines()))
+        self.assertEqual(list(lignes[0]), export.COLONNES_CSV)
+        self.assertEqual({ligne['resultat_id'] for ligne in lignes}, {str(self.recent.id), str(self.ancien.id)})
+        recentes = [ligne for ligne in lignes if ligne['resultat_id'] == str(self.recent.id)]
+        self.assertEqual(
+            [(ligne['question_id'], ligne['reponse'], ligne['bonne_reponse'], ligne['correcte']) for ligne in recentes],
+            [(str(self.questions[0].id), 'A', 'A', '1'), (str(self.questions[1].id), 'B', 'A', '0'),
+             (str(self.questions[2].id), '', 'A', '0')],
+        )
+        self.assertEqual((recentes[0]['etudiant'], recentes[0]['formation'], recentes[0]['chapitre']),
+                         ('etudiant', 'Python', 'Variables'))
+
+    def test_jsonl_filtre_par_dates(self):
+        self.client.force_login(self.professeur)
+
+        objets = [json.loads(ligne) for ligne in self.exporter('jsonl', debut='2026-10-01', fin='2026-10-01').splitlines()]
+
+        # Bornes incluses : le résultat de 23 h 30 le jour de fin est exporté, pas celui de septembre
+        self.assertEqual([objet['resultat_id'] for objet in objets], [self.recent.id])
+        self.assertEqual(objets[0]['reponses'][2], {
+            'question_id': self.questions[2].id, 'reponse': None, 'bonne_reponse': 'A', 'correcte': False,
+        })
+        self.assertEqual(self.exporter('jsonl', debut='2026-10-02'), '')
+
+    def test_acces(self):
+        self.client.force_login(self.professeur)
+        self.assertEqual(self.client.get(reverse('export_resultats', args=['csv']), {'debut': '01/10/2026'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_resultats', args=['xml'])).status_code, 404)
+
+        self.client.force_login(self.etudiant)
+        self.assertRedirects(self.client.get(reverse('export_resultats', args=['csv'])), reverse('home'),
+                             fetch_redirect_response=False)
+
+
+class PassagesTests(TestCase):
+
+    def setUp(self):
+        _, _, chapitre, _ = creer_donnees(nb_questions=0)
+        self.paragraphes = [
+            'Une variable associe un nom à une valeur. ' * 6,
+            'La boucle for parcourt une liste ; chaque boucle répète un bloc. ' * 4,
+            'Une fonction regroupe des instructions réutilisables. ' * 5,
+            'Les modules organisent le code en fichiers séparés. ' * 5 + 'Une boucle peut aussi y figurer.',
+        ]
+        self.paragraphes = [paragraphe.strip() for paragraphe in self.paragraphes]
+        self.chapitre = Chapitre.objects.create(
+            titre='Bases', contenu_texte='\n\n'.join(self.paragraphes), formation=chapitre.formation,
+        )
+
+    def test_classement_bm25(self):
+        classes = passages.passages_pertinents(self.chapitre.id, 'Boucles', k=4)
+
+        # Indexé à la première recherche, un passage par paragraphe
+        self.assertEqual([passage.texte for _, passage in sorted(classes, key=lambda c: c[1].position)], self.paragraphes)
+        # Plus d'occurrences dans un passage court d'abord ; à score nul, ordre du cours
+        self.assertEqual([passage.position for _, passage in classes], [1, 3, 0, 2])
+        scores = [score for score, _ in classes]
+        self.assertGreater(scores[0], scores[1])
+        self.assertGreater(scores[1], 0)
+        self.assertEqual(scores[2:], [0, 0])
+
+    def test_contexte_sous_la_limite(self):
+        boucles, modules = self.paragraphes[1], self.paragraphes[3]
+
+        # Dans l'ordre du cours, le passage le mieux classé en premier retenu
+        self.assertEqual(passages.contexte(self.chapitre.id, 'boucle', k=2), f'{boucles}\n\n[...]\n\n{modules}')
+        # Le second ne tient pas dans la limite : écarté, pas tronqué
+        limite = len(boucles) + len(modules) - 1
+        self.assertEqual(passages.contexte(self.chapitre.id, 'boucle', k=2, limite=limite), boucles)
+        # Un premier passage plus long que la limite est coupé
+        self.assertEqual(passages.contexte(self.chapitre.id, 'boucle', k=2, limite=50), boucles[:50])
+        self.assertEqual(passages.contexte(self.chapitre.id, 'classe', pertinents_seulement=True), '')
+
+
+class RechercheTests(TestCase):
+
+    def setUp(self):
+        self.professeur, _, self.chapitre, _ = creer_donnees(nb_questions=0)
+        self.modes = [False] + ([True] if recherche.fts_disponible() else [])
+
+    def trouves(self, texte):
+        return [(resultat['type'], resultat['id']) for resultat in recherche.rechercher(texte)]
+
+    def verifier(self, texte, attendus):
+        # Index FTS5 (déclencheurs) et repli ORM donnent les mêmes résultats
+        for fts in self.modes:
+            with self.subTest(fts=fts, texte=texte), mock.patch.object(recherche, 'fts_disponible', return_value=fts):
+                self.assertEqual(self.trouves(texte), attendus)
+
+    def test_creation_modification_suppression(self):
+        chapitre = Chapitre.objects.create(
+            titre='Les boucles', contenu_texte='Répéter des instructions.', formation=self.chapitre.formation,
+        )
+        question = QuizQuestion.objects.create(
+            question_texte='Quelle boucle parcourt une liste ?', choix_A='for', choix_B='if', choix_C='def', choix_D='=',
+            bonne_reponse='A', explication='...', chapitre=self.chapitre, createur=self.professeur,
+        )
+        # Titre pondéré : le chapitre avant la question
+        self.verifier('boucle', [('chapitre', chapitre.id), ('question', question.id)])
+        self.verifier('répéter', [('chapitre', chapitre.id)])
+
+        chapitre.titre = 'Les itérations'
+        chapitre.save()
+        question.question_texte = 'Quelle instruction parcourt une liste ?'
+        question.save()
+        self.verifier('boucle', [])
+        self.verifier('itération', [('chapitre', chapitre.id)])
+        self.verifier('parcourt liste', [('question', question.id)])
+
+        chapitre.delete()
+        question.delete()
+        self.verifier('itération', [])
+        self.verifier('parcourt', [])
+
+    def test_syntaxe_fts_neutralisee(self):
+        formation = Formation.objects.create(
+            titre='Arbres ordonnés', description='Arbres binaires de recherche', niveau='Avancé', createur=self.professeur,
+        )
+        self.assertEqual(recherche.termes_recherche('"a" OR b*'), ['a', 'OR', 'b'])
+        # Guillemets, opérateur et joker deviennent des préfixes en ET : pas d'erreur de syntaxe MATCH
+        self.verifier('"a" OR b*', [('formation', formation.id)])
+        self.verifier('NEAR(a b) -x ^c', [])
+
+
+@override_settings(LIMITES_IA_UTILISATEUR={'STUDENT': (2, 1)}, LIMITES_IA_ROLE={}, LIMITES_IA_GLOBAL=(100, 100))
+class LimitesIATests(TestCase):
+
+    def setUp(self):
+        # Seaux du cache mémoire : non annulés avec la transaction du test
+        cache.clear()
+        _, self.etudiant, _, _ = creer_donnees(nb_questions=0)
+
+    def test_compteurs_du_jour_lisibles_par_la_commande(self):
+        limites.consommer(self.etudiant.pk, 'STUDENT')
+        limites.consommer(self.etudiant.pk, 'STUDENT')
+        with self.assertRaises(limites.LimiteIAAtteinte) as refus:
+            limites.consommer(self.etudiant.pk, 'STUDENT')
+        self.assertEqual(refus.exception.portee, 'utilisateur')
+
+        consommation = limites.consommation_du_jour()
+        self.assertEqual(consommation['global'], {'appels': 2, 'jetons': 2, 'refus': 1})
+        self.assertEqual(consommation['utilisateurs'], {self.etudiant.pk: {'appels': 2, 'jetons': 2, 'refus': 1}})
+        self.assertEqual(limites.etat(self.etudiant.pk, 'STUDENT')['aujourd_hui']['appels'], 2)
+
+        sortie = StringIO()
+        call_command('quotas_ia', stdout=sortie)
+        self.assertIn('1 utilisateur(s)', sortie.getvalue())
+
+    def test_seau_global_partage(self):
+        autre = StudentUser.objects.create_user(username='autre', password='x', role='STUDENT')
+        with override_settings(LIMITES_IA_GLOBAL=(3, 1)):
+            limites.consommer(self.etudiant.pk, 'STUDENT')
+            limites.consommer(self.etudiant.pk, 'STUDENT')
+            limites.consommer(autre.pk, 'STUDENT')
+            with self.assertRaises(limites.LimiteIAAtteinte) as refus:
+                limites.consommer(autre.pk, 'STUDENT')
+        self.assertEqual(refus.exception.portee, 'global')
+
+    def test_compteurs_en_une_seule_mise_a_jour(self):
+        compteurs.incrementer({'a': 1, 'b': 2})
+        # Compteurs existants : une lecture et un UPDATE dans un seul point de sauvegarde
+        with self.assertNumQueries(4):
+            compteurs.incrementer({'a': 10, 'b': 20})
+        compteurs.incrementer({'b': 1, 'c': 5})
+
+        self.assertEqual(compteurs.lire(['a', 'b', 'c', 'd']), {'a': 11, 'b': 23, 'c': 5})
+
+
+class GenerationQuizTests(TestCase):
+
+    def setUp(self):
+        self.professeur, _, self.chapitre, _ = creer_donnees(nb_questions=0)
+        self.cle = generation.cle_generation(self.chapitre.id, 2, 'Moyen')
+
+    def test_suiveur_attend_et_partage_les_questions(self):
+        en_vol = GenerationQuiz.objects.create(
+            cle=self.cle, chapitre=self.chapitre, createur=self.professeur, nombre_questions=2, difficulte='Moyen',
+        )
+
+        def meneur_termine(_):
+            # Pendant l'attente du suiveur, le meneur (autre processus) crée ses questions
+            questions = [
+                QuizQuestion.objects.create(
+                    question_texte=f'Question {numero} ?', choix_A='a', choix_B='b', choix_C='c', choix_D='d',
+                    bonne_reponse='B', explication='...', chapitre=self.chapitre, generee_ia=True,
+                )
+                for numero in range(2)
+            ]
+            GenerationQuiz.objects.filter(id=en_vol.id).update(
+                statut='TERMINEE', question_ids=[question.id for question in questions], date_fin=timezone.now(),
+            )
+
+        with mock.patch.object(generation.time, 'sleep', side_effect=meneur_termine) as attente, \
+                mock.patch.object(generation, 'ServiceIA') as service:
+            questions, partagee = generation.generer_quiz(self.chapitre, 2, 'Moyen', self.professeur)
+
+        self.assertTrue(partagee)
+        attente.assert_called_once()
+        service.assert_not_called()
+        self.assertEqual([question.id for question in questions], GenerationQuiz.objects.get(id=en_vol.id).question_ids)
+        self.assertEqual(QuizQuestion.objects.filter(chapitre=self.chapitre).count(), 2)
+
+    def test_verrou_abandonne_repris(self):
+        delai = 180
+        abandonnee = GenerationQuiz.objects.create(
+            cle=self.cle, chapitre=self.chapitre, createur=self.professeur, nombre_questions=2, difficulte='Moyen',
+            date_debut=timezone.now() - timedelta(seconds=delai + 1),
+        )
+
+        with override_settings(GENERATION_QUIZ_DELAI=delai), charge.ia_factice():
+            questions, partagee = generation.generer_quiz(self.chapitre, 2, 'Moyen', self.professeur)
+
+        self.assertFalse(partagee)
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(GenerationQuiz.objects.get(id=abandonnee.id).statut, 'ECHEC')
+        reprise = GenerationQuiz.objects.exclude(id=abandonnee.id).get(cle=self.cle)
+        self.assertEqual(reprise.statut, 'TERMINEE')
+        self.assertEqual(reprise.question_ids, [question.id for question in questions])
+
+    def test_meneur_repris_pendant_l_appel_n_ecrase_pas_la_reprise(self):
+        reprise = {}
+
+        def appel_lent(**_):
+            # Pendant l'appel, un suiveur déclare le meneur abandonné et reprend la génération
+            GenerationQuiz.objects.filter(cle=self.cle, statut='EN_COURS').update(statut='ECHEC', date_fin=timezone.now())
+            reprise['generation'] = GenerationQuiz.objects.create(
+                cle=self.cle, chapitre=self.chapitre, createur=self.professeur, nombre_questions=2, difficulte='Moyen',
+            )
+            return [question_ia(1), question_ia(2)]
+
+        def reprise_termine(_):
+            question = QuizQuestion.objects.create(
+                question_texte='Question de la reprise ?', choix_A='a', choix_B='b', choix_C='c', choix_D='d',
+                bonne_reponse='A', explication='...', chapitre=self.chapitre, generee_ia=True,
+            )
+            GenerationQuiz.objects.filter(id=reprise['generation'].id).update(
+                statut='TERMINEE', question_ids=[question.id], date_fin=timezone.now(),
+            )
+
+        with mock.patch.object(generation, 'ServiceIA') as service, \
+                mock.patch.object(generation.time, 'sleep', side_effect=reprise_termine):
+            service.return_value.generer_quiz.side_effect = appel_lent
+            questions, partagee = generation.generer_quiz(self.chapitre, 2, 'Moyen', self.professeur)
+
+        self.assertTrue(partagee)
+        self.assertEqual([question.question_texte for question in questions], ['Question de la reprise ?'])
+        self.assertEqual(QuizQuestion.objects.filter(chapitre=self.chapitre).count(), 1)
+        self.assertEqual(
+            sorted(GenerationQuiz.objects.filter(cle=self.cle).values_list('statut', flat=True)), ['ECHEC', 'TERMINEE'],
+        )
+
+    @override_settings(GENERATION_QUIZ_DELAI=None, GENERATION_QUIZ_APPELS_MAX=3)
+    def test_delai_abandon_couvre_la_duree_au_pire(self):
+        # 3 appels x (3 tentatives x 30 s + 2 s + 4 s de pauses)
+        self.assertGreater(generation.delai_abandon(), 3 * (3 * 30 + 2 + 4))
+
+
+def question_ia(numero):
+    """Question au format renvoyé par le modèle."""
+    return {'question': f'Question générée {numero} ?', 'choix': ['a', 'b', 'c', 'd'], 'bonne_reponse': 0,
+            'explication': f'Explication {numero}'}
+
+
+@override_settings(AI_PROVIDER='groq', GROQ_API_KEY='cle-de-test', MODELES_IA_GROQ={'quiz': ['rapide']},
+                   GENERATION_QUIZ_APPELS_MAX=3)
+class ComplementsQuizTests(TestCase):
+
+    def setUp(self):
+        _, _, self.chapitre, _ = creer_donnees(nb_questions=0)
+        self.chapitre.contenu_texte = 'Une variable nomme une valeur stockée en mémoire. ' * 5
+        self.service = service_ia()
+
+    def generer(self, *reponses):
+        with mock.patch.object(self.service, '_demander_questions', side_effect=list(reponses)) as demander:
+            questions = self.service.generer_quiz(self.chapitre, nombre_questions=5)
+        return questions, demander
+
+    def test_complement_des_seules_questions_manquantes(self):
+        invalide = {'question': 'Sans choix ?', 'choix': ['a'], 'bonne_reponse': 0, 'explication': '-'}
+        questions, demander = self.generer(
+            [question_ia(1), question_ia(2), invalide, question_ia(1)],
+            [question_ia(3), question_ia(4), question_ia(5)],
+        )
+
+        self.assertEqual([q['question'] for q in questions], [question_ia(n)['question'] for n in range(1, 6)])
+        self.assertEqual(demander.call_count, 2)
+        premier, second = (appel.args[2] for appel in demander.call_args_list)
+        self.assertIn('exactement 5 questions', premier)
+        self.assertNotIn('déjà retenues', premier)
+        self.assertIn('exactement 3 questions', second)
+        self.assertIn(f"- {question_ia(1)['question']}", second)
+        self.assertIn(f"- {question_ia(2)['question']}", second)
+        self.assertLess(demander.call_args_list[1].kwargs['max_tokens'], demander.call_args_list[0].kwargs['max_tokens'])
+
+    def test_premier_appel_incomplet_puis_appels_epuises(self):
+        questions, demander = self.generer([question_ia(1)], [], [question_ia(2)])
+
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(demander.call_count, 3)
+
+    def test_echec_du_complement_garde_les_questions_retenues(self):
+        questions, _ = self.generer([question_ia(1), question_ia(2)], RuntimeError('API indisponible'))
+        self.assertEqual(len(questions), 2)
+
+        refus = budgets.BudgetIADepasse('formation', 900, 1000, 400)
+        questions, _ = self.generer([question_ia(1)], refus)
+        self.assertEqual(len(questions), 1)
+
+    def test_echec_sans_question_retenue(self):
+        with self.assertRaisesMessage(Exception, 'API indisponible'):
+            self.generer(RuntimeError('API indisponible'))
+        with self.assertRaises(budgets.BudgetIADepasse):
+            self.generer(budgets.BudgetIADepasse('formation', 1000, 1000, 400))
+
+
+class ModelesIATests(TestCase):
+
+    def test_rapport_lu_par_la_commande(self):
+        modeles_ia.enregistrer_appel('feedback', 'rapide', 0.2, 'rejet')
+        modeles_ia.enregistrer_appel('feedback', 'org/grand:v1', 1.5, 'valide')
+        modeles_ia.enregistrer_demande('feedback', 1)
+        modeles_ia.enregistrer_appel('feedback', 'rapide', 0.3, 'valide')
+        modeles_ia.enregistrer_demande('feedback', 0)
+
+        sortie = StringIO()
+        call_command('rapport_modeles_ia', '--json', stdout=sortie)
+        feedback = json.loads(sortie.getvalue())['feedback']
+
+        self.assertEqual((feedback['demandes'], feedback['escalades'], feedback['taux_escalade']), (2, 1, 0.5))
+        self.assertEqual(list(feedback['paliers']), ['rapide', 'org/grand:v1'])
+        self.assertEqual(
+            feedback['paliers']['rapide'],
+            {'appels': 2, 'valide': 1, 'rejet': 1, 'erreur': 0, 'taux_rejet': 0.5, 'moyenne_ms': 250,
+             'p50_ms': 250, 'p95_ms': 500},
+        )
+        self.assertEqual(feedback['paliers']['org/grand:v1']['p95_ms'], 2000)
+
+
+FEEDBACK_VALIDE = "Votre choix confond deux notions ; relisez la définition d'une variable dans le cours."
+
+
+@override_settings(AI_PROVIDER='groq', GROQ_API_KEY='cle-de-test', MODELES_IA_GROQ={'feedback': ['rapide', 'grand']},
+                   FEEDBACKS_IA_DIFFERES=True)
+class FeedbacksGroupesTests(TestCase):
+
+    def setUp(self):
+        _, self.etudiant, self.chapitre, self.questions = creer_donnees()
+        self.ids = [str(question.id) for question in self.questions]
+
+    def test_json_partiel_puis_illisible(self):
+        service = service_ia(
+            # Premier palier : une entrée valide, une trop courte, la troisième absente, texte autour
+            reponse_chat(f'Voici : {{"{self.ids[0]}": "{FEEDBACK_VALIDE}", "{self.ids[1]}": "Non."}} Bon courage'),
+            # Second palier : JSON tronqué
+            reponse_chat(f'{{"{self.ids[1]}": "{FEEDBACK_VALIDE}", "{self.ids[2]}": "Rel', finish_reason='length'),
+        )
+
+        feedbacks = service.generer_feedbacks([(question, 'B') for question in self.questions])
+
+        self.assertEqual(feedbacks, {self.questions[0].id: FEEDBACK_VALIDE})
+        # Le second palier ne redemande que les deux feedbacks manquants
+        self.assertEqual(service.client.chat.completions.create.call_count, 2)
+        second_appel = service.client.chat.completions.create.call_args_list[1].kwargs
+        self.assertEqual(second_appel['model'], 'grand')
+        self.assertNotIn(f'Question {self.ids[0]} :', second_appel['messages'][1]['content'])
+
+    def test_completer_feedbacks_repli_sur_l_explication(self):
+        resultat, _ = soumission.soumettre_quiz(
+            self.etudiant, self.chapitre, self.questions, {question_id: 'B' for question_id in self.ids},
+        )
+        self.assertTrue(resultat.feedbacks_en_cours)
+        service = service_ia(
+            reponse_chat(f'{{"{self.ids[2]}": "{FEEDBACK_VALIDE}"}}'),
+            reponse_chat('Désolé, je ne peux pas répondre en JSON.'),
+        )
+
+        with mock.patch.object(soumission, 'ServiceIA', return_value=service):
+            self.assertEqual(soumission.completer_feedbacks(resultat.id), 3)
+
+        resultat.refresh_from_db()
+        self.assertFalse(resultat.feedbacks_en_cours)
+        self.assertEqual(resultat.feedbacks_en_attente, [])
+        self.assertEqual(resultat.explications_erreurs, {
+            self.ids[0]: soumission.explication_par_defaut(self.questions[0]),
+            self.ids[1]: soumission.explication_par_defaut(self.questions[1]),
+            self.ids[2]: FEEDBACK_VALIDE,
+        })
+
+
+@override_settings(AI_PROVIDER='groq', GROQ_API_KEY='cle-de-test', MODELES_IA_GROQ={'quiz': ['rapide'], 'feedback': ['rapide']},
+                   BUDGET_IA_FORMATION_JOUR=1000, BUDGET_IA_PROFESSEUR_JOUR=None, FEEDBACKS_IA_DIFFERES=True)
+class BudgetsIATests(TestCase):
+
+    def setUp(self):
+        self.professeur, self.etudiant, self.chapitre, self.questions = creer_donnees()
+
+    def tokens(self):
+        return ConsommationIA.objects.aggregate(total=Sum('tokens'))['total'] or 0
+
+    def test_depassement_annule_la_reservation(self):
+        budgets.reserver('quiz', self.chapitre.id, 'rapide', 600)
+
+        with self.assertRaises(budgets.BudgetIADepasse) as contexte:
+            budgets.reserver('quiz', self.chapitre.id, 'rapide', 600)
+
+        self.assertEqual((contexte.exception.portee, contexte.exception.consomme), ('formation', 600))
+        self.assertEqual(self.tokens(), 600)
+        # Une première réservation refusée ne crée pas non plus de ligne
+        with self.assertRaises(budgets.BudgetIADepasse):
+            budgets.reserver('feedback', self.chapitre.id, 'rapide', 1500)
+        self.assertFalse(ConsommationIA.objects.filter(operation='feedback').exists())
+
+    def test_reconciliation_avec_l_usage_reel(self):
+        sans_usage = reponse_chat(FEEDBACK_VALIDE)
+        sans_usage.usage = None
+        service = service_ia(reponse_chat(FEEDBACK_VALIDE, tokens=(120, 30)), sans_usage)
+
+        service._appel_chat('feedback', self.chapitre.id, 'rapide', 'Système', 'Question', temperature=0.8, max_tokens=200)
+
+        ligne = ConsommationIA.objects.get()
+        self.assertEqual((ligne.appels, ligne.tokens, ligne.tokens_prompt, ligne.tokens_completion), (1, 150, 120, 30))
+        self.assertGreater(ligne.tokens_estimes, 200)
+        # Sans usage renvoyé, l'estimation reste imputée
+        service._appel_chat('feedback', self.chapitre.id, 'rapide', 'Système', 'Question', temperature=0.8, max_tokens=200)
+        ligne.refresh_from_db()
+        self.assertEqual((ligne.appels, ligne.tokens), (2, 150 + ligne.tokens_estimes // 2))
+
+    def test_appel_en_echec_libere_la_reservation(self):
+        service = service_ia()
+        service.max_retries = 1
+        service.client.chat.completions.create.side_effect = RuntimeError('API indisponible')
+
+        with self.assertRaisesMessage(Exception, 'API indisponible'):
+            service._appel_chat('quiz', self.chapitre.id, 'rapide', 'Système', 'Cours', temperature=0.7, max_tokens=200)
+
+        self.assertEqual(self.tokens(), 0)
+
+    @override_settings(BUDGET_IA_FORMATION_JOUR=100)
+    def test_budget_epuise_refuse_la_generation_de_quiz(self):
+        self.chapitre.contenu_texte = 'Une variable nomme une valeur stockée en mémoire. ' * 5
+        self.chapitre.save()
+        service = service_ia()
+
+        with mock.patch.object(generation, 'ServiceIA', return_value=service):
+            with self.assertRaises(budgets.BudgetIADepasse):
+                generation.generer_quiz(self.chapitre, 5, 'Moyen', self.professeur)
+
+        service.client.chat.completions.create.assert_not_called()
+        self.assertEqual(GenerationQuiz.objects.get().statut, 'ECHEC')
+        self.assertEqual(self.tokens(), 0)
+
+    @override_settings(BUDGET_IA_FORMATION_JOUR=100)
+    def test_budget_epuise_feedbacks_sur_l_explication(self):
+        resultat, _ = soumission.soumettre_quiz(
+            self.etudiant, self.chapitre, self.questions, {str(question.id): 'B' for question in self.questions},
+        )
+        service = service_ia()
+
+        self.assertEqual(
+            service.generer_feedback(self.questions[0], 'B', 'A'), soumission.explication_par_defaut(self.questions[0]),
+        )
+        with mock.patch.object(soumission, 'ServiceIA', return_value=service):
+            soumission.completer_feedbacks(resultat.id)
+
+        service.client.chat.completions.create.assert_not_called()
+        resultat.refresh_from_db()
+        self.assertFalse(resultat.feedbacks_en_cours)
+        self.assertEqual(resultat.explications_erreurs, {
+            str(question.id): soumission.explication_par_defaut(question) for question in self.questions
+        })
+        self.assertEqual(self.tokens(), 0)
+
+
+# Réplique telle que settings.py la déclare quand BASE_ANALYTIQUE est défini
+BASE_ANALYTIQUE = {
+    'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'file:replique.sqlite3?mode=ro', 'TEST': {'MIRROR': 'default'},
+}
+
+
+class RouteurRepliqueTests(TransactionTestCase):
+    # Hors TestCase : sa transaction englobante garderait toutes les lectures sur 'default'
+
+    def setUp(self):
+        self.routeur = replique.RouteurReplique()
+        self.indice = {replique.INDICE: True}
+
+    def test_lectures_analytiques_hors_transaction_seulement(self):
+        with override_settings(DATABASES={**settings.DATABASES, 'analytique': BASE_ANALYTIQUE}):
+            self.assertEqual(self.routeur.db_for_read(QuizResult, **self.indice), 'analytique')
+            self.assertEqual(replique.analytique(QuizResult).filter(score=1).db, 'analytique')
+            with transaction.atomic():
+                # Doit voir les écritures de la transaction en cours
+                self.assertEqual(self.routeur.db_for_read(QuizResult, **self.indice), 'default')
+                self.assertEqual(replique.analytique(QuizResult).filter(score=1).db, 'default')
+            self.assertEqual(self.routeur.db_for_read(QuizResult, **self.indice), 'analytique')
+
+            self.assertIsNone(self.routeur.db_for_read(QuizResult))
+            self.assertEqual(QuizResult.objects.all().db, 'default')
+            self.assertEqual(self.routeur.db_for_write(QuizResult, **self.indice), 'default')
+            self.assertIs(self.routeur.allow_migrate('analytique', 'formation'), False)
+            self.assertIsNone(self.routeur.allow_migrate('default', 'formation'))
+
+    def test_sans_replique_tout_reste_sur_default(self):
+        self.assertNotIn('analytique', settings.DATABASES)
+        self.assertEqual(self.routeur.db_for_read(QuizResult, **self.indice), 'default')
+        self.assertEqual(replique.analytique(QuizResult).all().db, 'default')
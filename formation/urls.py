@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     # Page d'accueil
@@ -23,6 +23,34 @@ urlpatterns = [
     # Afficher les résultats du quiz
     path('resultat/<int:result_id>/', views.quiz_result_view, name='quiz_result'),
     
+    # Tableau de bord de progression (Action étudiant)
+    path('tableau-de-bord/', views.tableau_de_bord_view, name='tableau_de_bord'),
+    
+    # Session de révision espacée (Action étudiant)
+    path('revision/', views.revision_view, name='revision'),
+    
+    # Classements global et par formation
+    path('classement/', views.classement_view, name='classement'),
+    path('formation/<int:formation_id>/classement/', views.classement_view, name='classement_formation'),
+    
+    # Recherche plein texte
+    path('recherche/', views.recherche_view, name='recherche'),
+    
+    # Statistiques des questions d'un chapitre (Action prof)
+    path('chapitre/<int:chapitre_id>/statistiques/', views.chapitre_statistiques_view, name='chapitre_statistiques'),
+    
+    # Export des résultats en flux, CSV ou JSONL (Action prof)
+    path('export/resultats.<str:format_export>', views.export_resultats_view, name='export_resultats'),
+    
+    # API JSON v1 (client mobile, scripts)
+    path('api/v1/formations/', api.formations_api, name='api_formations'),
+    path('api/v1/formations/<int:formation_id>/chapitres/', api.chapitres_api, name='api_chapitres'),
+    path('api/v1/quiz/<int:chapitre_id>/', api.quiz_api, name='api_quiz'),
+    path('api/v1/quiz/<int:chapitre_id>/soumettre/', api.soumettre_quiz_api, name='api_soumettre_quiz'),
+    path('api/v1/resultats/<int:result_id>/', api.resultat_api, name='api_resultat'),
+    path('api/v1/recherche/', api.recherche_api, name='api_recherche'),
+    path('api/v1/quotas/', api.quotas_api, name='api_quotas'),
+    
     # Authentication routes
     path('login/', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
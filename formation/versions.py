@@ -0,0 +1,139 @@
+"""
+Tampons de version des formations et chapitres, et GET conditionnels
+- marquer_formations_modifiees / marquer_chapitres_modifies : avance atomique des tampons
+- Signaux : toute écriture de Formation, Chapitre ou QuizQuestion avance les tampons concernés
+- signature_utilisateur : partie de l'ETag propre au visiteur (utilisateur, session, messages)
+- etag : ETag fort dérivé des tampons et du contexte de rendu
+- reponse_conditionnelle : 304 Not Modified, avant toute requête lourde ou rendu
+- appliquer_entetes : ETag, Last-Modified, Cache-Control et Vary sur la réponse complète
+
+Les écritures en masse (bulk_create, update) ne déclenchent pas les signaux :
+elles doivent appeler marquer_*_modifie(e)s elles-mêmes.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Chapitre, Formation, QuizQuestion
+
+
+def marquer_formations_modifiees(formation_ids):
+    """Avance le tampon de version des formations données (un seul UPDATE)."""
+    Formation.objects.filter(id__in=formation_ids).update(
+        version=F('version') + 1, date_modification=timezone.now()
+    )
+
+
+def marquer_chapitres_modifies(chapitre_ids):
+    """Avance le tampon de version des chapitres donnés (un seul UPDATE)."""
+    Chapitre.objects.filter(id__in=chapitre_ids).update(
+        version=F('version') + 1, date_modification=timezone.now()
+    )
+
+
+@receiver([post_save, post_delete], sender=Formation)
+def _formation_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    marquer_formations_modifiees([instance.id])
+    # Le titre de la formation apparaît aussi sur les pages de ses chapitres
+    Chapitre.objects.filter(formation_id=instance.id).update(
+        version=F('version') + 1, date_modification=timezone.now()
+    )
+
+
+@receiver([post_save, post_delete], sender=Chapitre)
+def _chapitre_modifie(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    marquer_chapitres_modifies([instance.id])
+    # La page de la formation liste ses chapitres
+    marquer_formations_modifiees([instance.formation_id])
+
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def _question_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    marquer_chapitres_modifies([instance.chapitre_id])
+
+
+def messages_en_attente(request):
+    """Nombre de messages (django.contrib.messages) en attente d'affichage, sans les consommer."""
+    stockage = getattr(request, '_messages', None)
+    return len(stockage) if stockage is not None else 0
+
+
+def signature_utilisateur(request):
+    """
+    Partie du rendu propre au visiteur : deux visiteurs différents n'obtiennent
+    jamais le même ETag. La session (renouvelée à chaque connexion, comme le
+    cookie CSRF) couvre le jeton CSRF des formulaires : le cookie CSRF lui-même
+    n'est connu qu'après le premier rendu et ne peut pas servir au calcul.
+    Une page rendue avec des messages en attente a son propre ETag.
+    """
+    utilisateur = request.user
+    if not utilisateur.is_authenticated:
+        signature = 'anonyme'
+    else:
+        signature = (
+            f'{utilisateur.pk}:{utilisateur.username}:{utilisateur.role}:{utilisateur.is_staff}:'
+            f'{request.session.session_key or ""}'
+        )
+    nb_messages = messages_en_attente(request)
+    return f'{signature}:messages={nb_messages}' if nb_messages else signature
+
+
+def etag(*parties):
+    """ETag fort (entre guillemets) calculé sur les parties du rendu."""
+    empreinte = hashlib.sha256('|'.join(str(partie) for partie in parties).encode()).hexdigest()[:32]
+    return f'"{empreinte}"'
+
+
+def appliquer_entetes(reponse, etag_page, derniere_modification, public=False):
+    """
+    Pose les validateurs et la politique de cache sur une réponse.
+
+    public=True : page identique pour tous les visiteurs anonymes, cacheable par
+    les intermédiaires pendant CACHE_HTTP_DUREE_PUBLIQUE secondes.
+    Sinon : cache privé au navigateur, revalidé à chaque visite (304 si inchangée).
+    """
+    reponse.headers['ETag'] = etag_page
+    if derniere_modification is not None:
+        reponse.headers['Last-Modified'] = http_date(derniere_modification.timestamp())
+    if public:
+        patch_cache_control(reponse, public=True, max_age=getattr(settings, 'CACHE_HTTP_DUREE_PUBLIQUE', 300))
+    else:
+        patch_cache_control(reponse, private=True, no_cache=True)
+    patch_vary_headers(reponse, ('Cookie',))
+    return reponse
+
+
+def reponse_conditionnelle(request, etag_page, derniere_modification, public=False):
+    """
+    Évalue If-None-Match / If-Modified-Since avant le travail de la vue.
+
+    Jamais de 304 quand des messages attendent d'être affichés : la page
+    complète doit être rendue pour les consommer.
+
+    Returns:
+        HttpResponseNotModified (304) si la copie du client est à jour,
+        sinon None : la vue calcule et rend la page normalement
+    """
+    if request.method not in ('GET', 'HEAD') or messages_en_attente(request):
+        return None
+    entetes = appliquer_entetes(HttpResponse(), etag_page, derniere_modification, public)
+    reponse = get_conditional_response(
+        request, etag=etag_page,
+        last_modified=int(derniere_modification.timestamp()) if derniere_modification else None,
+        response=entetes,
+    )
+    return None if reponse is entetes else reponse
@@ -2,19 +2,25 @@
 Vues Django pour la gestion des quiz
 - home_view : Page d'accueil
 - formation_list_view : Liste des formations
-- formation_detail_view : Détails d'une formation
+- formation_detail_view : Détails d'une formation (GET conditionnel)
 - chapitre_list_view : Liste des chapitres
 - generer_quiz_view : Génération de quiz via IA (professeur)
-- quiz_detail_view : Affichage et passage du quiz (étudiant)
+- quiz_detail_view : Affichage (GET conditionnel) et passage du quiz (étudiant)
 - quiz_result_view : Affichage des résultats avec feedbacks IA
+- chapitre_statistiques_view : Analyse des questions d'un chapitre (professeur)
+- export_resultats_view : Export CSV / JSONL des résultats en flux (professeur)
+- tableau_de_bord_view : Tableau de bord de progression (étudiant)
+- classement_view : Classement global ou par formation
+- recherche_view : Recherche plein texte (formations, chapitres, questions)
+- revision_view : Session de révision espacée (étudiant)
 - login_view, register_view, logout_view : Authentication
 """
 
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponseBadRequest, Http404, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import F
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import login, logout, authenticate
@@ -22,8 +28,8 @@ from django.contrib.auth.forms import UserCreationForm
 import json
 import logging
 
-from .models import Chapitre, QuizQuestion, QuizResult, StudentUser, Formation, CustomUser
-from .services import ServiceIA
+from .models import Chapitre, QuizQuestion, QuizResult, StudentUser, Formation, CustomUser, QuestionStatistique, ProgressionChapitre, EtatRevision, BadgeObtenu
+from . import classement, revision, soumission, badges, versions, export, recherche, limites, generation, budgets, replique
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +60,21 @@ def formation_list_view(request):
 def formation_detail_view(request, formation_id):
     """
     Vue pour afficher les détails d'une formation et ses chapitres.
+    
+    Répond 304 quand la copie du client est à jour ; les formations publiques
+    vues par un visiteur anonyme sont cacheables par les intermédiaires.
     """
+    # Validateurs : tampon de version de la formation (une lecture par clé primaire)
+    tampon = Formation.objects.filter(id=formation_id).values_list('version', 'date_modification', 'est_public').first()
+    if tampon is None:
+        raise Http404("Formation introuvable")
+    version, date_modification, est_public = tampon
+    public = est_public and not request.user.is_authenticated
+    etag_page = versions.etag('formation', formation_id, version, date_modification, versions.signature_utilisateur(request))
+    non_modifie = versions.reponse_conditionnelle(request, etag_page, date_modification, public)
+    if non_modifie:
+        return non_modifie
+    
     formation = get_object_or_404(Formation, id=formation_id)
     chapitres = formation.chapitres.all().order_by('ordre')
     
@@ -62,7 +82,8 @@ def formation_detail_view(request, formation_id):
         'formation': formation,
         'chapitres': chapitres,
     }
-    return render(request, 'formation/formation_detail.html', context)
+    reponse = render(request, 'formation/formation_detail.html', context)
+    return versions.appliquer_entetes(reponse, etag_page, date_modification, public)
 
 
 def chapitre_list_view(request):
@@ -144,6 +165,7 @@ def generer_quiz_view(request, chapitre_id):
     POST : Génère le quiz et redirige vers la liste des quiz
     """
     chapitre = get_object_or_404(Chapitre, id=chapitre_id)
+    statut, reessayer_dans = 200, None
     
     # Vérification des permissions (optionnel : vérifier que l'utilisateur est professeur)
     # if request.user.role != 'TEACHER':
@@ -163,46 +185,46 @@ def generer_quiz_view(request, chapitre_id):
             
             logger.info(f"Génération de quiz demandée : {nombre_questions} questions, difficulté {difficulte}")
             
-            # Initialisation du service IA
-            service = ServiceIA()
-            
-            # Génération du quiz
-            donnees_questions = service.generer_quiz(
-                chapitre=chapitre,
-                nombre_questions=nombre_questions,
-                difficulte=difficulte
+            # Génération unique pour les demandes identiques simultanées (plusieurs
+            # onglets, plusieurs professeurs) ; les limites d'appels IA sont débitées
+            # par la seule demande qui appelle le modèle
+            questions_creees, partagee = generation.generer_quiz(
+                chapitre, nombre_questions, difficulte, request.user
             )
-
-            # chapitre.questions.all().delete()
             
-            # Enregistrement des nouvelles questions
-            questions_creees = []
-            for data in donnees_questions:
-                # Conversion de l'index (0-3) en lettre (A-D)
-                index_bonne_reponse = data['bonne_reponse']
-                lettre_bonne_reponse = ['A', 'B', 'C', 'D'][index_bonne_reponse]
-                
-                question = QuizQuestion.objects.create(
-                    question_texte=data['question'],
-                    choix_A=data['choix'][0],
-                    choix_B=data['choix'][1],
-                    choix_C=data['choix'][2],
-                    choix_D=data['choix'][3],
-                    bonne_reponse=lettre_bonne_reponse,
-                    explication=data['explication'],
-                    chapitre=chapitre,
-                    createur=request.user,
-                    generee_ia=True
+            if partagee:
+                messages.success(
+                    request,
+                    f"✅ Ce quiz était déjà en cours de génération : {len(questions_creees)} questions "
+                    f"ajoutées au chapitre '{chapitre.titre}'."
                 )
-                questions_creees.append(question)
+            else:
+                messages.success(
+                    request,
+                    f"✅ Quiz généré avec succès ! {len(questions_creees)} questions créées pour le chapitre '{chapitre.titre}'."
+                )
+            
+            # Redirection vers la page de détail du quiz
+            return redirect('quiz_detail', quiz_id=chapitre.id)
             
-            messages.success(
+        except limites.LimiteIAAtteinte as e:
+            logger.info(f"Génération de quiz refusée pour {request.user.username} : {e}")
+            messages.error(
                 request,
-                f"✅ Quiz généré avec succès ! {len(questions_creees)} questions créées pour le chapitre '{chapitre.titre}'."
+                f"⏳ Vous avez atteint la limite de générations par l'IA. "
+                f"Réessayez dans {e.reessayer_dans} secondes."
             )
+            statut, reessayer_dans = 429, e.reessayer_dans
             
-            # Redirection vers la page de détail du quiz
-            return redirect('quiz_detail', quiz_id=chapitre.id)
+        except budgets.BudgetIADepasse as e:
+            logger.info(f"Génération de quiz refusée pour {request.user.username} : {e}")
+            portee = "de cette formation" if e.portee == 'formation' else "du professeur de cette formation"
+            messages.error(
+                request,
+                f"⏳ Le budget quotidien d'IA {portee} est épuisé ({e.consomme} tokens sur {e.budget}). "
+                f"Réessayez demain ou demandez une augmentation du budget."
+            )
+            statut, reessayer_dans = 429, None
             
         except ValueError as e:
             logger.error(f"Erreur de validation : {e}")
@@ -225,12 +247,15 @@ def generer_quiz_view(request, chapitre_id):
                     f"❌ Erreur lors de la génération du quiz : {erreur_message}. Veuillez réessayer."
                 )
     
-    # GET : Affichage du formulaire
+    # GET (ou génération refusée) : Affichage du formulaire
     context = {
         'chapitre': chapitre,
         'nombre_questions_actuel': chapitre.questions.count(),
     }
-    return render(request, 'formation/generer_quiz.html', context)
+    response = render(request, 'formation/generer_quiz.html', context, status=statut)
+    if reessayer_dans:
+        response['Retry-After'] = str(reessayer_dans)
+    return response
 
 
 @login_required
@@ -239,9 +264,22 @@ def quiz_detail_view(request, quiz_id):
     """
     Vue pour afficher et passer un quiz (accès étudiant).
     
-    GET : Affiche le quiz avec toutes les questions
+    GET : Affiche le quiz avec toutes les questions (304 si la copie du navigateur est à jour)
     POST : Traite les réponses, crée le résultat et redirige vers les résultats
     """
+    etat = None
+    if request.method == "GET":
+        # Validateurs : tampon du chapitre et tentatives de l'utilisateur (deux lectures indexées)
+        tampon = Chapitre.objects.filter(id=quiz_id).values_list('version', 'date_modification').first()
+        if tampon is None:
+            raise Http404("Chapitre introuvable")
+        etat = soumission.etat_tentatives(request.user, quiz_id)
+        etag_page = versions.etag('quiz', quiz_id, *tampon, *etat, versions.signature_utilisateur(request))
+        derniere_modification = max(date for date in (tampon[1], etat[1]) if date)
+        non_modifie = versions.reponse_conditionnelle(request, etag_page, derniere_modification)
+        if non_modifie:
+            return non_modifie
+    
     # Récupération du chapitre (on utilise quiz_id comme chapitre_id pour simplifier)
     chapitre = get_object_or_404(Chapitre, id=quiz_id)
     questions = chapitre.questions.all().order_by('id')
@@ -252,81 +290,13 @@ def quiz_detail_view(request, quiz_id):
     
     if request.method == "POST":
         try:
-            # Initialisation du service IA
-            service = ServiceIA()
-            
-            score = 0
-            total = questions.count()
-            reponses_etudiant = {}
-            explications_erreurs = {}
-            
-            # Vérification des réponses
-            for question in questions:
-                reponse_choisie = request.POST.get(f'question_{question.id}')
-                
-                if reponse_choisie:
-                    reponses_etudiant[str(question.id)] = reponse_choisie
-                    
-                    if reponse_choisie == question.bonne_reponse:
-                        score += 1
-                    else:
-                        # Génération d'un feedback IA pour les erreurs
-                        try:
-                            explication_ia = service.generer_feedback(
-                                question=question,
-                                reponse_utilisateur=reponse_choisie,
-                                bonne_reponse=question.bonne_reponse
-                            )
-                            explications_erreurs[str(question.id)] = explication_ia
-                        except Exception as e:
-                            logger.warning(f"Erreur lors de la génération du feedback : {e}")
-                            # Fallback : utilisation de l'explication par défaut
-                            explications_erreurs[str(question.id)] = (
-                                f"La bonne réponse était {question.bonne_reponse}. {question.explication}"
-                            )
-                else:
-                    # Question non répondue
-                    reponses_etudiant[str(question.id)] = None
-            
-            # Calcul du score en pourcentage
-            score_pourcentage = int((score / total) * 100) if total > 0 else 0
-            
-            # Création du résultat en base
-            resultat = QuizResult.objects.create(
-                score=score_pourcentage,  # Score en pourcentage
-                reponses_etudiant=reponses_etudiant,
-                explications_erreurs=explications_erreurs if explications_erreurs else None,
-                chapitre=chapitre,
-                etudiant=request.user  # Accepte maintenant tous les utilisateurs (CustomUser)
-            )
-            
-            # Mise à jour de la progression de l'étudiant (si c'est un StudentUser)
-            try:
-                etudiant = request.user.studentuser
-                # Points gagnés : 10 points par bonne réponse
-                points_gagnes = score * 10
-                etudiant.progression_globale = F('progression_globale') + points_gagnes
-                
-                # Gestion des badges
-                badges = etudiant.badges_obtenus or []
-                
-                if score == total and "Expert" not in badges:
-                    badges.append("Expert")
-                elif score >= total * 0.8 and "Excellent" not in badges:
-                    badges.append("Excellent")
-                elif score >= 1 and "Débutant" not in badges:
-                    badges.append("Débutant")
-                
-                etudiant.badges_obtenus = badges
-                etudiant.save()
-                etudiant.refresh_from_db()
-            except StudentUser.DoesNotExist:
-                # L'utilisateur n'est pas un StudentUser, on ne met pas à jour la progression
-                # mais le résultat a quand même été enregistré
-                pass
-            
-            logger.info(f"Quiz soumis : score {score}/{total} ({score_pourcentage}%) pour {request.user.username}")
-            
+            # Jeton de tentative : un renvoi du formulaire retrouve le premier résultat
+            jeton = soumission.lire_jeton(request.POST.get('jeton_tentative'))
+
+            # Correction, feedbacks IA et enregistrement (une seule fois par jeton)
+            reponses_brutes = {str(question.id): request.POST.get(f'question_{question.id}') for question in questions}
+            resultat, _ = soumission.soumettre_quiz(request.user, chapitre, questions, reponses_brutes, jeton)
+
             # Redirection vers la page de résultats
             return redirect('quiz_result', result_id=resultat.id)
             
@@ -338,8 +308,12 @@ def quiz_detail_view(request, quiz_id):
     context = {
         'chapitre': chapitre,
         'questions': questions,
+        'jeton_tentative': soumission.jeton_tentative(request.user, chapitre.id, etat),
     }
-    return render(request, 'formation/quiz_detail.html', context)
+    reponse = render(request, 'formation/quiz_detail.html', context)
+    if request.method == "GET":
+        versions.appliquer_entetes(reponse, etag_page, derniere_modification)
+    return reponse
 
 
 @login_required
@@ -347,6 +321,9 @@ def quiz_result_view(request, result_id):
     """
     Vue pour afficher les résultats détaillés d'un quiz avec feedbacks IA.
     
+    Les feedbacks différés encore en attente sont affichés avec l'explication
+    stockée de la question, puis remplacés côté navigateur dès qu'ils sont prêts.
+    
     Args:
         result_id: ID du résultat QuizResult à afficher
     """
@@ -386,6 +363,203 @@ def quiz_result_view(request, result_id):
         'bonnes_reponses': bonnes_reponses,
         'score_pourcentage': score_pourcentage,
         'chapitre': resultat.chapitre,
+        # Feedbacks IA encore en génération : la page interroge l'API jusqu'à la fin
+        'feedbacks_en_cours': resultat.feedbacks_en_cours,
     }
     
     return render(request, 'formation/quiz_result.html', context)
+
+
+@login_required
+def chapitre_statistiques_view(request, chapitre_id):
+    """
+    Vue pour afficher l'analyse des questions d'un chapitre (accès professeur).
+    
+    Le taux de réussite et la répartition des choix viennent des compteurs incrémentaux ;
+    la discrimination et l'efficacité des distracteurs du dernier calcul en lot
+    (commande calculer_statistiques_items). Lectures servies par la réplique analytique.
+    """
+    chapitre = get_object_or_404(Chapitre.objects.select_related('formation'), id=chapitre_id)
+    
+    if request.user.role != 'TEACHER' and not request.user.is_staff:
+        messages.error(request, "Vous n'avez pas accès aux statistiques de ce chapitre.")
+        return redirect('home')
+    
+    questions = replique.analytique(QuizQuestion).filter(chapitre=chapitre).order_by('id')
+    statistiques_par_question = replique.analytique(QuestionStatistique).filter(question__chapitre=chapitre).in_bulk(field_name='question_id')
+    
+    lignes = []
+    for question in questions:
+        statistique = statistiques_par_question.get(question.id)
+        if statistique is not None:
+            # Évite une requête par ligne dans repartition_choix()
+            statistique.question = question
+        lignes.append({
+            'question': question,
+            'statistique': statistique,
+        })
+    
+    context = {
+        'chapitre': chapitre,
+        'lignes': lignes,
+    }
+    return render(request, 'formation/chapitre_statistiques.html', context)
+
+
+@login_required
+def export_resultats_view(request, format_export):
+    """
+    Vue d'export des résultats de quiz en flux (accès professeur).
+    
+    Filtres GET : formation, chapitre, debut, fin (AAAA-MM-JJ, inclus).
+    Un professeur n'exporte que les résultats de ses formations ; le staff exporte tout.
+    """
+    if format_export not in export.FORMATS:
+        raise Http404("Format d'export inconnu")
+    if request.user.role != 'TEACHER' and not request.user.is_staff:
+        messages.error(request, "Vous n'avez pas accès à l'export des résultats.")
+        return redirect('home')
+    
+    try:
+        formation_id = int(request.GET['formation']) if request.GET.get('formation') else None
+        chapitre_id = int(request.GET['chapitre']) if request.GET.get('chapitre') else None
+        debut = export.lire_date(request.GET.get('debut'))
+        fin = export.lire_date(request.GET.get('fin'))
+    except ValueError:
+        return HttpResponseBadRequest("Filtres invalides (formation et chapitre : entiers, dates : AAAA-MM-JJ).")
+    
+    resultats = export.resultats_a_exporter(
+        professeur=None if request.user.is_staff else request.user,
+        formation_id=formation_id,
+        chapitre_id=chapitre_id,
+        debut=debut,
+        fin=fin,
+    )
+    generateur, type_contenu = export.FORMATS[format_export]
+    reponse = StreamingHttpResponse(generateur(resultats), content_type=type_contenu)
+    reponse['Content-Disposition'] = f'attachment; filename="resultats.{format_export}"'
+    reponse['Cache-Control'] = 'private, no-store'
+    return reponse
+
+
+@login_required
+def tableau_de_bord_view(request):
+    """
+    Vue du tableau de bord de progression de l'utilisateur connecté.
+    
+    Rendu uniquement à partir des résumés ProgressionChapitre : une ligne par
+    chapitre travaillé, sans agrégation des QuizResult à l'affichage.
+    """
+    progressions = (
+        ProgressionChapitre.objects.filter(etudiant=request.user)
+        .select_related('chapitre__formation')
+        .order_by('chapitre__formation__titre', 'chapitre__ordre')
+    )
+    
+    # Regroupement par formation pour l'affichage
+    formations = {}
+    for ligne in progressions:
+        formations.setdefault(ligne.chapitre.formation, []).append(ligne)
+    
+    try:
+        etudiant = request.user.studentuser
+    except StudentUser.DoesNotExist:
+        etudiant = None
+    
+    context = {
+        'formations': list(formations.items()),
+        'etudiant': etudiant,
+        'badges': [
+            (badge, badges.DESCRIPTIONS.get(badge.code, ''))
+            for badge in BadgeObtenu.objects.filter(etudiant_id=request.user.pk).order_by('date_obtention')
+        ],
+        'nb_revisions_dues': revision.nombre_revisions_dues(request.user),
+        'nb_chapitres': len(progressions),
+        'nb_tentatives': sum(ligne.nb_tentatives for ligne in progressions),
+    }
+    return render(request, 'formation/tableau_de_bord.html', context)
+
+
+def classement_view(request, formation_id=None):
+    """
+    Vue du classement des étudiants, global ou limité à une formation.
+    
+    Le top K est servi depuis le cache ; le rang de l'utilisateur connecté
+    est obtenu par un COUNT indexé.
+    """
+    formation = get_object_or_404(Formation, id=formation_id) if formation_id else None
+    top = classement.top_k(formation.id if formation else None)
+    
+    mon_rang = None
+    if request.user.is_authenticated:
+        try:
+            mon_rang = classement.rang_etudiant(request.user.studentuser, formation.id if formation else None)
+        except StudentUser.DoesNotExist:
+            pass
+    
+    context = {
+        'formation': formation,
+        'top': top,
+        'mon_rang': mon_rang,
+    }
+    return render(request, 'formation/classement.html', context)
+
+
+def recherche_view(request):
+    """
+    Recherche plein texte dans les formations, chapitres et questions.
+    
+    Paramètres GET : q (termes), type (formation, chapitre ou question), page
+    """
+    texte = request.GET.get('q', '').strip()
+    type_objet = request.GET.get('type') or None
+    if type_objet not in recherche.SOURCES:
+        type_objet = None
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    
+    resultats, page_suivante = recherche.rechercher_page(
+        texte, type_objet, page, getattr(settings, 'RECHERCHE_TAILLE_PAGE', 20)
+    )
+    
+    context = {
+        'q': texte,
+        'type_objet': type_objet,
+        'types': recherche.SOURCES,
+        'resultats': resultats,
+        'page': page,
+        'page_suivante': page + 1 if page_suivante else None,
+        'page_precedente': page - 1 if page > 1 else None,
+    }
+    return render(request, 'formation/recherche.html', context)
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def revision_view(request):
+    """
+    Vue de la session de révision espacée (accès étudiant).
+    
+    GET : Affiche les questions dues (file lue via l'index (etudiant, date_echeance))
+    POST : Note les réponses, replanifie les questions (SM-2) et réaffiche la session
+    """
+    if request.method == "POST":
+        ids = [int(question_id) for question_id in request.POST.getlist('questions') if question_id.isdigit()]
+        etats = EtatRevision.objects.filter(etudiant=request.user, question_id__in=ids).select_related('question')
+        questions = [etat.question for etat in etats]
+        reponses = {str(question.id): request.POST.get(f'question_{question.id}') for question in questions}
+        
+        revision.enregistrer_revisions(request.user, questions, reponses)
+        
+        bonnes = sum(1 for question in questions if reponses[str(question.id)] == question.bonne_reponse)
+        messages.success(request, f"✅ Révision enregistrée : {bonnes}/{len(questions)} bonne(s) réponse(s).")
+        return redirect('revision')
+    
+    etats = list(revision.revisions_dues(request.user))
+    context = {
+        'etats': etats,
+        'nb_revisions_dues': revision.nombre_revisions_dues(request.user) if etats else 0,
+    }
+    return render(request, 'formation/revision.html', context)